@@ -0,0 +1,73 @@
+"""Benchmark of the start-up time of the `etl` entry point.
+
+Runs `etl --help` and `etl <command> --help` in fresh interpreters, and prints the
+median wall time of each, the top-level one should stay under 300ms(TARGET_MS)
+since the subcommands are imported on dispatch only. With `--importtime`, prints
+the slowest modules imported by `etl --help`(python -X importtime).
+
+    PYTHONPATH=. python benchmarks/bench_cli_import.py -n 10 dump load
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+TARGET_MS = 300
+
+ETL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "etl")
+
+
+def bench(args, rounds):
+    elapsed = []
+    for _ in range(rounds):
+        st = time.perf_counter()
+        subprocess.run(
+            [sys.executable, ETL, *args],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        elapsed.append(time.perf_counter() - st)
+    return statistics.median(elapsed) * 1000
+
+
+def slowest_imports(top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", ETL, "--help"],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--rounds", type=int, default=10)
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("commands", nargs="*")
+    args = parser.parse_args()
+
+    elapsed = bench(["--help"], args.rounds)
+    print(f"etl --help: {round(elapsed)}ms (target {TARGET_MS}ms)")
+    for command in args.commands:
+        elapsed = bench([command, "--help"], args.rounds)
+        print(f"etl {command} --help: {round(elapsed)}ms")
+
+    if args.importtime:
+        for cumulative, module in slowest_imports(20):
+            print(f"{round(cumulative / 1000, 1):>8}ms {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Micro-benchmark of the TimescaleDB exporter's converter chain.
+
+Converts the entities of `blockchainetl/alert/full_items.py`(one mainnet block)
+with CompositeItemConverter and FusedItemConverter, checks the outputs are identical,
+and prints the time of each.
+
+    PYTHONPATH=. python benchmarks/bench_item_converters.py -n 50
+"""
+
+import copy
+import time
+import argparse
+
+from blockchainetl.alert.full_items import FULL_ITEMS
+from blockchainetl.enumeration.entity_type import EntityType
+from blockchainetl.jobs.exporters.item_exporter_builder import tsdb_exporter_converters
+from blockchainetl.jobs.exporters.converters import (
+    CompositeItemConverter,
+    FusedItemConverter,
+)
+
+# FULL_ITEMS is restructured for the alert rules, map back to the exported types
+ALERT_TYPE_TO_ENTITY_TYPE = {
+    "tx": EntityType.TRANSACTION,
+    "token_xfer": EntityType.TOKEN_TRANSFER,
+}
+
+
+def load_items():
+    items = []
+    for rows in FULL_ITEMS.values():
+        for row in rows:
+            for value in row.values():
+                entities = [value] if isinstance(value, dict) else value or []
+                for entity in entities:
+                    item = dict(entity)
+                    item["type"] = ALERT_TYPE_TO_ENTITY_TYPE.get(
+                        item["type"], item["type"]
+                    )
+                    items.append(item)
+    return items
+
+
+def bench(converter, items, rounds):
+    # the converters may update the items in place, give each round a fresh copy
+    batches = [copy.deepcopy(items) for _ in range(rounds)]
+    st = time.perf_counter()
+    for batch in batches:
+        converter.convert_items(batch)
+    return time.perf_counter() - st
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    items = load_items()
+    composite = CompositeItemConverter(tsdb_exporter_converters())
+    fused = FusedItemConverter(tsdb_exporter_converters())
+
+    expected = composite.convert_items(copy.deepcopy(items))
+    actual = fused.convert_items(copy.deepcopy(items))
+    assert [repr(e) for e in expected] == [repr(e) for e in actual], "output mismatch"
+
+    composite_elapsed = bench(composite, items, args.rounds)
+    fused_elapsed = bench(fused, items, args.rounds)
+    total = len(items) * args.rounds
+    print(f"items: {len(items)} x {args.rounds} rounds")
+    print(
+        f"composite: {round(composite_elapsed, 3)}s "
+        f"({round(total / composite_elapsed)} items/s)"
+    )
+    print(
+        f"fused:     {round(fused_elapsed, 3)}s ({round(total / fused_elapsed)} items/s)"
+    )
+    print(f"speedup:   {round(composite_elapsed / fused_elapsed, 2)}x")
+
+
+if __name__ == "__main__":
+    main()
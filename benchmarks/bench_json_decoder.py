@@ -0,0 +1,165 @@
+"""Benchmark of the JSON-RPC response decoding.
+
+Generates a batch response of geth call trees(debug_traceBlockByNumber) and one of
+bitcoin blocks(getblock with verbosity 2), decodes the traces with
+
+    web3:      web3's HTTPProvider.decode_rpc_response(the stdlib json)
+    decoder:   decode_rpc_response(the stdlib json, with the gc paused)
+    iterative: iterative_loads, the fallback of the payloads nested too deep
+
+and the blocks with json.loads(parse_float=Decimal) and decode_rpc_response(use_decimal),
+checks the outputs are identical, and prints the best time of the rounds. With
+`--depth`, also decodes a call tree nested that deep, which raised RecursionError
+before. Set BLOCKCHAIN_ETL_JSON_RPC_DECODER=orjson to compare with orjson.
+
+    PYTHONPATH=. python benchmarks/bench_json_decoder.py -t 5000 -n 9 --depth 5000
+"""
+
+import gc
+import json
+import time
+import random
+import argparse
+from decimal import Decimal
+
+from web3 import HTTPProvider
+
+from blockchainetl.misc import json_decoder
+from blockchainetl.misc.json_decoder import decode_rpc_response, iterative_loads
+
+
+def random_call(rnd, depth):
+    call = {
+        "type": "CALL",
+        "from": "0x%040x" % rnd.getrandbits(160),
+        "to": "0x%040x" % rnd.getrandbits(160),
+        "value": hex(rnd.getrandbits(40)),
+        "gas": hex(rnd.getrandbits(20)),
+        "gasUsed": hex(rnd.getrandbits(16)),
+        "input": "0x" + "%064x" % rnd.getrandbits(256),
+        "output": "0x",
+    }
+    if depth < 6 and rnd.random() < 0.6:
+        call["calls"] = [random_call(rnd, depth + 1) for _ in range(rnd.randint(1, 3))]
+    return call
+
+
+def trace_response(n_transactions, seed=1):
+    rnd = random.Random(seed)
+    result = [{"result": random_call(rnd, 0)} for _ in range(n_transactions)]
+    return json.dumps([{"jsonrpc": "2.0", "id": 1, "result": result}]).encode()
+
+
+def bitcoin_response(n_transactions, seed=1):
+    rnd = random.Random(seed)
+
+    def vout(n):
+        return {
+            # the amounts are formatted with 8 decimals by bitcoind
+            "value": "%.8f" % (rnd.getrandbits(40) / 1e8),
+            "n": n,
+            "scriptPubKey": {
+                "type": "pubkeyhash",
+                "hex": "%050x" % rnd.getrandbits(200),
+            },
+        }
+
+    txs = [
+        {
+            "txid": "%064x" % rnd.getrandbits(256),
+            "vin": [{"txid": "%064x" % rnd.getrandbits(256), "vout": 0}],
+            "vout": [vout(n) for n in range(rnd.randint(1, 3))],
+        }
+        for _ in range(n_transactions)
+    ]
+    text = json.dumps([{"result": {"height": 800000, "tx": txs}, "id": 0}])
+    # unquote the amounts, so they're parsed as numbers
+    return text.replace('"value": "', '"value": ').replace('", "n"', ', "n"').encode()
+
+
+def deep_response(depth):
+    text = '{"type": "CALL", "calls": [' * (depth - 1)
+    text += '{"type": "CALL", "calls": []}' + "]}" * (depth - 1)
+    return ('[{"jsonrpc": "2.0", "id": 1, "result": [{"result": %s}]}]' % text).encode()
+
+
+def bench(func, response, rounds):
+    # the best of the rounds, with the gc enabled as in the exporting, the garbage
+    # of the previous rounds is collected first
+    elapsed = []
+    for _ in range(rounds):
+        gc.collect()
+        st = time.perf_counter()
+        func(response)
+        elapsed.append(time.perf_counter() - st)
+    return min(elapsed)
+
+
+def report(name, elapsed, baseline, response):
+    mbps = len(response) / elapsed / 1024 / 1024
+    print(
+        f"{name:>12}: {round(elapsed * 1000, 1)}ms ({round(mbps)}MiB/s) "
+        f"speedup={round(baseline / elapsed, 2)}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--transactions", type=int, default=2000)
+    parser.add_argument("-n", "--rounds", type=int, default=5)
+    parser.add_argument("--depth", type=int, default=0)
+    args = parser.parse_args()
+
+    web3_decode = HTTPProvider().decode_rpc_response
+
+    response = trace_response(args.transactions)
+    expected = web3_decode(response)
+    assert decode_rpc_response(response) == expected, "output mismatch"
+    assert iterative_loads(response.decode()) == expected, "output mismatch"
+
+    print(
+        f"traces: {round(len(response) / 1024 / 1024, 1)}MiB x {args.rounds} rounds "
+        f"(orjson {'on' if json_decoder.USE_ORJSON else 'off'})"
+    )
+    baseline = bench(web3_decode, response, args.rounds)
+    report("web3", baseline, baseline, response)
+    elapsed = bench(decode_rpc_response, response, args.rounds)
+    report("decoder", elapsed, baseline, response)
+    elapsed = bench(lambda e: iterative_loads(e.decode()), response, args.rounds)
+    report("iterative", elapsed, baseline, response)
+
+    response = bitcoin_response(args.transactions)
+    expected = json.loads(response.decode(), parse_float=Decimal)
+    actual = decode_rpc_response(response, use_decimal=True)
+    assert json.dumps(actual, default=str) == json.dumps(expected, default=str)
+
+    print(f"bitcoin: {round(len(response) / 1024 / 1024, 1)}MiB x {args.rounds} rounds")
+    baseline = bench(
+        lambda e: json.loads(e.decode(), parse_float=Decimal), response, args.rounds
+    )
+    report("json", baseline, baseline, response)
+    elapsed = bench(
+        lambda e: decode_rpc_response(e, use_decimal=True), response, args.rounds
+    )
+    report("decoder", elapsed, baseline, response)
+
+    if args.depth > 0:
+        response = deep_response(args.depth)
+        try:
+            web3_decode(response)
+            print(f"depth {args.depth}: decoded by web3")
+        except (RecursionError, ValueError) as e:
+            print(f"depth {args.depth}: web3 failed with {type(e).__name__}")
+        st = time.perf_counter()
+        decoded = decode_rpc_response(response)
+        depth = 0
+        call = decoded[0]["result"][0]["result"]
+        while len(call["calls"]) > 0:
+            call = call["calls"][0]
+            depth += 1
+        assert depth == args.depth - 1, "depth mismatch"
+        print(f"depth {args.depth}: decoded in {round(time.perf_counter() - st, 3)}s")
+
+
+if __name__ == "__main__":
+    main()
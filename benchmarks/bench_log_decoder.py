@@ -0,0 +1,95 @@
+"""Micro-benchmark of the transfer extraction of the logs.
+
+Extracts the token/ERC721(with CryptoPunks)/ERC1155 transfers from the logs of
+`blockchainetl/alert/full_items.py`(one mainnet block) with the four
+ExtractXxxTransfersJob passes and the single-pass ExtractTransfersJob, checks the
+outputs are identical, and prints the time of each.
+
+    PYTHONPATH=. python benchmarks/bench_log_decoder.py -n 200
+"""
+
+import json
+import time
+import argparse
+
+from blockchainetl.alert.full_items import FULL_ITEMS
+from blockchainetl.enumeration.chain import Chain
+from blockchainetl.enumeration.entity_type import EntityType
+from ethereumetl.streaming.extractor import (
+    extract_token_transfers,
+    extract_erc721_transfers,
+    extract_cryptopunk_transfers,
+    extract_erc1155_transfers,
+    extract_transfers,
+)
+
+
+def load_logs():
+    return [row["log"] for row in FULL_ITEMS["log"]]
+
+
+def multi_pass(logs, batch_size, max_workers):
+    return {
+        EntityType.TOKEN_TRANSFER: extract_token_transfers(
+            logs, batch_size, max_workers, Chain.ETHEREUM
+        ),
+        EntityType.ERC721_TRANSFER: extract_erc721_transfers(
+            logs, batch_size, max_workers, set(), Chain.ETHEREUM
+        )
+        + extract_cryptopunk_transfers(logs, Chain.ETHEREUM),
+        EntityType.ERC1155_TRANSFER: extract_erc1155_transfers(
+            logs, batch_size, max_workers
+        ),
+    }
+
+
+def single_pass(logs, batch_size, max_workers):
+    return extract_transfers(logs, Chain.ETHEREUM, erc20_tokens=set())
+
+
+def normalize(transfers):
+    return {
+        k: sorted(json.dumps(e, sort_keys=True) for e in v)
+        for k, v in transfers.items()
+    }
+
+
+def bench(func, logs, rounds, batch_size, max_workers):
+    st = time.perf_counter()
+    for _ in range(rounds):
+        func(logs, batch_size, max_workers)
+    return time.perf_counter() - st
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--rounds", type=int, default=200)
+    parser.add_argument("-b", "--batch-size", type=int, default=100)
+    parser.add_argument("-w", "--max-workers", type=int, default=5)
+    args = parser.parse_args()
+
+    logs = load_logs()
+    expected = normalize(multi_pass(logs, args.batch_size, args.max_workers))
+    actual = normalize(single_pass(logs, args.batch_size, args.max_workers))
+    assert expected == actual, "output mismatch"
+
+    multi_elapsed = bench(
+        multi_pass, logs, args.rounds, args.batch_size, args.max_workers
+    )
+    single_elapsed = bench(
+        single_pass, logs, args.rounds, args.batch_size, args.max_workers
+    )
+    print(f"logs: {len(logs)} x {args.rounds} rounds")
+    print(
+        f"multi-pass:  {round(multi_elapsed, 3)}s "
+        f"({round(multi_elapsed / args.rounds * 1000, 3)}ms/block)"
+    )
+    print(
+        f"single-pass: {round(single_elapsed, 3)}s "
+        f"({round(single_elapsed / args.rounds * 1000, 3)}ms/block)"
+    )
+    print(f"speedup:     {round(multi_elapsed / single_elapsed, 2)}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Micro-benchmark of the alert rules, interpreted vs compiled.
+
+Evaluates some representative rules on the items of `blockchainetl/alert/full_items.py`
+(one mainnet block) with rule_engine.Rule and the CompiledRule of rule_compiler.py,
+checks the results(and the errors raised) are identical, and prints the throughput
+of each.
+
+    PYTHONPATH=. python benchmarks/bench_rule_engine.py -n 50
+"""
+
+import time
+import argparse
+
+import rule_engine
+
+from blockchainetl.alert.full_items import FULL_ITEMS
+from blockchainetl.alert.rule_compiler import CompiledRule, compile_rule
+
+RULES = [
+    ("tx", "tx.value > 10**18"),
+    ("tx", "tx.value_usd > 1000.5 and tx.receipt_status == 1"),
+    (
+        "tx",
+        "tx.to_address in ['0xdac17f958d2ee523a2206206994597c13d831ec7', "
+        "'0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48']",
+    ),
+    ("tx", "tx.input =~ '^0xa9059cbb' or tx.input =~~ '23b872dd'"),
+    ("tx", "[l for l in logs if l.topics[0] =~ '^0xddf252ad'].length > 2"),
+    ("tx", "[t for t in token_xfers if t.value > 1000 and t.name != 'AHG']"),
+    ("tx", "tx.from_label != 'NaN' or tx.to_label in ['binance', 'ftx']"),
+    ("tx", "tx.receipt_contract_address&.length > 0"),
+    ("tx", "tx.missing_key == null and block.number > 0"),
+    ("trace", "trace.value > 0 and trace.status == 1 and trace.error == null"),
+    ("trace", "trace.trace_address.length >= 2 and trace.call_type == 'delegatecall'"),
+    ("token_xfer", "token_xfer.value_usd > 10000 or token_xfer.name == 'USDT'"),
+    ("token_xfer", "token_xfer.value + 1 > 100 ? token_xfer.to_address : null"),
+    ("log", "log.topics[1:3] == ['a', 'b'] or log.address.as_upper =~ '^0XC'"),
+    # these raise EvaluationError
+    ("tx", "tx.value > 'abc'"),
+    ("tx", "tx.hash + 1 > 0"),
+    ("trace", "trace.trace_address.foo == 1"),
+]
+
+
+def outcome(rule, item):
+    try:
+        return ("ok", rule.evaluate(item))
+    except rule_engine.errors.EngineError as e:
+        return (type(e).__name__, str(e))
+
+
+def bench(rule, items, rounds):
+    st = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            try:
+                rule.matches(item)
+            except rule_engine.errors.EngineError:
+                pass
+    return time.perf_counter() - st
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    total_interpreted = total_compiled = 0
+    for scope, text in RULES:
+        items = FULL_ITEMS[scope]
+        rule = rule_engine.Rule(text, context=rule_engine.Context(default_value=None))
+        compiled = compile_rule(rule)
+        assert isinstance(compiled, CompiledRule), f"not compiled: {text}"
+        for item in items:
+            expected, actual = outcome(rule, item), outcome(compiled, item)
+            assert expected == actual, f"{text}: {expected} != {actual}"
+
+        interpreted_elapsed = bench(rule, items, args.rounds)
+        compiled_elapsed = bench(compiled, items, args.rounds)
+        total_interpreted += interpreted_elapsed
+        total_compiled += compiled_elapsed
+        n = len(items) * args.rounds
+        print(
+            f"{round(n / interpreted_elapsed):>8}/s -> {round(n / compiled_elapsed):>8}/s "
+            f"({round(interpreted_elapsed / compiled_elapsed, 2)}x) [{scope}] {text}"
+        )
+
+    print(f"interpreted: {round(total_interpreted, 3)}s")
+    print(f"compiled:    {round(total_compiled, 3)}s")
+    print(f"speedup:     {round(total_interpreted / total_compiled, 2)}x")
+
+
+if __name__ == "__main__":
+    main()
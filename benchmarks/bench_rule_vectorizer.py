@@ -0,0 +1,91 @@
+"""Micro-benchmark of the alert rules, row by row vs column-wise.
+
+Filters the items of `blockchainetl/alert/full_items.py`(one mainnet block) with
+rule_engine.Rule and the VectorizedRule of rule_vectorizer.py, checks the matched
+items(and the errors raised) are identical, and prints the time of each.
+
+    PYTHONPATH=. python benchmarks/bench_rule_vectorizer.py -n 50
+"""
+
+import time
+import argparse
+
+import rule_engine
+
+from blockchainetl.alert.full_items import FULL_ITEMS
+from blockchainetl.alert.rule_vectorizer import vectorize_rule
+
+RULES = [
+    ("tx", "tx.value > 10**18"),
+    ("tx", "tx.value_usd > 1000.5 and tx.receipt_status == 1"),
+    (
+        "tx",
+        "tx.to_address in ['0xdac17f958d2ee523a2206206994597c13d831ec7', "
+        "'0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48']",
+    ),
+    ("tx", "tx.input =~ '^0xa9059cbb' or tx.input =~~ '23b872dd'"),
+    ("tx", "tx.input.length > 10 and tx.gas_price / 10**9 >= 20"),
+    (
+        "tx",
+        "tx.value > 0 and [l for l in logs if l.topics[0] =~ '^0xddf252ad'].length > 2",
+    ),
+    ("tx", "tx.from_label != 'NaN' or tx.to_label in ['binance', 'ftx']"),
+    ("tx", "tx.missing_key == null and block.number > 0"),
+    ("trace", "trace.value > 0 and trace.status == 1 and trace.error == null"),
+    ("token_xfer", "token_xfer.value_usd > 10000 or token_xfer.name == 'USDT'"),
+    ("token_xfer", "token_xfer.name.as_upper == 'USDT' and token_xfer.value > 1000"),
+    ("log", "log.address.as_upper =~ '^0XC' and not log.removed"),
+    # these raise EvaluationError
+    ("tx", "tx.value > 'abc'"),
+    ("tx", "tx.hash + 1 > 0"),
+]
+
+
+def outcome(rule, items):
+    try:
+        return ("ok", [id(e) for e in rule.filter(items)])
+    except rule_engine.errors.EngineError as e:
+        return (type(e).__name__, str(e))
+
+
+def bench(rule, items, rounds):
+    st = time.perf_counter()
+    for _ in range(rounds):
+        try:
+            list(rule.filter(items))
+        except rule_engine.errors.EngineError:
+            pass
+    return time.perf_counter() - st
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    total_interpreted = total_vectorized = 0
+    for scope, text in RULES:
+        items = FULL_ITEMS[scope]
+        rule = rule_engine.Rule(text, context=rule_engine.Context(default_value=None))
+        vectorized = vectorize_rule(rule)
+        assert vectorized is not None, f"not vectorized: {text}"
+        expected, actual = outcome(rule, items), outcome(vectorized, items)
+        assert expected == actual, f"{text}: {expected} != {actual}"
+
+        interpreted_elapsed = bench(rule, items, args.rounds)
+        vectorized_elapsed = bench(vectorized, items, args.rounds)
+        total_interpreted += interpreted_elapsed
+        total_vectorized += vectorized_elapsed
+        print(
+            f"{round(interpreted_elapsed / args.rounds * 1000, 3):>8}ms -> "
+            f"{round(vectorized_elapsed / args.rounds * 1000, 3):>8}ms "
+            f"({round(interpreted_elapsed / vectorized_elapsed, 2)}x) [{scope}] {text}"
+        )
+
+    print(f"interpreted: {round(total_interpreted, 3)}s")
+    print(f"vectorized:  {round(total_vectorized, 3)}s")
+    print(f"speedup:     {round(total_interpreted / total_vectorized, 2)}x")
+
+
+if __name__ == "__main__":
+    main()
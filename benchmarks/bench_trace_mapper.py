@@ -0,0 +1,266 @@
+"""Benchmark of the geth trace mapping, through EthTrace objects and directly into dicts.
+
+Generates a large block of geth call trees(callTracer), maps it into the exported
+trace dicts with
+
+    legacy:  the recursive mapper before the dict walk(vendored below as
+             LegacyEthTraceMapper, with the EthTrace of __dict__) + calculate_trace_
+             statuses/ids + trace_to_dict
+    objects: geth_trace_to_traces(a wrapper of the dict walk, used with
+             GETH_TRACE_IGNORE_ERROR_EMPTY_TRACE) + calculate_trace_statuses/ids +
+             trace_to_dict
+    dicts:   geth_trace_to_trace_dicts(with_status) + calculate_trace_dict_ids
+
+checks the outputs are identical to the legacy one, and prints the best time of the
+rounds and the peak memory(tracemalloc) of each, and the size of the slotted EthTrace
+against a __dict__ based one.
+
+    PYTHONPATH=. python benchmarks/bench_trace_mapper.py -t 500 -n 9
+"""
+
+import gc
+import time
+import random
+import argparse
+import tracemalloc
+
+from typing import Any, Dict, List, Optional
+
+from blockchainetl.env import GETH_TRACE_IGNORE_GASUSED_ERROR
+from blockchainetl.utils import hex_to_dec
+from ethereumetl.utils import to_normalized_address
+from ethereumetl.domain.trace import EthTrace
+from ethereumetl.domain.geth_trace import EthGethTrace
+from ethereumetl.misc.geth_error_convert import geth_error_to_parity
+from ethereumetl.misc.geth_precompiled_contract import GETH_PRECOMPILED_CONTRACT_RANGE
+from ethereumetl.mappers.trace_mapper import EthTraceMapper
+from ethereumetl.mappers.geth_trace_mapper import EthGethTraceMapper
+from ethereumetl.service.trace_id_calculator import (
+    calculate_trace_ids,
+    calculate_trace_dict_ids,
+)
+from ethereumetl.service.trace_status_calculator import calculate_trace_statuses
+
+CALL_TYPES = ["CALL", "CALL", "STATICCALL", "DELEGATECALL", "CREATE", "SELFDESTRUCT"]
+
+
+def random_address(rnd):
+    return "0x%040x" % rnd.getrandbits(160)
+
+
+def random_call(rnd, depth):
+    call = {
+        "type": "CALL" if depth == 0 else rnd.choice(CALL_TYPES),
+        "from": random_address(rnd),
+        "to": random_address(rnd),
+        "value": hex(rnd.getrandbits(40)),
+        "gas": hex(rnd.getrandbits(20)),
+        "gasUsed": hex(rnd.getrandbits(16)),
+        "input": "0x" + "%064x" % rnd.getrandbits(256),
+        "output": "0x",
+    }
+    if rnd.random() < 0.05:
+        call["error"] = "execution reverted"
+    if depth < 6:
+        n_calls = rnd.choice([0, 0, 1, 2, 3])
+        if n_calls > 0:
+            call["calls"] = [random_call(rnd, depth + 1) for _ in range(n_calls)]
+    return call
+
+
+def random_geth_trace(n_transactions, seed=1):
+    rnd = random.Random(seed)
+    return {
+        "block_number": 15000000,
+        "tx_traces": [random_call(rnd, 0) for _ in range(n_transactions)],
+        "tx_hashes": {
+            i: "0x%064x" % rnd.getrandbits(256) for i in range(n_transactions)
+        },
+    }
+
+
+# a subclass without __slots__ has the instance __dict__ as before
+UnslottedEthTrace = type("UnslottedEthTrace", (EthTrace,), {})
+
+
+class LegacyEthTraceMapper(EthTraceMapper):
+    """The recursive geth_trace_to_traces before the dict walk, the comments are
+    stripped."""
+
+    def geth_trace_to_traces(
+        self, geth_trace: EthGethTrace, retain_precompiled_calls: bool = True
+    ) -> List[EthTrace]:
+        traces = []
+        for tx_index, tx_trace in enumerate(geth_trace.tx_traces):
+            traces.extend(
+                self._iterate_geth_trace(
+                    geth_trace.block_number,
+                    tx_index,
+                    tx_trace,
+                    retain_precompiled_calls=retain_precompiled_calls,
+                    tx_hashes=geth_trace.tx_hashes,
+                )
+            )
+        return traces
+
+    def _iterate_geth_trace(
+        self,
+        block_number: Optional[int],
+        tx_index: int,
+        tx_trace: Dict[str, Any],
+        trace_address: List[int] = [],
+        parent_trace: Optional[EthTrace] = None,
+        retain_precompiled_calls: bool = True,
+        tx_hashes: Dict[int, str] = dict(),
+    ) -> List[EthTrace]:
+        trace = UnslottedEthTrace()
+
+        trace.block_number = block_number
+        trace.transaction_hash = tx_hashes.get(tx_index)
+        trace.transaction_index = tx_index
+
+        trace.from_address = to_normalized_address(tx_trace.get("from"))
+        trace.to_address = to_normalized_address(tx_trace.get("to"))
+
+        trace.input = tx_trace.get("input")
+        trace.output = tx_trace.get("output")
+
+        trace.gas = hex_to_dec(tx_trace.get("gas"))
+        trace.gas_used = hex_to_dec(tx_trace.get("gasUsed"))
+        if trace.gas is None and trace.gas_used is None:
+            trace.gas_used = 0
+        if GETH_TRACE_IGNORE_GASUSED_ERROR and not isinstance(trace.gas_used, int):
+            trace.gas_used = -1
+
+        error = tx_trace.get("error")
+        if error:
+            trace.error = geth_error_to_parity(error)
+
+        trace.trace_type = tx_trace.get("type", "").lower()
+        if trace.trace_type == "selfdestruct":
+            trace.trace_type = "suicide"
+        elif trace.trace_type in ("call", "callcode", "delegatecall", "staticcall"):
+            trace.call_type = trace.trace_type
+            trace.trace_type = "call"
+
+        if trace.call_type in ("delegatecall", "callcode"):
+            if parent_trace is None:
+                raise ValueError(
+                    f"tx_trace: {tx_trace} is {trace.trace_type}, but missing parent trace"
+                )
+            trace.value = parent_trace.value
+        elif trace.call_type == "staticcall":
+            trace.value = 0
+        else:
+            trace.value = hex_to_dec(tx_trace.get("value"))
+
+        result = [trace]
+
+        calls = tx_trace.get("calls", [])
+        if retain_precompiled_calls is False and len(calls) > 0:
+            calls = [
+                sub
+                for sub in calls
+                if not (
+                    sub.get("type", "").lower()
+                    in ("call", "callcode", "delegatecall", "staticcall")
+                    and int(sub.get("to", "0x0"), 16) in GETH_PRECOMPILED_CONTRACT_RANGE
+                )
+            ]
+
+        trace.subtraces = len(calls)
+        trace.trace_address = trace_address
+
+        for call_index, call_trace in enumerate(calls):
+            result.extend(
+                self._iterate_geth_trace(
+                    block_number,
+                    tx_index,
+                    call_trace,
+                    trace_address + [call_index],
+                    trace,
+                    retain_precompiled_calls=retain_precompiled_calls,
+                    tx_hashes=tx_hashes,
+                )
+            )
+
+        return result
+
+
+def map_by_objects(mapper, geth_trace):
+    traces = mapper.geth_trace_to_traces(geth_trace)
+    calculate_trace_statuses(traces)
+    calculate_trace_ids(traces)
+    return [mapper.trace_to_dict(e) for e in traces]
+
+
+def map_by_dicts(mapper, geth_trace):
+    traces = mapper.geth_trace_to_trace_dicts(geth_trace, with_status=True)
+    return calculate_trace_dict_ids(traces)
+
+
+def bench(func, mapper, geth_trace, rounds):
+    # the best of the rounds, the garbage of the previous rounds is collected first
+    elapsed = []
+    for _ in range(rounds):
+        gc.collect()
+        st = time.perf_counter()
+        func(mapper, geth_trace)
+        elapsed.append(time.perf_counter() - st)
+
+    tracemalloc.start()
+    func(mapper, geth_trace)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(elapsed), peak
+
+
+def instance_size(cls, n=10000):
+    tracemalloc.start()
+    objects = [cls() for _ in range(n)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return size / n
+
+
+def report(name, elapsed, peak, baseline, total):
+    print(
+        f"{name:>8}: {round(elapsed * 1000, 1)}ms ({round(total / elapsed)} traces/s) "
+        f"peak={round(peak / 1024 / 1024, 1)}MiB speedup={round(baseline / elapsed, 2)}x"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--transactions", type=int, default=500)
+    parser.add_argument("-n", "--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy_mapper = LegacyEthTraceMapper()
+    mapper = EthTraceMapper()
+    geth_trace = EthGethTraceMapper().json_dict_to_geth_trace(
+        random_geth_trace(args.transactions)
+    )
+
+    expected = map_by_objects(legacy_mapper, geth_trace)
+    assert map_by_objects(mapper, geth_trace) == expected, "objects output mismatch"
+    assert map_by_dicts(mapper, geth_trace) == expected, "dicts output mismatch"
+
+    total = len(expected)
+    print(f"traces: {len(expected)} x {args.rounds} rounds")
+    legacy_elapsed, peak = bench(map_by_objects, legacy_mapper, geth_trace, args.rounds)
+    report("legacy", legacy_elapsed, peak, legacy_elapsed, total)
+    elapsed, peak = bench(map_by_objects, mapper, geth_trace, args.rounds)
+    report("objects", elapsed, peak, legacy_elapsed, total)
+    elapsed, peak = bench(map_by_dicts, mapper, geth_trace, args.rounds)
+    report("dicts", elapsed, peak, legacy_elapsed, total)
+
+    print(
+        f"EthTrace: {round(instance_size(EthTrace))}B slotted, "
+        f"{round(instance_size(UnslottedEthTrace))}B with __dict__"
+    )
+
+
+if __name__ == "__main__":
+    main()
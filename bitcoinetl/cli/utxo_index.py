@@ -0,0 +1,106 @@
+import os
+import logging
+import click
+import pandas as pd
+from time import time
+from typing import List
+
+from blockchainetl.utils import time_elapsed
+from blockchainetl.cli.utils import global_click_options
+from blockchainetl.service.sql_temp import DEFAULT_FIELD_TERMINATED
+from bitcoinetl.service.utxo_index import (
+    UtxoIndex,
+    outputs_of_traces,
+    spent_of_traces,
+)
+
+TRACE_COLUMNS = [
+    "isin",
+    "txhash",
+    "pxhash",
+    "vout_idx",
+    "vout_cnt",
+    "vout_type",
+    "address",
+    "value",
+    "req_sigs",
+]
+
+
+def _trace_files(input: str) -> List[str]:
+    """Returns the trace files({blknum}.csv) under the input, sorted by blknum."""
+    if os.path.isfile(input):
+        return [input]
+
+    files = []
+    for root, _, names in os.walk(input):
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext == ".csv" and stem.isdigit():
+                files.append((int(stem), os.path.join(root, name)))
+    return [e[1] for e in sorted(files)]
+
+
+@click.command(context_settings=dict(help_option_names=["-h", "--help"]))
+@global_click_options
+@click.option(
+    "-i",
+    "--input",
+    type=click.Path(exists=True, dir_okay=True),
+    required=True,
+    help="The trace file or directory, the files are named as {blknum}.csv",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=str,
+    required=True,
+    envvar="BLOCKCHAIN_ETL_BTC_UTXO_INDEX_PATH",
+    help="The UTXO index file, read by the enrichment of the inputs",
+)
+@click.option(
+    "--files-per-commit",
+    default=100,
+    show_default=True,
+    type=int,
+    help="How many files are loaded in one transaction",
+)
+@click.option(
+    "--no-prune",
+    is_flag=True,
+    show_default=True,
+    help="Keep the spent outputs in the index",
+)
+def btc_utxo_index(chain, input, output, files_per_commit, no_prune):
+    """Bulk load the outputs of the trace files into the local UTXO index."""
+    chain = chain
+    files = _trace_files(input)
+    logging.info(f"load #{len(files)} trace files from {input} into {output}")
+
+    utxo_index = UtxoIndex(output)
+    n_added = n_deleted = 0
+    for i in range(0, len(files), files_per_commit):
+        st = time()
+        outputs = []
+        spent = []
+        for file in files[i : i + files_per_commit]:
+            df = pd.read_csv(file, sep=DEFAULT_FIELD_TERMINATED, usecols=TRACE_COLUMNS)
+            # fix the pyright warning
+            if not isinstance(df, pd.DataFrame):
+                raise ValueError(f"failed to read {file}")
+            outputs.extend(outputs_of_traces(df))
+            if no_prune is False:
+                spent.extend(spent_of_traces(df))
+
+        # the spent outputs are deleted after all the outputs of the files are added
+        added, deleted = utxo_index.update(outputs, spent)
+        n_added += added
+        n_deleted += deleted
+        logging.info(
+            f"STAT utxo-index #file={min(i + files_per_commit, len(files))}/{len(files)} "
+            f"#added={added} #deleted={deleted} [{files[i]} ...] "
+            f"elapsed={time_elapsed(st)}"
+        )
+
+    utxo_index.close()
+    logging.info(f"loaded #{n_added} outputs, pruned #{n_deleted} spent outputs")
@@ -25,6 +25,23 @@ from bitcoinetl.domain.transaction import BtcTransaction
 
 
 class BtcBlock(object):
+    __slots__ = (
+        "hash",
+        "size",
+        "stripped_size",
+        "weight",
+        "number",
+        "version",
+        "merkle_root",
+        "timestamp",
+        "nonce",
+        "bits",
+        "difficulty",
+        "coinbase_param",
+        "transactions",
+        "transaction_count",
+    )
+
     def __init__(self):
         self.hash: Optional[str] = None
         self.size: Optional[str] = None
@@ -25,6 +25,12 @@ from typing import Optional
 
 
 class BtcJoinSplit(object):
+    __slots__ = (
+        "index",
+        "public_input_value",
+        "public_output_value",
+    )
+
     def __init__(self):
         self.index: Optional[int] = None
         self.public_input_value: Optional[int] = None
@@ -2,6 +2,32 @@ from typing import Optional
 
 
 class BtcTrace(object):
+    __slots__ = (
+        "index",
+        "txhash",
+        "pxhash",
+        "block_number",
+        "block_hash",
+        "block_timestamp",
+        "tx_in_value",
+        "tx_out_value",
+        "is_coinbase",
+        "is_in",
+        "vin_seq",
+        "vin_idx",
+        "vin_cnt",
+        "vin_type",
+        "vout_idx",
+        "vout_cnt",
+        "vout_type",
+        "address",
+        "value",
+        "script_hex",
+        "script_asm",
+        "req_sigs",
+        "txinwitness",
+    )
+
     def __init__(self):
         self.index: Optional[int] = None
         self.txhash: Optional[str] = None
@@ -27,6 +27,25 @@ from bitcoinetl.domain.transaction_output import BtcTransactionOutput
 
 # https://bitcoin.org/en/developer-reference#raw-transaction-format
 class BtcTransaction(object):
+    __slots__ = (
+        "hash",
+        "size",
+        "vsize",
+        "weight",
+        "version",
+        "locktime",
+        "block_number",
+        "block_hash",
+        "block_timestamp",
+        "is_coinbase",
+        "index",
+        "hex",
+        "inputs",
+        "outputs",
+        "join_splits",
+        "value_balance",
+    )
+
     def __init__(self):
         # https://bitcoin.stackexchange.com/questions/77699/whats-the-difference-between-txid-and-hash-getrawtransaction-bitcoind
         self.hash: Optional[str] = None
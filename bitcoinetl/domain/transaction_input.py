@@ -24,6 +24,22 @@ from typing import Optional, List
 
 
 class BtcTransactionInput(object):
+    __slots__ = (
+        "index",
+        "spent_transaction_hash",
+        "spent_output_index",
+        "spent_output_count",
+        "script_asm",
+        "script_hex",
+        "coinbase_param",
+        "sequence",
+        "req_sigs",
+        "type",
+        "addresses",
+        "txinwitness",
+        "value",
+    )
+
     def __init__(self):
         self.index: int = 0
         self.spent_transaction_hash: Optional[str] = None
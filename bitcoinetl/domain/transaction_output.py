@@ -24,6 +24,17 @@ from typing import Optional, List
 
 
 class BtcTransactionOutput(object):
+    __slots__ = (
+        "index",
+        "script_asm",
+        "script_hex",
+        "req_sigs",
+        "type",
+        "addresses",
+        "txinwitness",
+        "value",
+    )
+
     def __init__(self):
         self.index: int = 0
         self.script_asm: Optional[str] = None
@@ -20,7 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.executors.batch_work_executor import BatchWorkExecutor
 from blockchainetl.jobs.base_job import BaseJob
@@ -30,6 +30,7 @@ from bitcoinetl.domain.transaction import BtcTransaction
 from bitcoinetl.domain.transaction_input import BtcTransactionInput
 from bitcoinetl.mappers.transaction_mapper import BtcTransactionMapper
 from bitcoinetl.service.btc_service import BtcService
+from bitcoinetl.service.utxo_index import UtxoIndex
 
 # Add required_signatures, type, addresses, and value to transaction inputs
 class EnrichTransactionsJob(BaseJob):
@@ -41,9 +42,11 @@ class EnrichTransactionsJob(BaseJob):
         max_workers,
         item_exporter,
         chain=Chain.BITCOIN,
+        utxo_index: Optional[UtxoIndex] = None,
     ):
         self.transactions_iterable = transactions_iterable
         self.btc_service = BtcService(bitcoin_rpc, chain)
+        self.utxo_index = utxo_index
 
         self.batch_size = batch_size
         self.batch_work_executor = BatchWorkExecutor(
@@ -70,6 +73,10 @@ class EnrichTransactionsJob(BaseJob):
         all_inputs = [transaction.inputs for transaction in transactions]
         flat_inputs = [input for inputs in all_inputs for input in inputs]
 
+        # the outputs found in the local index are not requested from the node
+        if self.utxo_index is not None:
+            flat_inputs = self._enrich_inputs_from_index(flat_inputs)
+
         for batch in dynamic_batch_iterator(flat_inputs, lambda: self.batch_size):
             input_txs = self._get_input_transactions_as_map(batch)
             for input in batch:
@@ -92,6 +99,33 @@ class EnrichTransactionsJob(BaseJob):
                 self.transaction_mapper.transaction_to_dict(transaction)
             )
 
+    def _enrich_inputs_from_index(
+        self, tx_inputs: List[BtcTransactionInput]
+    ) -> List[BtcTransactionInput]:
+        """Enriches the inputs by the local index, returns the ones not found."""
+        outputs = self.utxo_index.get(
+            (input.spent_transaction_hash, input.spent_output_index or 0)
+            for input in tx_inputs
+            if input.spent_transaction_hash is not None
+        )
+
+        missing = []
+        for input in tx_inputs:
+            if input.spent_transaction_hash is None:
+                continue
+            output = outputs.get(
+                (input.spent_transaction_hash, input.spent_output_index or 0)
+            )
+            if output is None:
+                missing.append(input)
+                continue
+            input.req_sigs = output.req_sigs
+            input.type = output.type
+            input.addresses = output.addresses
+            input.value = output.value
+            input.spent_output_count = output.vout_cnt
+        return missing
+
     def _get_input_transactions_as_map(
         self, tx_inputs: List[BtcTransactionInput]
     ) -> Dict[str, BtcTransaction]:
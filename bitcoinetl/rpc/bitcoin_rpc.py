@@ -22,13 +22,13 @@
 
 import os
 import logging
-import decimal
 import json
 import hashlib
 from copy import copy
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import diskcache as dc
 
+from blockchainetl.misc.json_decoder import decode_rpc_response
 from bitcoinetl.rpc.request import make_jsonrpc_request
 
 
@@ -65,13 +65,7 @@ class BitcoinRpc:
 
             result.append(cache_or_none)
 
-        raw_response = make_jsonrpc_request(
-            self.provider_uri,
-            rpc_calls,
-            timeout=self.timeout,
-        )
-
-        response = self._decode_rpc_response(raw_response)
+        response = self._make_request(rpc_calls)
 
         for id, r in enumerate(result):
             if r is not None:
@@ -102,9 +96,17 @@ class BitcoinRpc:
         response = self.batch([["getblockcount"]], skip_cache=True)
         return response[0] if len(response) > 0 else None
 
+    def _make_request(self, rpc_calls: List[Dict]) -> List[Dict]:
+        raw_response = make_jsonrpc_request(
+            self.provider_uri,
+            rpc_calls,
+            timeout=self.timeout,
+        )
+        return self._decode_rpc_response(raw_response)
+
     def _decode_rpc_response(self, response):
-        response_text = response.decode("utf-8")
-        return json.loads(response_text, parse_float=decimal.Decimal)
+        # the amounts are parsed as Decimal, to keep the exact satoshis
+        return decode_rpc_response(response, use_decimal=True)
 
     def _cache_key(self, req: Dict):
         req1 = copy(req)
@@ -0,0 +1,35 @@
+from typing import List, Dict
+
+from blockchainetl.endpoint_router import EndpointRouter
+from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
+from bitcoinetl.rpc.request import make_jsonrpc_request
+
+
+# Drop-in replacement of BitcoinRpc which is backed by several endpoints,
+# each batch is routed to the healthiest one, see EndpointRouter for more detail.
+class MultiBitcoinRpc(BitcoinRpc):
+    def __init__(
+        self, provider_uris: List[str], timeout=60, cache_path=None, **router_kwargs
+    ):
+        BitcoinRpc.__init__(self, provider_uris[0], timeout, cache_path)
+        self.provider_uris = provider_uris
+        self.router = EndpointRouter(
+            provider_uris, head_fetcher=self._get_head_block, **router_kwargs
+        )
+
+    def _make_request(self, rpc_calls: List[Dict]) -> List[Dict]:
+        return self.router.call(
+            lambda uri: self._decode_rpc_response(
+                make_jsonrpc_request(uri, rpc_calls, timeout=self.timeout)
+            )
+        )
+
+    def close(self):
+        self.router.shutdown()
+
+    def _get_head_block(self, uri: str) -> int:
+        rpc_calls = [
+            {"jsonrpc": "2.0", "method": "getblockcount", "params": [], "id": 0}
+        ]
+        raw_response = make_jsonrpc_request(uri, rpc_calls, timeout=self.timeout)
+        return self._decode_rpc_response(raw_response)[0]["result"]
@@ -0,0 +1,219 @@
+"""A local index of the unspent outputs, used to enrich the transaction inputs.
+
+The outputs are keyed by (txid, vout), with the fields copied into the inputs
+spending them: value, type, address, req_sigs and the output count of the
+transaction. The index is a SQLite database in WAL mode, so the readers of the
+other threads and processes don't block the writer, and the file is memory-mapped.
+
+The outputs are added as the blocks are exported and deleted once they are spent,
+so the index holds the UTXO set only. A missing output(eg: spent by an orphaned
+block, or the index was bootstrapped partially) is not an error, the callers fall
+back to the node or database as before.
+
+The addresses are stored as the `address` column of the traces, joined with ";".
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+# the outputs of OP_RETURN can't be spent
+UNSPENDABLE_TYPES = ("nulldata",)
+
+# the max #host parameters of SQLite is 999 before 3.32
+MAX_KEYS_PER_QUERY = 400
+
+MMAP_SIZE = 1 << 30
+BUSY_TIMEOUT_MS = 60 * 1000
+
+UtxoKey = Tuple[str, int]
+
+SQL_CREATE = """
+CREATE TABLE IF NOT EXISTS utxo (
+    txid BLOB NOT NULL,
+    vout INTEGER NOT NULL,
+    value INTEGER,
+    type TEXT,
+    address TEXT,
+    req_sigs INTEGER,
+    vout_cnt INTEGER,
+    PRIMARY KEY (txid, vout)
+) WITHOUT ROWID
+"""
+
+
+class UtxoOutput(NamedTuple):
+    value: Optional[int]
+    type: Optional[str]
+    address: Optional[str]
+    req_sigs: Optional[int]
+    vout_cnt: Optional[int]
+
+    @property
+    def addresses(self) -> Optional[List[str]]:
+        if self.address is None:
+            return None
+        if self.address == "":
+            return []
+        return self.address.split(";")
+
+
+def join_addresses(addresses: Optional[List[str]]) -> Optional[str]:
+    if addresses is None:
+        return None
+    return ";".join(addresses)
+
+
+class UtxoIndex(object):
+    def __init__(self, path: str):
+        self.path = path
+        dirname = os.path.dirname(path)
+        if dirname != "":
+            os.makedirs(dirname, exist_ok=True)
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(SQL_CREATE)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+            self._local.conn = conn
+        return conn
+
+    def __getstate__(self):
+        # the connections are per thread and process, reconnect after unpickling
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.path = state["path"]
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def get(self, keys: Iterable[UtxoKey]) -> Dict[UtxoKey, UtxoOutput]:
+        keys = list(set(keys))
+        conn = self._conn()
+        result: Dict[UtxoKey, UtxoOutput] = dict()
+        for i in range(0, len(keys), MAX_KEYS_PER_QUERY):
+            chunk = keys[i : i + MAX_KEYS_PER_QUERY]
+            params = [e for txid, vout in chunk for e in (bytes.fromhex(txid), vout)]
+            rows = conn.execute(
+                "SELECT txid, vout, value, type, address, req_sigs, vout_cnt "
+                "FROM utxo WHERE (txid, vout) IN "
+                f"(VALUES {','.join(['(?,?)'] * len(chunk))})",
+                params,
+            )
+            for row in rows:
+                result[(row[0].hex(), row[1])] = UtxoOutput(*row[2:])
+        return result
+
+    def update(
+        self,
+        outputs: Iterable[Tuple[UtxoKey, UtxoOutput]],
+        spent: Iterable[UtxoKey],
+    ) -> Tuple[int, int]:
+        """Adds the outputs then deletes the spent ones, in one transaction.
+
+        The outputs created and spent in the same call are not left in the index,
+        returns the #added outputs and #deleted outputs.
+        """
+        added = [
+            (bytes.fromhex(txid), vout, *output)
+            for (txid, vout), output in outputs
+            if output.type not in UNSPENDABLE_TYPES
+        ]
+        deleted = [(bytes.fromhex(txid), vout) for txid, vout in spent]
+
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO utxo VALUES (?, ?, ?, ?, ?, ?, ?)", added
+            )
+            cursor = conn.executemany(
+                "DELETE FROM utxo WHERE txid = ? AND vout = ?", deleted
+            )
+            return len(added), cursor.rowcount
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __repr__(self) -> str:
+        return f"UtxoIndex({self.path})"
+
+
+def outputs_of_transactions(
+    transactions: Iterable[Dict],
+) -> List[Tuple[UtxoKey, UtxoOutput]]:
+    outputs = []
+    for transaction in transactions:
+        vout_cnt = len(transaction["outputs"])
+        for output in transaction["outputs"]:
+            outputs.append(
+                (
+                    (transaction["hash"], output["index"]),
+                    UtxoOutput(
+                        output["value"],
+                        output["type"],
+                        join_addresses(output["addresses"]),
+                        output["req_sigs"],
+                        vout_cnt,
+                    ),
+                )
+            )
+    return outputs
+
+
+def spent_of_transactions(transactions: Iterable[Dict]) -> List[UtxoKey]:
+    return [
+        (input["spent_transaction_hash"], input["spent_output_index"] or 0)
+        for transaction in transactions
+        for input in transaction["inputs"]
+        if input["spent_transaction_hash"] is not None
+    ]
+
+
+def _int_or_none(value) -> Optional[int]:
+    return None if pd.isna(value) else int(value)
+
+
+def _str_or_none(value) -> Optional[str]:
+    return None if pd.isna(value) else str(value)
+
+
+def outputs_of_traces(df: pd.DataFrame) -> List[Tuple[UtxoKey, UtxoOutput]]:
+    """Returns the outputs of the trace rows(the CSV files of EntityType.TRACE)."""
+    return [
+        (
+            (row.txhash, int(row.vout_idx)),
+            UtxoOutput(
+                _int_or_none(row.value),
+                _str_or_none(row.vout_type),
+                _str_or_none(row.address),
+                _int_or_none(row.req_sigs),
+                _int_or_none(row.vout_cnt),
+            ),
+        )
+        for row in df.loc[df["isin"] == False].itertuples()
+    ]
+
+
+def spent_of_traces(df: pd.DataFrame) -> List[UtxoKey]:
+    return [
+        (row.pxhash, int(row.vout_idx))
+        for row in df.loc[df["isin"] == True].itertuples()
+        if not pd.isna(row.pxhash)
+    ]
@@ -2,23 +2,16 @@ import logging
 from time import time
 from datetime import datetime
 from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
-from sqlalchemy.future import select
-from sqlalchemy.sql.expression import desc
 
 
 import pandas as pd
-from typing import Optional, Callable, Dict, List, NamedTuple
-import concurrent.futures
-from loky import get_reusable_executor
+from typing import Optional
 
 
 from jinja2 import Template
-from blockchainetl.utils import time_elapsed, dynamic_batch_iterator
-from blockchainetl.misc.sqlalchemy_extra import (
-    sqlalchemy_engine_builder,
-    execute_in_threadpool,
-)
+from blockchainetl.utils import time_elapsed
+from blockchainetl.misc.sqlalchemy_extra import sqlalchemy_engine_builder
+from blockchainetl.service.previous_balance_service import PreviousBalanceService
 from blockchainetl.enumeration.chain import Chain
 from bitcoinetl.streaming.postgres_tables import HISTORY_BALANCES as T
 from blockchainetl.enumeration.entity_type import EntityType
@@ -197,6 +190,16 @@ class BtcBalanceAdapter:
     def open(self):
         self.item_exporter.open()
 
+        self.history_db_engine = None
+        self.previous_balance_service = None
+        if self._should_export(EntityType.HISTORY_BALANCE):
+            self.history_db_engine = sqlalchemy_engine_builder(
+                self.target_db_url, self.target_dbschema
+            )(self.max_workers, 0)
+            self.previous_balance_service = PreviousBalanceService(
+                self.history_db_engine, T, max_workers=self.max_workers
+            )
+
     def get_current_block_number(self) -> int:
         current_block = self.bitcoin_service.bitcoin_rpc.getblockcount()
         if current_block is None:
@@ -265,23 +268,13 @@ class BtcBalanceAdapter:
         return pd.read_sql(sql, con=self.db_engine)
 
     def _cumsum_last_balances(self, df: pd.DataFrame) -> pd.DataFrame:
-        executor = get_reusable_executor(max_workers=self.max_workers, timeout=60)
-        futures = []
-
-        enginer = sqlalchemy_engine_builder(self.target_db_url, self.target_dbschema)
-        for chunk in dynamic_batch_iterator(
-            df.itertuples(index=False, name="Balance"), lambda: 1000
-        ):
-            f = executor.submit(execute, enginer, chunk)
-            futures.append(f)
-
-        old_balances = []
-        for f in concurrent.futures.as_completed(futures):
-            exception = f.exception()
-            if exception:
-                logging.error(exception)
-                raise Exception(exception)
-            old_balances.extend(f.result())
+        assert self.previous_balance_service is not None
+
+        keys = [
+            {"address": address, "blknum": int(blknum)}
+            for address, blknum in zip(df["address"], df["blknum"])
+        ]
+        old_balances = self.previous_balance_service.get_previous_balances(keys)
 
         if len(old_balances) == 0:
             return df
@@ -314,28 +307,5 @@ class BtcBalanceAdapter:
 
     def close(self):
         self.item_exporter.close()
-
-
-class Balance(NamedTuple):
-    address: str
-    blknum: int
-
-
-def execute(enginer: Callable[[int, int], Engine], items: List[Dict]) -> List[Dict]:
-    def _exec(engine: Engine, chunk: List[Balance]) -> Dict:
-        row = chunk[0]
-        with engine.connect() as conn:
-            query = (
-                select(T)
-                .where((T.c.address == row.address) & (T.c.blknum <= row.blknum))
-                .order_by(desc(T.c.blknum))
-                .limit(1)
-            )
-            r = conn.execute(query).fetchone()
-            if r is not None:
-                return r._asdict()
-            return None
-
-    result = execute_in_threadpool(enginer, _exec, items, batch_size=1)
-    result = [e for e in result if e is not None]
-    return result
+        if self.history_db_engine is not None:
+            self.history_db_engine.dispose()
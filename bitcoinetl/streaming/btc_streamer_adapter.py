@@ -23,7 +23,9 @@
 
 import logging
 from time import time
+from typing import List, Dict, Optional
 
+from blockchainetl import env
 from blockchainetl.utils import time_elapsed
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType
@@ -31,6 +33,11 @@ from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 from bitcoinetl.jobs.enrich_transactions_job import EnrichTransactionsJob
 from bitcoinetl.jobs.extract_traces_job import ExtractTracesJob
 from bitcoinetl.jobs.export_blocks_job import ExportBlocksJob
+from bitcoinetl.service.utxo_index import (
+    UtxoIndex,
+    outputs_of_transactions,
+    spent_of_transactions,
+)
 from bitcoinetl.streaming.btc_item_id_calculator import BtcItemIdCalculator
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
@@ -47,6 +54,7 @@ class BtcStreamerAdapter:
         max_workers=5,
         entity_types=tuple(EntityType.ALL_FOR_ETL),
         cache_path=None,
+        utxo_index: Optional[UtxoIndex] = None,
     ):
         self.bitcoin_rpc = bitcoin_rpc
         self.chain = chain
@@ -57,6 +65,10 @@ class BtcStreamerAdapter:
         self.entity_types = entity_types
         self.item_id_calculator = BtcItemIdCalculator()
         self.cache_path = cache_path
+        # enrich the inputs by the local UTXO index, if it's built
+        if utxo_index is None and env.BTC_UTXO_INDEX_PATH is not None:
+            utxo_index = UtxoIndex(env.BTC_UTXO_INDEX_PATH)
+        self.utxo_index = utxo_index
 
     def open(self):
         self.item_exporter.open()
@@ -69,9 +81,24 @@ class BtcStreamerAdapter:
 
     def export_all(self, start_block: int, end_block: int):
         st0 = time()
-        blocks, transactions = self._export_blocks(start_block, end_block)
+        all_items = self.extract_items(start_block, end_block)
 
         st1 = time()
+        self.export_items(all_items)
+        if len(all_items) > 1024:
+            st2 = time()
+            logging.info(
+                f"PERF export blocks=({start_block}, {end_block}) size={len(all_items)} "
+                f"total-elapsed={time_elapsed(st0, st2)} extract-elapsed={time_elapsed(st0, st1)} "
+                f"export-elapsed={time_elapsed(st1, st2)}"
+            )
+
+    def export_items(self, items: List[Dict]):
+        self.item_exporter.export_items(items)
+
+    def extract_items(self, start_block: int, end_block: int) -> List[Dict]:
+        blocks, transactions = self._export_blocks(start_block, end_block)
+
         if self.enable_enrich:
             transactions = self._enrich_transactions(transactions)
 
@@ -86,18 +113,8 @@ class BtcStreamerAdapter:
             transactions = []
 
         all_items = blocks + transactions + traces
-
-        st2 = time()
         self.calculate_item_ids(all_items)
-
-        self.item_exporter.export_items(all_items)
-        if len(all_items) > 1024:
-            st3 = time()
-            logging.info(
-                f"PERF export blocks=({start_block}, {end_block}) size={len(all_items)} "
-                f"total-elapsed={time_elapsed(st0, st3)} extract-elapsed={time_elapsed(st1, st2)} "
-                f"export-elapsed={time_elapsed(st2, st3)}"
-            )
+        return all_items
 
     def _export_blocks(self, start_block: int, end_block: int):
         # Export blocks and transactions
@@ -123,6 +140,10 @@ class BtcStreamerAdapter:
         return blocks, transactions
 
     def _enrich_transactions(self, transactions):
+        # the outputs spent in the same block range are looked up from the index too
+        if self.utxo_index is not None:
+            self.utxo_index.update(outputs_of_transactions(transactions), [])
+
         exporter = InMemoryItemExporter(item_types=[EntityType.TRANSACTION])
 
         job = EnrichTransactionsJob(
@@ -132,11 +153,15 @@ class BtcStreamerAdapter:
             max_workers=self.max_workers,
             item_exporter=exporter,
             chain=self.chain,
+            utxo_index=self.utxo_index,
         )
         job.run()
         enriched_transactions = exporter.get_items(EntityType.TRANSACTION)
         if len(enriched_transactions) != len(transactions):
             raise ValueError("The number of transactions is wrong " + str(transactions))
+
+        if self.utxo_index is not None:
+            self.utxo_index.update([], spent_of_transactions(transactions))
         return enriched_transactions
 
     def _extract_traces(self, transactions):
@@ -159,3 +184,9 @@ class BtcStreamerAdapter:
 
     def close(self):
         self.item_exporter.close()
+        if self.utxo_index is not None:
+            self.utxo_index.close()
+        # eg: the hedging threads of MultiBitcoinRpc
+        close = getattr(self.bitcoin_rpc, "close", None)
+        if close is not None:
+            close()
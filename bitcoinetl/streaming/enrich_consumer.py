@@ -2,14 +2,20 @@ import os
 import redis
 import logging
 from time import time, sleep
-from typing import Dict
+from typing import Dict, Optional
 import pandas as pd
 from sqlalchemy import create_engine
 
+from blockchainetl import env
 from blockchainetl.enumeration.entity_type import EntityType
 from bitcoinetl.enumeration.column_type import ColumnType as BtcColumnType
 from blockchainetl.misc.pd_write_file import DEFAULT_FIELD_TERMINATED, save_df_into_file
 from blockchainetl.service.redis_stream_service import RED_UNIQUE_STREAM_SCRIPT
+from bitcoinetl.service.utxo_index import (
+    UtxoIndex,
+    outputs_of_traces,
+    spent_of_traces,
+)
 
 
 SQL_TEMP = """
@@ -33,6 +39,7 @@ class BitcoinTraceEnrichConsumer(object):
         src_result: str,
         dst_result: str,
         output_path: str,
+        utxo_index: Optional[UtxoIndex] = None,
     ):
         self._ti_engine = create_engine(ti_url)
         self._red = redis.from_url(redis_url)
@@ -45,6 +52,11 @@ class BitcoinTraceEnrichConsumer(object):
         self._dst_result = dst_result
         self._output_path = output_path
 
+        # read the spent outputs from the local UTXO index first, if it's built
+        if utxo_index is None and env.BTC_UTXO_INDEX_PATH is not None:
+            utxo_index = UtxoIndex(env.BTC_UTXO_INDEX_PATH)
+        self._utxo_index = utxo_index
+
     def fetch(self, row) -> str:
         result = self._ti_engine.execute(
             self._sql_temp,
@@ -60,6 +72,31 @@ class BitcoinTraceEnrichConsumer(object):
 
         return result[0]
 
+    def fetch_all(self, df: pd.DataFrame) -> pd.Series:
+        """Fetches the spent outputs of the input rows, from the local index if
+        possible, the missing ones from tidb one by one."""
+        if self._utxo_index is None:
+            return df.apply(self.fetch, axis=1)
+
+        indexed = self._utxo_index.get(
+            (row.pxhash, int(row.vout_idx))
+            for row in df.itertuples()
+            if not pd.isna(row.pxhash)
+        )
+
+        def fetch(row) -> str:
+            output = None
+            if not pd.isna(row["pxhash"]):
+                output = indexed.get((row["pxhash"], int(row["vout_idx"])))
+            if output is None:
+                return self.fetch(row)
+            return "^".join(
+                "" if e is None else str(e)
+                for e in (output.vout_cnt, output.type, output.address, output.value)
+            )
+
+        return df.apply(fetch, axis=1)
+
     def handler(self, inited, st: float, keyvals: Dict):
         inited = inited
         blknum = list(keyvals.keys())[0].decode()
@@ -91,10 +128,14 @@ class BitcoinTraceEnrichConsumer(object):
 
         pxhash_len = df.loc[df["isin"] == True].shape[0]
 
+        # the outputs spent in the same block are looked up from the index too
+        if self._utxo_index is not None:
+            self._utxo_index.update(outputs_of_traces(df), [])
+
         st1 = time()
         if pxhash_len > 0:
-            df.loc[df["isin"] == True, "_out"] = df.loc[df["isin"] == True].apply(
-                self.fetch, axis=1
+            df.loc[df["isin"] == True, "_out"] = self.fetch_all(
+                df.loc[df["isin"] == True]
             )
 
             st2 = time()
@@ -148,6 +189,10 @@ class BitcoinTraceEnrichConsumer(object):
             entity_type=EntityType.TRACE,
         )
 
+        # the block may be handled again if it's not acked, prune after it's saved
+        if self._utxo_index is not None:
+            self._utxo_index.update([], spent_of_traces(df))
+
         st4 = time()
         self._red.evalsha(
             self._sha,
@@ -165,3 +210,5 @@ class BitcoinTraceEnrichConsumer(object):
 
     def close(self):
         self._ti_engine.dispose()
+        if self._utxo_index is not None:
+            self._utxo_index.close()
@@ -1,6 +1,9 @@
-from typing import NamedTuple, Optional, Dict, List, Set
+from typing import NamedTuple, Optional, Dict, List, Set, Union
 import rule_engine
 
+from blockchainetl import env
+from .rule_compiler import CompiledRule, compile_rule
+from .rule_vectorizer import VectorizedRule, vectorize_rule
 
 from .rule_scope import RuleScope
 from .rule_label import RuleLabel
@@ -18,9 +21,10 @@ class Rule(NamedTuple):
     plugin: Optional[str] = None
     output: RuleOutput = RuleOutput()
     labels: RuleLabel = RuleLabel()
-    rule: Optional[rule_engine.Rule] = None
+    rule: Optional[Union[rule_engine.Rule, CompiledRule]] = None
     receivers: Set[str] = set()
     enabled: bool = True
+    vectorized: Optional[VectorizedRule] = None
 
     def filter(self, items: Dict[str, List]) -> List:
         assert self.rule is not None
@@ -32,12 +36,17 @@ class Rule(NamedTuple):
         todo = items.get(self.scope)
         if todo is None:
             return []
+        if self.vectorized is not None:
+            return self.vectorized.filter(todo)
         return list(self.rule.filter(todo))
 
     @classmethod
     def load(cls, chain: str, provider: Optional[Dict], yaml_dict: Dict):
         context = rule_engine.Context(default_value=None)
         rule = rule_engine.Rule(yaml_dict["where"], context=context)
+        if env.ALERT_COMPILE_RULES:
+            rule = compile_rule(rule)
+        vectorized = vectorize_rule(rule) if env.ALERT_VECTORIZE_RULES else None
         output = RuleOutput(yaml_dict.get("output"))
         condition = None
         if "condition" in yaml_dict:
@@ -63,6 +72,7 @@ class Rule(NamedTuple):
             receivers=receivers,
             rule=rule,
             enabled=yaml_dict.get("enabled", True),
+            vectorized=vectorized,
         )
 
     def to_dict(self) -> Dict:
@@ -0,0 +1,734 @@
+"""Compiles the AST of rule_engine.Rule into nested Python closures.
+
+rule_engine evaluates a rule by walking its AST for each item, every symbol is
+resolved through Context.resolve(with the thread-local assignment scopes) and every
+value is coerced into the rule engine's types, eg: `tx.value` coerces the whole
+`tx` dict before the member is read.
+
+The compiled rule evaluates the same(already reduced/constant-folded by the parser)
+AST with one closure per node:
+
+- the members of the plain dicts are read directly, only the read values are coerced,
+  the missing ones fall back to the interpreter's code path for the same errors
+- the comprehension variables are bound lexically(uncoerced) instead of by the
+  assignment scopes
+- the comparisons with a literal, and the `in` with a literal array/set are specialised
+- the regexes are compiled once, as the interpreter does for the literal patterns
+
+The results and the EvaluationError(s) raised are the same as rule_engine.Rule's,
+the rules with a customised Context are not compiled.
+"""
+
+import decimal
+import datetime
+import operator
+import collections
+import collections.abc
+from typing import Callable, Dict, FrozenSet, NamedTuple, Optional, Tuple, Union
+
+import rule_engine
+from rule_engine import ast, errors
+from rule_engine.engine import Context, Builtins, resolve_item, _AttributeResolver
+from rule_engine.suggestions import suggest_symbol
+from rule_engine.types import DataType, coerce_value
+
+Evaluator = Callable[[object, Optional[Dict]], object]
+
+_MISSING = object()
+_PLAIN_DICTS = (dict, collections.OrderedDict)
+_SCALARS = (str, decimal.Decimal, bool, type(None))
+
+# the names which may be resolved as attributes(eg: `length`) rather than items
+ATTRIBUTE_NAMES: FrozenSet[str] = frozenset(
+    name
+    for resolvers in _AttributeResolver.attribute.type_map.values()
+    for name in resolvers
+)
+
+
+class FieldPath(NamedTuple):
+    # the symbol and the member names, eg: ("tx", "to_address")
+    names: Tuple[str, ...]
+    # the members accessed by `&.`
+    safe: Tuple[bool, ...]
+
+
+def is_scalar_literal(node) -> bool:
+    return isinstance(
+        node,
+        (
+            ast.StringExpression,
+            ast.FloatExpression,
+            ast.BooleanExpression,
+            ast.NullExpression,
+        ),
+    )
+
+
+def field_path(node) -> Optional[FieldPath]:
+    """Returns the path if the node reads a chain of members of a symbol."""
+    names, safe = [], []
+    while isinstance(node, ast.GetAttributeExpression):
+        if node.name in ATTRIBUTE_NAMES:
+            return None
+        names.append(node.name)
+        safe.append(node.safe)
+        node = node.object
+    if not (
+        isinstance(node, ast.SymbolExpression)
+        and node.scope is None
+        and node.result_type == DataType.UNDEFINED
+    ):
+        return None
+    names.append(node.name)
+    safe.append(False)
+    return FieldPath(tuple(reversed(names)), tuple(reversed(safe)))
+
+
+class NotCompilableError(Exception):
+    pass
+
+
+class CompiledRule(object):
+    """Has the same filter/matches/evaluate of rule_engine.Rule."""
+
+    def __init__(self, rule: rule_engine.Rule):
+        self.rule = rule
+        self.text = rule.text
+        self.context = rule.context
+        self.statement = rule.statement
+        compiler = _Compiler(rule.context)
+        self._evaluate = compiler.compile(rule.statement.expression, frozenset())
+        self._uses_regex_groups = compiler.uses_regex_groups
+
+    def __repr__(self):
+        return "<{0} text={1!r} >".format(self.__class__.__name__, self.text)
+
+    def __str__(self):
+        return self.text
+
+    def filter(self, things):
+        # don't yield inside the decimal context, it's a thread-wide setting
+        with decimal.localcontext(self.context.decimal_context):
+            matched = [thing for thing in things if self._matches(thing)]
+        yield from matched
+
+    def evaluate(self, thing):
+        with decimal.localcontext(self.context.decimal_context):
+            return self._evaluate_one(thing)
+
+    def matches(self, thing):
+        return bool(self.evaluate(thing))
+
+    def _matches(self, thing):
+        return bool(self._evaluate_one(thing))
+
+    def _evaluate_one(self, thing):
+        if self._uses_regex_groups:
+            self.context._tls.reset()
+        return self._evaluate(thing, None)
+
+
+def compile_rule(
+    rule: rule_engine.Rule,
+) -> Union[CompiledRule, rule_engine.Rule]:
+    """Returns the compiled rule, or the rule itself if it can't be compiled."""
+    if not _is_standard_context(rule.context):
+        return rule
+    try:
+        return CompiledRule(rule)
+    except NotCompilableError:
+        return rule
+
+
+def _is_standard_context(context) -> bool:
+    return (
+        type(context).resolve is Context.resolve
+        and type(context).resolve_attribute is Context.resolve_attribute
+        and context._Context__resolver is resolve_item
+    )
+
+
+def _bind(env: Optional[Dict], name: str, value) -> Dict:
+    env = dict(env or ())
+    # the outer comprehension's variable wins, the same as Context.resolve
+    env.setdefault(name, value)
+    return env
+
+
+class _Compiler(object):
+    def __init__(self, context):
+        self.context = context
+        self.default_value = context.default_value
+        self.timezone = context.default_timezone
+        self.uses_regex_groups = False
+
+    def new_value(self, value):
+        if type(value) in _SCALARS:
+            return value
+        value = coerce_value(value, verify_type=False)
+        if isinstance(value, datetime.datetime) and value.tzinfo is None:
+            value = value.replace(tzinfo=self.timezone)
+        return value
+
+    def compile(self, node, bound: FrozenSet[str]) -> Evaluator:
+        method = getattr(self, "_compile_" + node.__class__.__name__, None)
+        if method is None:
+            raise NotCompilableError(node.__class__.__name__)
+        return method(node, bound)
+
+    def compile_raw(self, node, bound: FrozenSet[str]) -> Evaluator:
+        """Returns the evaluator of the uncoerced value if it's possible."""
+        if isinstance(node, ast.SymbolExpression) and self._is_plain_symbol(
+            node, bound
+        ):
+            return self._raw_symbol(node)
+        if (
+            isinstance(node, ast.SymbolExpression)
+            and node.scope is None
+            and node.name in bound
+            and node.result_type == DataType.UNDEFINED
+        ):
+            # the comprehension variables are bound uncoerced
+            name = node.name
+            return lambda thing, env: env[name]
+        if (
+            isinstance(node, ast.GetAttributeExpression)
+            and node.name not in ATTRIBUTE_NAMES
+            and node.name not in bound
+        ):
+            return self._raw_get_attribute(node, bound)
+        return self.compile(node, bound)
+
+    # literals
+    def _compile_literal(self, node, bound):
+        value = node.value
+        return lambda thing, env: value
+
+    _compile_BooleanExpression = _compile_literal
+    _compile_DatetimeExpression = _compile_literal
+    _compile_FloatExpression = _compile_literal
+    _compile_NullExpression = _compile_literal
+    _compile_StringExpression = _compile_literal
+
+    def _compile_ArrayExpression(self, node, bound):
+        if node.is_reduced:
+            value = node.evaluate(None)
+            return lambda thing, env: value
+        members = [self.compile(e, bound) for e in node.value]
+        return lambda thing, env: tuple(m(thing, env) for m in members)
+
+    def _compile_SetExpression(self, node, bound):
+        if node.is_reduced:
+            value = node.evaluate(None)
+            return lambda thing, env: set(value)
+        members = [self.compile(e, bound) for e in node.value]
+        return lambda thing, env: set(m(thing, env) for m in members)
+
+    def _compile_MappingExpression(self, node, bound):
+        items = [
+            (self.compile(k, bound), self.compile(v, bound)) for k, v in node.value
+        ]
+
+        def evaluate(thing, env):
+            mapping = collections.OrderedDict()
+            for key_evaluator, value_evaluator in items:
+                key = key_evaluator(thing, env)
+                key_type = DataType.from_value(key)
+                if key_type.is_compound and not isinstance(
+                    key_type, DataType.ARRAY.__class__
+                ):
+                    raise errors.EngineError(
+                        "the {} data type may not be used for mapping keys".format(
+                            key_type.name
+                        )
+                    )
+                mapping[key] = value_evaluator
+            # defer value evaluation to avoid evaluating values of duplicate keys
+            for key, value_evaluator in mapping.items():
+                mapping[key] = value_evaluator(thing, env)
+            return mapping
+
+        return evaluate
+
+    # symbols and members
+    def _is_plain_symbol(self, node, bound) -> bool:
+        return (
+            node.scope is None
+            and node.name not in bound
+            and node.result_type == DataType.UNDEFINED
+        )
+
+    def _raw_symbol(self, node):
+        name = node.name
+        default_value = self.default_value
+
+        def evaluate(thing, env):
+            if type(thing) in _PLAIN_DICTS:
+                value = thing.get(name, _MISSING)
+                if value is not _MISSING:
+                    return value
+                if default_value is not errors.UNDEFINED:
+                    return default_value
+            try:
+                return resolve_item(thing, name)
+            except errors.SymbolResolutionError:
+                if default_value is errors.UNDEFINED:
+                    raise
+                return default_value
+
+        return evaluate
+
+    def _compile_SymbolExpression(self, node, bound):
+        if self._is_plain_symbol(node, bound):
+            raw = self._raw_symbol(node)
+            new_value = self.new_value
+            return lambda thing, env: new_value(raw(thing, env))
+
+        name, scope = node.name, node.scope
+        context = self.context
+        default_value = self.default_value
+        if scope == Builtins.scope_name and name == "re_groups":
+            self.uses_regex_groups = True
+
+        def evaluate(thing, env):
+            try:
+                if scope is None and name in bound:
+                    value = env[name]
+                elif scope is None:
+                    value = resolve_item(thing, name)
+                else:
+                    value = context.resolve(thing, name, scope=scope)
+            except errors.SymbolResolutionError:
+                if default_value is errors.UNDEFINED:
+                    raise
+                value = default_value
+            return _check_symbol_type(node, self.new_value(value))
+
+        return evaluate
+
+    def _raw_get_attribute(self, node, bound):
+        name = node.name
+        default_value = self.default_value
+        obj = self.compile_raw(node.object, bound)
+        resolve = self._get_attribute(node, bound)
+        new_value = self.new_value
+
+        def evaluate(thing, env):
+            resolved_obj = obj(thing, env)
+            if type(resolved_obj) in _PLAIN_DICTS:
+                value = resolved_obj.get(name, _MISSING)
+                if value is not _MISSING:
+                    return value
+                if default_value is not errors.UNDEFINED:
+                    return default_value
+            return resolve(thing, env, new_value(resolved_obj))
+
+        return evaluate
+
+    def _compile_GetAttributeExpression(self, node, bound):
+        if node.name not in ATTRIBUTE_NAMES and node.name not in bound:
+            raw = self._raw_get_attribute(node, bound)
+            new_value = self.new_value
+            return lambda thing, env: new_value(raw(thing, env))
+
+        obj = self.compile(node.object, bound)
+        resolve = self._get_attribute(node, bound)
+        return lambda thing, env: resolve(thing, env, obj(thing, env))
+
+    def _get_attribute(self, node, bound):
+        name, safe = node.name, node.safe
+        context = self.context
+        new_value = self.new_value
+
+        def resolve(thing, env, resolved_obj):
+            if resolved_obj is None and safe:
+                return resolved_obj
+
+            attribute_error = None
+            try:
+                value = context.resolve_attribute(thing, resolved_obj, name)
+            except errors.AttributeResolutionError as error:
+                attribute_error = error
+            else:
+                return new_value(value)
+
+            try:
+                if name in bound:
+                    value = env[name]
+                else:
+                    value = resolve_item(resolved_obj, name)
+            except errors.SymbolResolutionError as symbol_error:
+                default_value = context.default_value
+                if default_value is errors.UNDEFINED:
+                    suggestion = attribute_error.suggestion or symbol_error.suggestion
+                    if attribute_error.suggestion and symbol_error.suggestion:
+                        suggestion = suggest_symbol(
+                            name,
+                            (attribute_error.suggestion, symbol_error.suggestion),
+                        )
+                    attribute_error.suggestion = suggestion
+                    raise attribute_error from None
+                value = default_value
+            return new_value(value)
+
+        return resolve
+
+    def _compile_GetItemExpression(self, node, bound):
+        container = self.compile(node.container, bound)
+        item = self.compile(node.item, bound)
+        safe = node.safe
+        new_value = self.new_value
+
+        def evaluate(thing, env):
+            resolved_obj = container(thing, env)
+            if resolved_obj is None:
+                if safe:
+                    return resolved_obj
+                raise errors.EvaluationError("data type mismatch (container is null)")
+
+            resolved_item = item(thing, env)
+            if isinstance(resolved_obj, (str, tuple)):
+                ast._assert_is_integer_number(resolved_item)
+                resolved_item = int(resolved_item)
+            try:
+                value = operator.getitem(resolved_obj, resolved_item)
+            except (IndexError, KeyError):
+                if safe:
+                    return None
+                raise errors.LookupError(resolved_obj, resolved_item)
+            return new_value(value)
+
+        return evaluate
+
+    def _compile_GetSliceExpression(self, node, bound):
+        container = self.compile(node.container, bound)
+        start = self.compile(node.start, bound)
+        stop = self.compile(node.stop, bound)
+        safe = node.safe
+
+        def evaluate(thing, env):
+            resolved_obj = container(thing, env)
+            if resolved_obj is None:
+                if safe:
+                    return resolved_obj
+                raise errors.EvaluationError("data type mismatch")
+
+            resolved_start = start(thing, env)
+            if resolved_start is not None:
+                ast._assert_is_integer_number(resolved_start)
+                resolved_start = int(resolved_start)
+            resolved_stop = stop(thing, env)
+            if resolved_stop is not None:
+                ast._assert_is_integer_number(resolved_stop)
+                resolved_stop = int(resolved_stop)
+            value = operator.getitem(resolved_obj, slice(resolved_start, resolved_stop))
+            return coerce_value(value, verify_type=False)
+
+        return evaluate
+
+    # operators
+    def _compile_LogicExpression(self, node, bound):
+        left = self.compile(node.left, bound)
+        right = self.compile(node.right, bound)
+        if node.type == "and":
+            return lambda thing, env: bool(left(thing, env) and right(thing, env))
+        return lambda thing, env: bool(left(thing, env) or right(thing, env))
+
+    def _compile_ComparisonExpression(self, node, bound):
+        left = self.compile(node.left, bound)
+        is_eq = node.type == "eq"
+        if isinstance(node.right, ast.LiteralExpressionBase) and not isinstance(
+            node.right, (ast.ArrayExpression, ast.SetExpression, ast.MappingExpression)
+        ):
+            value = node.right.value
+            value_type = type(value)
+            if is_eq:
+                return lambda thing, env: _eq_literal(
+                    left(thing, env), value, value_type
+                )
+            return lambda thing, env: not _eq_literal(
+                left(thing, env), value, value_type
+            )
+
+        right = self.compile(node.right, bound)
+
+        def evaluate(thing, env):
+            left_value = left(thing, env)
+            right_value = right(thing, env)
+            if type(left_value) is not type(right_value):
+                return not is_eq
+            if is_eq:
+                return operator.eq(left_value, right_value)
+            return operator.ne(left_value, right_value)
+
+        return evaluate
+
+    def _compile_ArithmeticComparisonExpression(self, node, bound):
+        op = {
+            "ge": operator.ge,
+            "gt": operator.gt,
+            "le": operator.le,
+            "lt": operator.lt,
+        }.get(node.type)
+        if op is None:
+            # eq/ne are inherited from ComparisonExpression
+            return self._compile_ComparisonExpression(node, bound)
+
+        left = self.compile(node.left, bound)
+        if isinstance(node.right, ast.FloatExpression):
+            value = node.right.value
+
+            def evaluate_literal(thing, env):
+                left_value = left(thing, env)
+                if type(left_value) is decimal.Decimal:
+                    return op(left_value, value)
+                return _compare_values(op, left_value, value)
+
+            return evaluate_literal
+
+        right = self.compile(node.right, bound)
+        return lambda thing, env: _compare_values(
+            op, left(thing, env), right(thing, env)
+        )
+
+    def _compile_FuzzyComparisonExpression(self, node, bound):
+        self.uses_regex_groups = True
+        regex_function, modifier = {
+            "eq_fzm": ("match", operator.is_not),
+            "eq_fzs": ("search", operator.is_not),
+            "ne_fzm": ("match", operator.is_),
+            "ne_fzs": ("search", operator.is_),
+        }.get(node.type, (None, None))
+        if regex_function is None:
+            return self._compile_ComparisonExpression(node, bound)
+
+        context = self.context
+        left = self.compile(node.left, bound)
+        literal = getattr(node, "_right", None)
+        right = self.compile(node.right, bound)
+        compile_regex = node._compile_regex
+
+        def evaluate(thing, env):
+            left_value = left(thing, env)
+            if not isinstance(left_value, str) and left_value is not None:
+                raise errors.EvaluationError("data type mismatch")
+            if literal is not None:
+                regex = literal
+            else:
+                regex = right(thing, env)
+                if isinstance(regex, str):
+                    regex = compile_regex(regex)
+                elif regex is not None:
+                    raise errors.EvaluationError("data type mismatch")
+            if left_value is None or regex is None:
+                return not modifier(left_value, regex)
+            match = getattr(regex, regex_function)(left_value)
+            if match is not None:
+                context._tls.regex_groups = coerce_value(match.groups())
+            return modifier(match, None)
+
+        return evaluate
+
+    def _compile_ArithmeticExpression(self, node, bound):
+        op = {
+            "add": operator.add,
+            "sub": operator.sub,
+            "fdiv": operator.floordiv,
+            "tdiv": operator.truediv,
+            "mod": operator.mod,
+            "mul": operator.mul,
+            "pow": operator.pow,
+        }[node.type]
+        left = self.compile(node.left, bound)
+        right = self.compile(node.right, bound)
+
+        def evaluate(thing, env):
+            left_value = left(thing, env)
+            ast._assert_is_numeric(left_value)
+            right_value = right(thing, env)
+            ast._assert_is_numeric(right_value)
+            return op(left_value, right_value)
+
+        return evaluate
+
+    def _compile_BitwiseExpression(self, node, bound):
+        op = {
+            "bwand": operator.and_,
+            "bwor": operator.or_,
+            "bwxor": operator.xor,
+            "bwlsh": operator.lshift,
+            "bwrsh": operator.rshift,
+        }[node.type]
+        left = self.compile(node.left, bound)
+        right = self.compile(node.right, bound)
+
+        def evaluate(thing, env):
+            left_value = left(thing, env)
+            left_type = DataType.from_value(left_value)
+            if left_type == DataType.FLOAT:
+                ast._assert_is_natural_number(left_value)
+                right_value = right(thing, env)
+                ast._assert_is_natural_number(right_value)
+                return coerce_value(op(int(left_value), int(right_value)))
+            elif isinstance(left_type, DataType.SET.__class__):
+                right_value = right(thing, env)
+                if not DataType.is_compatible(
+                    DataType.from_value(right_value), DataType.SET
+                ):
+                    raise errors.EvaluationError("data type mismatch")
+                return op(left_value, right_value)
+            raise errors.EvaluationError("data type mismatch")
+
+        return evaluate
+
+    _compile_BitwiseShiftExpression = _compile_BitwiseExpression
+
+    def _compile_UnaryExpression(self, node, bound):
+        right = self.compile(node.right, bound)
+        if node.type == "not":
+            return lambda thing, env: operator.not_(right(thing, env))
+
+        def evaluate(thing, env):
+            value = right(thing, env)
+            ast._assert_is_numeric(value)
+            return operator.neg(value)
+
+        return evaluate
+
+    def _compile_ContainsExpression(self, node, bound):
+        member = self.compile(node.member, bound)
+        if isinstance(node.container, (ast.ArrayExpression, ast.SetExpression)) and all(
+            isinstance(e, ast.LiteralExpressionBase)
+            and e.result_type.is_scalar
+            and e.result_type != DataType.DATETIME
+            for e in node.container.value
+        ):
+            values = node.container.evaluate(None)
+            try:
+                hashed = frozenset(values)
+            except TypeError:
+                hashed = None
+            if hashed is not None:
+
+                def evaluate_literal(thing, env):
+                    member_value = member(thing, env)
+                    try:
+                        return member_value in hashed
+                    except TypeError:
+                        # unhashable member(eg: an array of mappings), the set
+                        # literal raises the same TypeError as the interpreter
+                        return bool(member_value in values)
+
+                return evaluate_literal
+
+        container = self.compile(node.container, bound)
+
+        def evaluate(thing, env):
+            container_value = container(thing, env)
+            member_value = member(thing, env)
+            if DataType.from_value(container_value) == DataType.STRING:
+                if DataType.from_value(member_value) != DataType.STRING:
+                    raise errors.EvaluationError("data type mismatch")
+            return bool(member_value in container_value)
+
+        return evaluate
+
+    def _compile_TernaryExpression(self, node, bound):
+        condition = self.compile(node.condition, bound)
+        case_true = self.compile(node.case_true, bound)
+        case_false = self.compile(node.case_false, bound)
+        return lambda thing, env: (
+            case_true(thing, env) if condition(thing, env) else case_false(thing, env)
+        )
+
+    def _compile_ComprehensionExpression(self, node, bound):
+        iterable = self.compile_raw(node.iterable, bound)
+        new_value = self.new_value
+        variable = node.variable
+        inner = bound | {variable}
+        result = self.compile(node.result, inner)
+        condition = None
+        if node.condition is not None:
+            condition = self.compile(node.condition, inner)
+
+        def evaluate(thing, env):
+            output_array = collections.deque()
+            input_iterable = iterable(thing, env)
+            # the members of an array are coerced when they are read
+            if type(input_iterable) not in (list, tuple):
+                input_iterable = new_value(input_iterable)
+            if not DataType.from_value(input_iterable).is_iterable:
+                raise errors.EvaluationError(
+                    "data type mismatch (comprehension requires an iterable)"
+                )
+            for value in input_iterable:
+                scope = _bind(env, variable, value)
+                if condition is None or condition(thing, scope):
+                    output_array.append(result(thing, scope))
+            return tuple(output_array)
+
+        return evaluate
+
+
+def _eq_literal(left_value, value, value_type) -> bool:
+    if type(left_value) is not value_type:
+        return False
+    return left_value == value
+
+
+def _compare_values(op, left_value, right_value):
+    # the same as ArithmeticComparisonExpression.__op_arithmetic_values
+    if left_value is None and right_value is None:
+        return op in (operator.ge, operator.le)
+    elif left_value is None or right_value is None:
+        return False
+    elif isinstance(left_value, tuple) and isinstance(right_value, tuple):
+        for sub_left, sub_right in zip(left_value, right_value):
+            if _compare_values(operator.ne, sub_left, sub_right):
+                return _compare_values(op, sub_left, sub_right)
+        if len(left_value) != len(right_value):
+            return _compare_values(op, len(left_value), len(right_value))
+        return op in (operator.ge, operator.le)
+    elif type(left_value) is not type(right_value):
+        raise errors.EvaluationError(
+            f"data type mismatch {left_value} @{type(left_value)} != {right_value} @{type(right_value)}"
+        )
+    return op(left_value, right_value)
+
+
+def _check_symbol_type(node, value):
+    # the same as SymbolExpression.evaluate after the value is resolved
+    result_type = node.result_type
+    if result_type == DataType.UNDEFINED:
+        return value
+
+    value_type = DataType.from_value(value)
+    if DataType.is_compatible(value_type, result_type):
+        if result_type.is_scalar:
+            return value
+        if result_type.value_type == DataType.UNDEFINED:
+            return value
+        if (
+            result_type.value_type != DataType.NULL
+            and not result_type.value_type_nullable
+            and any(v is None for v in value)
+        ):
+            raise errors.SymbolTypeError(
+                node.name,
+                is_value=value,
+                is_type=value_type,
+                expected_type=result_type,
+            )
+        if result_type.value_type == value_type.value_type:
+            return value
+
+    if value_type == DataType.NULL:
+        return value
+
+    raise errors.SymbolTypeError(
+        node.name,
+        is_value=value,
+        is_type=value_type,
+        expected_type=result_type,
+    )
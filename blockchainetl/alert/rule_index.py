@@ -0,0 +1,228 @@
+"""Routes the items of a block only to the rules they may match.
+
+Most of the alert rules start with an equality or a membership test on a field,
+eg: `tx.to_address in [...] and ...`. The leftmost conjunct of each rule's `where`
+is analysed, if it's one of
+
+- `<field> == <literal>`, `<field> in [<literals>]`(or an `or` of them on the same field)
+- `<field> > <number>`(and >=, <, <=)
+
+where <field> is a chain of members(eg: `tx.to_address`, `log.topics`), the rule is
+put into the hash(or range) index of the field. Then the items are scanned once,
+each field is read once for all the rules indexed on it, and the items are routed
+to the candidate rules only, the full expression is evaluated on the candidates.
+
+The routing is exact: only the items on which the leftmost conjunct is false
+(without raising any errors) are skipped, the short-circuited `and` evaluates
+them to false. The items whose field can't be read as the interpreter does
+(eg: not a plain dict) are routed to all the rules indexed on the field.
+"""
+
+import bisect
+import decimal
+import logging
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+from rule_engine import ast, errors
+from rule_engine.types import coerce_value
+
+from .rule import Rule
+from .rule_compiler import FieldPath, _PLAIN_DICTS, field_path, is_scalar_literal
+
+_UNKNOWN = object()
+
+# a < b <=> b > a
+_FLIPPED = {"gt": "lt", "ge": "le", "lt": "gt", "le": "ge"}
+
+
+class Predicate(NamedTuple):
+    path: FieldPath
+    # eq: the literal values, range: None
+    values: Optional[FrozenSet]
+    # range: gt/ge/lt/le and the bound
+    op: Optional[str] = None
+    bound: Optional[decimal.Decimal] = None
+
+
+def analyze(rule: Rule) -> Optional[Predicate]:
+    """Returns the indexable leftmost conjunct of the rule, or None."""
+    node = rule.rule.statement.expression
+    while isinstance(node, ast.LogicExpression) and node.type == "and":
+        node = node.left
+    return _predicate(node)
+
+
+def _predicate(node) -> Optional[Predicate]:
+    if isinstance(node, ast.LogicExpression) and node.type == "or":
+        left, right = _predicate(node.left), _predicate(node.right)
+        if (
+            left is None
+            or right is None
+            or left.values is None
+            or right.values is None
+            or left.path != right.path
+        ):
+            return None
+        return Predicate(left.path, left.values | right.values)
+
+    if type(node) is ast.ComparisonExpression and node.type == "eq":
+        for field, literal in ((node.left, node.right), (node.right, node.left)):
+            path = field_path(field)
+            if path is not None and is_scalar_literal(literal):
+                return Predicate(path, frozenset([literal.value]))
+
+    if type(node) is ast.ContainsExpression:
+        path = field_path(node.member)
+        container = node.container
+        if (
+            path is not None
+            and isinstance(container, (ast.ArrayExpression, ast.SetExpression))
+            and all(is_scalar_literal(e) for e in container.value)
+        ):
+            return Predicate(path, frozenset(e.value for e in container.value))
+
+    if type(node) is ast.ArithmeticComparisonExpression and node.type in _FLIPPED:
+        path = field_path(node.left)
+        if path is not None and isinstance(node.right, ast.FloatExpression):
+            return Predicate(path, None, node.type, node.right.value)
+        path = field_path(node.right)
+        if path is not None and isinstance(node.left, ast.FloatExpression):
+            return Predicate(path, None, _FLIPPED[node.type], node.left.value)
+    return None
+
+
+def read_field(item, path: FieldPath, default_value):
+    """Reads the field the same as the interpreter, or returns _UNKNOWN."""
+    value = item
+    for name, safe in zip(path.names, path.safe):
+        if value is None and safe:
+            return None
+        if type(value) in _PLAIN_DICTS and name in value:
+            value = value[name]
+        elif value is None or type(value) in _PLAIN_DICTS:
+            if default_value is errors.UNDEFINED:
+                return _UNKNOWN
+            value = default_value
+        else:
+            return _UNKNOWN
+    return coerce_value(value, verify_type=False)
+
+
+class _RangeIndex(object):
+    """The sorted bounds of the rules, for each op."""
+
+    def __init__(self):
+        self.bounds: Dict[str, List[decimal.Decimal]] = defaultdict(list)
+        self.rule_ids: Dict[str, List[str]] = defaultdict(list)
+
+    def add(self, rule_id: str, op: str, bound: decimal.Decimal):
+        i = bisect.bisect_right(self.bounds[op], bound)
+        self.bounds[op].insert(i, bound)
+        self.rule_ids[op].insert(i, rule_id)
+
+    def lookup(self, value: decimal.Decimal) -> List[str]:
+        matched = []
+        for op, bounds in self.bounds.items():
+            rule_ids = self.rule_ids[op]
+            # the rules with bound < value(gt) or bound <= value(ge) are at the head,
+            # bound > value(lt) or bound >= value(le) at the tail
+            if op == "gt":
+                matched += rule_ids[: bisect.bisect_left(bounds, value)]
+            elif op == "ge":
+                matched += rule_ids[: bisect.bisect_right(bounds, value)]
+            elif op == "lt":
+                matched += rule_ids[bisect.bisect_right(bounds, value) :]
+            elif op == "le":
+                matched += rule_ids[bisect.bisect_left(bounds, value) :]
+        return matched
+
+
+class _FieldIndex(object):
+    def __init__(self, path: FieldPath, default_value):
+        self.path = path
+        self.default_value = default_value
+        self.rule_ids: List[str] = []
+        self.hashed: Dict[object, List[str]] = defaultdict(list)
+        self.ranged = _RangeIndex()
+        self.ranged_rule_ids: List[str] = []
+
+    def add(self, rule_id: str, predicate: Predicate):
+        self.rule_ids.append(rule_id)
+        if predicate.values is not None:
+            for value in predicate.values:
+                self.hashed[value].append(rule_id)
+        else:
+            self.ranged.add(rule_id, predicate.op, predicate.bound)
+            self.ranged_rule_ids.append(rule_id)
+
+    def lookup(self, item) -> List[str]:
+        value = read_field(item, self.path, self.default_value)
+        if value is _UNKNOWN:
+            return self.rule_ids
+
+        matched = []
+        if len(self.hashed) > 0:
+            try:
+                matched += self.hashed.get(value, [])
+            except TypeError:
+                # unhashable(eg: an array of mappings), can't equal any scalar literal
+                pass
+        if len(self.ranged_rule_ids) > 0:
+            if isinstance(value, decimal.Decimal) and not value.is_nan():
+                matched += self.ranged.lookup(value)
+            elif value is not None:
+                # the comparison raises the type mismatch error, let the rule do it
+                matched += self.ranged_rule_ids
+        return matched
+
+
+class RuleIndex(object):
+    """The per-field hash/range indexes of the rules of a RuleSet."""
+
+    def __init__(self, rules: Dict[str, Rule]):
+        # {scope: {path: field index}}
+        self.fields: Dict[str, Dict[FieldPath, _FieldIndex]] = defaultdict(dict)
+        # {scope: [rule ids]}, which are evaluated on all the items
+        self.unindexed: Dict[str, List[str]] = defaultdict(list)
+
+        for rule_id, rule in rules.items():
+            predicate = analyze(rule)
+            default_value = rule.rule.context.default_value
+            fields = self.fields[rule.scope]
+            if predicate is not None and predicate.path not in fields:
+                fields[predicate.path] = _FieldIndex(predicate.path, default_value)
+
+            # the field is read once for all the rules, with the same default value
+            if (
+                predicate is None
+                or fields[predicate.path].default_value is not default_value
+            ):
+                self.unindexed[rule.scope].append(rule_id)
+                continue
+            fields[predicate.path].add(rule_id, predicate)
+
+        n_unindexed = sum(len(e) for e in self.unindexed.values())
+        logging.info(
+            f"STAT rule index: {len(rules) - n_unindexed}/{len(rules)} rules indexed "
+            f"on {sum(len(e) for e in self.fields.values())} fields"
+        )
+
+    def route(self, items: Dict[str, List]) -> Dict[str, Dict[str, List]]:
+        """Returns the candidate items of each rule, as the items of Rule.filter."""
+        routed: Dict[str, Dict[str, List]] = dict()
+        for rule_ids in self.unindexed.values():
+            for rule_id in rule_ids:
+                routed[rule_id] = items
+
+        for scope, fields in self.fields.items():
+            candidates: Dict[str, List] = {
+                rule_id: [] for field in fields.values() for rule_id in field.rule_ids
+            }
+            for item in items.get(scope) or []:
+                for field in fields.values():
+                    for rule_id in field.lookup(item):
+                        candidates[rule_id].append(item)
+            for rule_id, todo in candidates.items():
+                routed[rule_id] = {scope: todo}
+        return routed
@@ -10,6 +10,7 @@ from rule_engine.errors import EvaluationError
 from jinja2 import Template
 
 from .rule import Rule
+from .rule_index import RuleIndex
 from .receivers import BaseReceiver
 
 
@@ -41,6 +42,7 @@ def parse_jinja_rule(rule_file, rule_variable_dir):
 class RuleSet(NamedTuple):
     chain: str
     rules: Dict[str, Rule]
+    index: Optional[RuleIndex] = None
 
     @classmethod
     def load(cls, chain: str, provider: Optional[Dict], rulesets: List[Dict]):
@@ -48,7 +50,7 @@ class RuleSet(NamedTuple):
         for yaml_dict in rulesets:
             rule = Rule.load(chain, provider, yaml_dict)
             rules[rule.id] = rule
-        return cls(chain, rules)
+        return cls(chain, rules, RuleIndex(rules))
 
     def execute(
         self,
@@ -56,10 +58,16 @@ class RuleSet(NamedTuple):
         items: Dict[str, List],
         max_workers: int = 10,
     ) -> Generator[Tuple[str, List[Dict]], None, None]:
+        # scan the items once, and evaluate each rule on its candidates only
+        routed = self.index.route(items) if self.index is not None else {}
         with executor(max_workers=max_workers) as exec:
-            futures = {
-                exec.submit(rule.filter, items): rule.id for rule in self.rules.values()
-            }
+            futures = {}
+            for rule in self.rules.values():
+                todo = routed.get(rule.id, items)
+                if todo.get(rule.scope) == []:
+                    yield (rule.id, [])
+                    continue
+                futures[exec.submit(rule.filter, todo)] = rule.id
 
             for future in as_completed(futures):
                 rule_id = futures[future]
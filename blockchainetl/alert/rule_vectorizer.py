@@ -0,0 +1,428 @@
+"""Evaluates a rule over all the items of a block with NumPy/pandas column expressions.
+
+The boolean skeleton of the rule(and/or/not) is evaluated with masks, the leaves
+
+- comparisons(==, !=, >, >=, <, <=) of the column expressions
+- `<column> in [<literals>]`, `'<literal>' in <column>`
+- `<column> =~ '<regex>'`(and =~~, !~, !~~)
+- the truthiness of a column expression
+
+are evaluated column-wise, where a column expression is a literal, a field(a chain of
+members, eg: `tx.value_usd`), a string attribute(length, is_empty, as_lower, as_upper)
+of it, or the arithmetic of them. The other nodes(eg: comprehensions) are evaluated
+by the row interpreter, on the rows not short-circuited only.
+
+A column keeps the type of each row, the numbers are coerced to Decimal as the
+interpreter does, so that the results are the same. If any row would raise an
+error(eg: data type mismatch), or the items can't be read as columns, the rule is
+evaluated by the row interpreter for the whole block instead, which raises the same
+error as before.
+"""
+
+import decimal
+import operator
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+import numpy as np
+import pandas as pd
+import rule_engine
+from rule_engine import ast, errors
+from rule_engine.types import coerce_value
+
+from .rule_compiler import (
+    CompiledRule,
+    FieldPath,
+    _PLAIN_DICTS,
+    _is_standard_context,
+    field_path,
+    is_scalar_literal,
+)
+
+# the type of each row
+NULL, BOOL, NUM, STR = 0, 1, 2, 3
+
+STRING_ATTRIBUTES = ("length", "is_empty", "as_lower", "as_upper")
+
+_COMPARISONS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+}
+_ARITHMETICS = {
+    "add": operator.add,
+    "sub": operator.sub,
+    "fdiv": operator.floordiv,
+    "tdiv": operator.truediv,
+    "mod": operator.mod,
+    "mul": operator.mul,
+    "pow": operator.pow,
+}
+
+
+class Column(NamedTuple):
+    codes: np.ndarray
+    values: np.ndarray
+
+
+class _Fallback(Exception):
+    """Evaluates the rule by the row interpreter."""
+
+
+class _Frame(object):
+    """The items of a block, the fields are read into columns once."""
+
+    def __init__(self, things: List, default_value):
+        self.things = things
+        self.n = len(things)
+        self.default_value = default_value
+        self.columns: Dict[FieldPath, Column] = dict()
+
+    def column(self, path: FieldPath) -> Column:
+        column = self.columns.get(path)
+        if column is None:
+            column = self._read(path)
+            self.columns[path] = column
+        return column
+
+    def _read(self, path: FieldPath) -> Column:
+        codes = np.zeros(self.n, dtype=np.int8)
+        values = np.empty(self.n, dtype=object)
+        for i, thing in enumerate(self.things):
+            value = thing
+            for name, safe in zip(path.names, path.safe):
+                if value is None and safe:
+                    break
+                if type(value) in _PLAIN_DICTS and name in value:
+                    value = value[name]
+                elif (value is None or type(value) in _PLAIN_DICTS) and (
+                    self.default_value is not errors.UNDEFINED
+                ):
+                    value = self.default_value
+                else:
+                    raise _Fallback(f"can't read {'.'.join(path.names)}")
+            codes[i], values[i] = _code_of(value)
+        return Column(codes, values)
+
+
+def _code_of(value):
+    t = type(value)
+    if value is None:
+        return NULL, None
+    elif t is str:
+        return STR, value
+    elif t is bool:
+        return BOOL, value
+    elif t in (int, float, decimal.Decimal):
+        return NUM, coerce_value(value, verify_type=False)
+    raise _Fallback(f"unsupported type {t}")
+
+
+ColumnEvaluator = Callable[[_Frame, np.ndarray], Column]
+MaskEvaluator = Callable[[_Frame, np.ndarray], np.ndarray]
+
+
+class VectorizedRule(object):
+    """Has the same filter of rule_engine.Rule, returns a list."""
+
+    def __init__(self, rule: Union[rule_engine.Rule, CompiledRule]):
+        self.rule = rule
+        self.text = rule.text
+        self.context = rule.context
+        self.default_value = rule.context.default_value
+        self.n_column_leaves = 0
+        self._evaluate = self._compile_mask(rule.statement.expression)
+
+    def __repr__(self):
+        return "<{0} text={1!r} >".format(self.__class__.__name__, self.text)
+
+    def filter(self, things) -> List:
+        things = list(things)
+        if len(things) == 0:
+            return []
+        try:
+            with decimal.localcontext(self.context.decimal_context):
+                frame = _Frame(things, self.default_value)
+                matched = self._evaluate(frame, np.ones(frame.n, dtype=bool))
+        except Exception:
+            # _Fallback, or any error raised by the row leaves and the column ops,
+            # the row interpreter raises the error of the first item as before
+            return list(self.rule.filter(things))
+        return [things[i] for i in np.flatnonzero(matched)]
+
+    def _compile_mask(self, node) -> MaskEvaluator:
+        if isinstance(node, ast.LogicExpression):
+            left = self._compile_mask(node.left)
+            right = self._compile_mask(node.right)
+            if node.type == "and":
+                return lambda frame, active: _and(frame, active, left, right)
+            return lambda frame, active: _or(frame, active, left, right)
+
+        if isinstance(node, ast.UnaryExpression) and node.type == "not":
+            child = self._compile_mask(node.right)
+            return lambda frame, active: ~child(frame, active)
+
+        evaluator = self._compile_leaf(node)
+        if evaluator is not None:
+            self.n_column_leaves += 1
+            return evaluator
+        return lambda frame, active: _row_leaf(frame, active, node)
+
+    def _compile_leaf(self, node) -> Optional[MaskEvaluator]:
+        node_type = type(node)
+        if node_type in (
+            ast.ComparisonExpression,
+            ast.ArithmeticComparisonExpression,
+        ) and (node.type in _COMPARISONS):
+            left = self._compile_column(node.left)
+            right = self._compile_column(node.right)
+            if left is None or right is None:
+                return None
+            op = _COMPARISONS[node.type]
+            return lambda frame, active: _compare(frame, active, op, left, right)
+
+        if node_type is ast.ContainsExpression:
+            container = node.container
+            if isinstance(container, (ast.ArrayExpression, ast.SetExpression)) and all(
+                is_scalar_literal(e) for e in container.value
+            ):
+                member = self._compile_column(node.member)
+                if member is None:
+                    return None
+                values = [e.value for e in container.value]
+                return lambda frame, active: _contains(frame, active, member, values)
+
+            if isinstance(node.member, ast.StringExpression):
+                container = self._compile_column(container)
+                if container is None:
+                    return None
+                value = node.member.value
+                return lambda frame, active: _substring(frame, active, value, container)
+            return None
+
+        if node_type is ast.FuzzyComparisonExpression:
+            if not isinstance(node.right, ast.StringExpression):
+                return None
+            if node.type not in ("eq_fzm", "eq_fzs", "ne_fzm", "ne_fzs"):
+                return None
+            left = self._compile_column(node.left)
+            if left is None:
+                return None
+            regex, fuzzy = node._right, node.type
+            return lambda frame, active: _fuzzy(frame, active, left, regex, fuzzy)
+
+        if is_scalar_literal(node):
+            return None
+        column = self._compile_column(node)
+        if column is None:
+            return None
+        return lambda frame, active: _truth(column(frame, active), active)
+
+    def _compile_column(self, node) -> Optional[ColumnEvaluator]:
+        if is_scalar_literal(node):
+            code, value = _code_of(node.value)
+            return lambda frame, active: _constant(frame.n, code, value)
+
+        path = field_path(node)
+        if path is not None:
+            return lambda frame, active: frame.column(path)
+
+        if (
+            isinstance(node, ast.GetAttributeExpression)
+            and node.name in STRING_ATTRIBUTES
+        ):
+            obj = self._compile_column(node.object)
+            if obj is None:
+                return None
+            name, safe = node.name, node.safe
+            return lambda frame, active: _string_attribute(
+                frame, active, obj(frame, active), name, safe
+            )
+
+        if isinstance(node, ast.ArithmeticExpression) and node.type in _ARITHMETICS:
+            left = self._compile_column(node.left)
+            right = self._compile_column(node.right)
+            if left is None or right is None:
+                return None
+            op = _ARITHMETICS[node.type]
+            return lambda frame, active: _arithmetic(
+                frame, active, op, left(frame, active), right(frame, active)
+            )
+
+        if isinstance(node, ast.UnaryExpression) and node.type == "uminus":
+            right = self._compile_column(node.right)
+            if right is None:
+                return None
+            return lambda frame, active: _arithmetic(
+                frame, active, operator.neg, right(frame, active)
+            )
+        return None
+
+
+def vectorize_rule(
+    rule: Union[rule_engine.Rule, CompiledRule]
+) -> Optional[VectorizedRule]:
+    """Returns the vectorized rule, or None if it's not worth to."""
+    context = rule.context
+    if not _is_standard_context(context):
+        return None
+    if context.default_value not in (None, errors.UNDEFINED):
+        return None
+    # the regex groups are set by the row interpreter only
+    if "re_groups" in context.symbols:
+        return None
+
+    vectorized = VectorizedRule(rule)
+    # nothing can be evaluated column-wise
+    if vectorized.n_column_leaves == 0:
+        return None
+    return vectorized
+
+
+# the boolean expressions
+def _and(frame, active, left, right):
+    matched = left(frame, active)
+    # `and` is short-circuited, the right side is evaluated on the left matched only
+    return matched & right(frame, active & matched)
+
+
+def _or(frame, active, left, right):
+    matched = left(frame, active)
+    return matched | right(frame, active & ~matched)
+
+
+def _row_leaf(frame, active, node):
+    matched = np.zeros(frame.n, dtype=bool)
+    for i in np.flatnonzero(active):
+        matched[i] = bool(node.evaluate(frame.things[i]))
+    return matched
+
+
+def _compare(frame, active, op, left, right):
+    lhs, rhs = left(frame, active), right(frame, active)
+    both_null = (lhs.codes == NULL) & (rhs.codes == NULL)
+    if op in (operator.eq, operator.ne):
+        # the values are compared only if they are of the same type
+        same = active & (lhs.codes == rhs.codes) & ~both_null
+        matched = both_null | _elementwise(operator.eq, lhs, rhs, same, frame.n)
+        return matched if op is operator.eq else ~matched
+
+    one_null = (lhs.codes == NULL) ^ (rhs.codes == NULL)
+    not_null = active & ~both_null & ~one_null
+    if np.any(not_null & (lhs.codes != rhs.codes)):
+        raise _Fallback("data type mismatch")
+    matched = _elementwise(op, lhs, rhs, not_null, frame.n)
+    if op in (operator.ge, operator.le):
+        matched |= both_null
+    return matched
+
+
+def _contains(frame, active, member, values):
+    column = member(frame, active)
+    idx = np.flatnonzero(active)
+    matched = np.zeros(frame.n, dtype=bool)
+    for value in values:
+        if value is None:
+            matched |= column.codes == NULL
+        else:
+            matched[idx] |= (column.values[idx] == value).astype(bool)
+    return matched
+
+
+def _substring(frame, active, value, container):
+    column = container(frame, active)
+    if np.any(active & (column.codes != STR)):
+        raise _Fallback("data type mismatch")
+    idx = np.flatnonzero(active)
+    matched = np.zeros(frame.n, dtype=bool)
+    matched[idx] = pd.Series(column.values[idx], dtype=object).str.contains(
+        value, regex=False
+    )
+    return matched
+
+
+def _fuzzy(frame, active, left, regex, fuzzy):
+    column = left(frame, active)
+    if np.any(active & (column.codes != STR) & (column.codes != NULL)):
+        raise _Fallback("data type mismatch")
+    idx = np.flatnonzero(active & (column.codes == STR))
+    strings = pd.Series(column.values[idx], dtype=object).str
+    if fuzzy.endswith("_fzm"):
+        found = strings.match(regex.pattern, flags=regex.flags)
+    else:
+        found = strings.contains(regex.pattern, flags=regex.flags, regex=True)
+    matched = np.zeros(frame.n, dtype=bool)
+    matched[idx] = found
+    # a null never matches
+    if fuzzy.startswith("ne_"):
+        return ~matched
+    return matched
+
+
+def _truth(column, active):
+    return active & (column.codes != NULL) & column.values.astype(bool)
+
+
+# the column expressions
+def _constant(n, code, value) -> Column:
+    values = np.empty(n, dtype=object)
+    values.fill(value)
+    return Column(np.full(n, code, dtype=np.int8), values)
+
+
+def _elementwise(op, lhs: Column, rhs: Column, mask, n) -> np.ndarray:
+    result = np.zeros(n, dtype=bool)
+    idx = np.flatnonzero(mask)
+    if len(idx) > 0:
+        result[idx] = op(lhs.values[idx], rhs.values[idx]).astype(bool)
+    return result
+
+
+def _arithmetic(frame, active, op, *operands: Column) -> Column:
+    # the same as _assert_is_numeric, raises for the null
+    for operand in operands:
+        if np.any(active & (operand.codes != NUM)):
+            raise _Fallback("data type mismatch (not a numeric value)")
+    codes = np.where(active, NUM, NULL).astype(np.int8)
+    values = np.empty(frame.n, dtype=object)
+    idx = np.flatnonzero(active)
+    if len(idx) > 0:
+        values[idx] = op(*(operand.values[idx] for operand in operands))
+    return Column(codes, values)
+
+
+def _string_attribute(frame, active, column: Column, name: str, safe: bool) -> Column:
+    codes = np.zeros(frame.n, dtype=np.int8)
+    values = np.empty(frame.n, dtype=object)
+
+    idx = np.flatnonzero(active & (column.codes == STR))
+    strings = pd.Series(column.values[idx], dtype=object).str
+    if name == "length":
+        codes[idx] = NUM
+        values[idx] = [decimal.Decimal(int(e)) for e in strings.len()]
+    elif name == "is_empty":
+        codes[idx] = BOOL
+        values[idx] = [bool(e) for e in strings.len() == 0]
+    elif name == "as_lower":
+        codes[idx] = STR
+        values[idx] = strings.lower()
+    elif name == "as_upper":
+        codes[idx] = STR
+        values[idx] = strings.upper()
+
+    # the null has length(0) and is_empty(true) only
+    nulls = np.flatnonzero(active & (column.codes == NULL))
+    if not safe and name == "length":
+        codes[nulls], values[nulls] = NUM, decimal.Decimal(0)
+    elif not safe and name == "is_empty":
+        codes[nulls], values[nulls] = BOOL, True
+
+    # the other types have no string attributes, resolved to the default value
+    unresolved = active & (column.codes != STR) & (column.codes != NULL)
+    if name not in ("length", "is_empty") and not safe:
+        unresolved |= active & (column.codes == NULL)
+    if frame.default_value is errors.UNDEFINED and np.any(unresolved):
+        raise _Fallback(f"can't resolve {name}")
+    return Column(codes, values)
@@ -1,7 +1,7 @@
 import logging
 
 import click
-from web3 import HTTPProvider, Web3
+from web3 import Web3
 
 from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 from bitcoinetl.streaming.btc_streamer_adapter import BtcStreamerAdapter
@@ -20,6 +20,7 @@ from blockchainetl.service.price_service import PriceService
 from blockchainetl.streaming.streamer import Streamer
 from blockchainetl.thread_local_proxy import ThreadLocalProxy
 from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.providers.rpc import BatchHTTPProvider
 from ethereumetl.service.eth_token_service import EthTokenService
 from ethereumetl.streaming.eth_streamer_adapter import EthStreamerAdapter
 
@@ -205,7 +206,7 @@ def alert(
 
     token_service = None
     if chain in Chain.ALL_ETHEREUM_FORKS:
-        web3 = Web3(HTTPProvider(provider_uri))
+        web3 = Web3(BatchHTTPProvider(provider_uri))
         token_service = EthTokenService(web3, cache_path=token_cache_path)
 
     alert_exporter = AlertExporter(
@@ -16,6 +16,7 @@ from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType, parse_entity_types
 from blockchainetl.jobs.exporters.item_exporter_builder import create_postgres_exporter
 from blockchainetl.jobs.exporters.file_item_exporter import FileItemExporter
+from blockchainetl.misc.arrow_file import FILE_FORMAT_CSV, FILE_FORMATS
 
 from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 from bitcoinetl.streaming.btc_streamer_adapter import BtcStreamerAdapter
@@ -73,6 +74,14 @@ from ethereumetl.streaming.utils import build_erc20_token_reader
     envvar="BLOCKCHAIN_ETL_DUMP_OUTPUT_PATH",
     help="The output local directory path",
 )
+@click.option(
+    "--file-format",
+    type=click.Choice(FILE_FORMATS),
+    default=FILE_FORMAT_CSV,
+    show_default=True,
+    envvar="BLOCKCHAIN_ETL_DUMP_FILE_FORMAT",
+    help="The format of the output files, parquet/arrow are typed columnar files",
+)
 @click.option(
     "-s",
     "--start-block",
@@ -197,6 +206,14 @@ from ethereumetl.streaming.utils import build_erc20_token_reader
     show_default=True,
     help="The path to store token's attributes, used ONLY IN EVM chains",
 )
+@click.option(
+    "--copy-mode",
+    is_flag=True,
+    show_default=True,
+    help="Load the results with COPY FROM STDIN into a temporary staging table, "
+    "then merge into the target table with one INSERT ... SELECT ... ON CONFLICT per entity type, "
+    "only used if --target-db-url is specified",
+)
 def dump(
     ctx,
     chain,
@@ -205,6 +222,7 @@ def dump(
     provider_uri,
     source_db_url,
     output,
+    file_format,
     start_block,
     end_block,
     entity_types,
@@ -222,6 +240,7 @@ def dump(
     target_db_url,
     print_sql,
     token_cache_path,
+    copy_mode,
 ):
     """Dump all data from full-node's json-rpc to CSV file or PostgreSQL."""
 
@@ -246,13 +265,15 @@ def dump(
         if pending_mode is True:
             schema += "_pending"
         item_exporter = create_postgres_exporter(
-            schema, target_db_url, print_sql=print_sql
+            schema, target_db_url, print_sql=print_sql, copy_mode=copy_mode
         )
     else:
         redis_notify = RedisStreamService(redis_url, entity_types).create_notify(
             chain, redis_stream_prefix, redis_result_prefix
         )
-        item_exporter = FileItemExporter(chain, output, redis_notify)
+        item_exporter = FileItemExporter(
+            chain, output, redis_notify, file_format=file_format
+        )
 
     if chain in Chain.ALL_ETHEREUM_FORKS:
         streamer_adapter = EthStreamerAdapter(
@@ -7,19 +7,25 @@ from blockchainetl.cli.utils import (
     global_click_options,
     extract_cmdline_kwargs,
     pick_random_provider_uri,
+    split_provider_uris,
     str2bool,
 )
 from blockchainetl.utils import time_elapsed
 from blockchainetl.thread_local_proxy import ThreadLocalProxy
 from blockchainetl.streaming.streamer import Streamer
+from blockchainetl.streaming.pipelined_streamer import PipelinedStreamer
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType, parse_entity_types
 from blockchainetl.jobs.exporters.item_exporter_builder import create_tsdb_exporter
 
 from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
+from bitcoinetl.rpc.multi_bitcoin_rpc import MultiBitcoinRpc
 from bitcoinetl.streaming.btc_streamer_adapter import BtcStreamerAdapter
 
-from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.providers.auto import (
+    get_provider_from_uri,
+    get_multi_provider_from_uris,
+)
 from ethereumetl.streaming.eth_streamer_adapter import EthStreamerAdapter
 from ethereumetl.streaming.utils import build_erc20_token_reader
 
@@ -167,6 +173,50 @@ from ethereumetl.streaming.utils import build_erc20_token_reader
     show_default=True,
     help="Used as dicskcache,token's attributes for EVM, rawtransaction for Bitcoin",
 )
+@click.option(
+    "--pipeline-depth",
+    default=0,
+    show_default=True,
+    type=int,
+    help="How many extracted block batches can be queued ahead of the database writer, "
+    "fetch next block batch while exporting the current one if > 0, 0 disables the pipeline",
+)
+@click.option(
+    "--async-rpc-pool-size",
+    default=0,
+    show_default=True,
+    type=int,
+    help="Send JSON RPC requests through an asyncio HTTP client "
+    "with a keep-alive connection pool of this size shared by all workers, "
+    "up to --max-workers batch requests are in flight without a thread for each, "
+    "only http/https provider is supported, 0 disables the async client",
+)
+@click.option(
+    "--provider-failover",
+    is_flag=True,
+    show_default=True,
+    help="Use all the endpoints in --provider-uri(separated by comma), "
+    "route each request to the healthiest one by latency, error rate and head block, "
+    "hedge slow requests and failover the failed ones, "
+    "instead of picking a random one at startup",
+)
+@click.option(
+    "--copy-mode",
+    is_flag=True,
+    show_default=True,
+    help="Load the results with COPY FROM STDIN into a temporary staging table, "
+    "then merge into the target table with one INSERT ... SELECT ... ON CONFLICT per entity type, "
+    "instead of batches of INSERTs",
+)
+@click.option(
+    "--reorg-window",
+    default=0,
+    show_default=True,
+    type=int,
+    help="Check the parent hashes of the new blocks against the last #N exported ones, "
+    "delete and export again the orphaned blocks if the chain was reorganized, "
+    "so that a smaller --lag is safe(EVM only), 0 disables the check",
+)
 def dump2(
     ctx,
     chain,
@@ -188,6 +238,11 @@ def dump2(
     target_db_url,
     print_sql,
     cache_path,
+    pipeline_depth,
+    async_rpc_pool_size,
+    provider_failover,
+    copy_mode,
+    reorg_window,
 ):
     """Dump all data from full-node's json-rpc to PostgreSQL(TimescaleDB)."""
 
@@ -201,7 +256,9 @@ def dump2(
     kwargs = extract_cmdline_kwargs(ctx)
     logging.info(f"Start dump with extra kwargs {kwargs}")
 
-    provider_uri = pick_random_provider_uri(provider_uri)
+    provider_uris = split_provider_uris(provider_uri)
+    if provider_failover is False:
+        provider_uri = pick_random_provider_uri(provider_uri)
     logging.info("Using provider: " + provider_uri)
 
     if target_db_schema is not None and len(target_db_schema) > 0:
@@ -211,14 +268,22 @@ def dump2(
     if pending_mode is True:
         schema += "_pending"
     item_exporter = create_tsdb_exporter(
-        chain, schema, target_db_url, print_sql=print_sql
+        chain, schema, target_db_url, print_sql=print_sql, copy_mode=copy_mode
     )
 
     if chain in Chain.ALL_ETHEREUM_FORKS:
-        streamer_adapter = EthStreamerAdapter(
-            batch_web3_provider=ThreadLocalProxy(
+        if provider_failover is True:
+            batch_web3_provider = get_multi_provider_from_uris(provider_uris)
+        elif async_rpc_pool_size > 0:
+            batch_web3_provider = get_provider_from_uri(
+                provider_uri, batch=True, async_pool_size=async_rpc_pool_size
+            )
+        else:
+            batch_web3_provider = ThreadLocalProxy(
                 lambda: get_provider_from_uri(provider_uri, batch=True)
-            ),
+            )
+        streamer_adapter = EthStreamerAdapter(
+            batch_web3_provider=batch_web3_provider,
             item_exporter=item_exporter,
             chain=chain,
             batch_size=batch_size,
@@ -237,10 +302,14 @@ def dump2(
             token_cache_path=cache_path,
         )
     elif chain in Chain.ALL_BITCOIN_FORKS:
-        streamer_adapter = BtcStreamerAdapter(
-            bitcoin_rpc=ThreadLocalProxy(
+        if provider_failover is True:
+            bitcoin_rpc = MultiBitcoinRpc(provider_uris, cache_path=cache_path)
+        else:
+            bitcoin_rpc = ThreadLocalProxy(
                 lambda: BitcoinRpc(provider_uri, cache_path=cache_path)
-            ),
+            )
+        streamer_adapter = BtcStreamerAdapter(
+            bitcoin_rpc=bitcoin_rpc,
             item_exporter=item_exporter,
             chain=chain,
             enable_enrich=enable_enrich,
@@ -253,7 +322,7 @@ def dump2(
             f"--chain({chain}) is not supported in entity types({entity_types})) "
         )
 
-    streamer = Streamer(
+    streamer_kwargs = dict(
         blockchain_streamer_adapter=streamer_adapter,
         last_synced_block_file=last_synced_block_file,
         lag=lag,
@@ -262,7 +331,12 @@ def dump2(
         period_seconds=period_seconds,
         block_batch_size=block_batch_size,
         pid_file=pid_file,
+        reorg_window=reorg_window,
     )
+    if pipeline_depth > 0:
+        streamer = PipelinedStreamer(pipeline_depth=pipeline_depth, **streamer_kwargs)
+    else:
+        streamer = Streamer(**streamer_kwargs)
     streamer.stream()
 
     logging.info(
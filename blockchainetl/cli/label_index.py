@@ -0,0 +1,85 @@
+import logging
+import time
+
+import click
+from sqlalchemy import create_engine
+
+from blockchainetl.cli.utils import global_click_options
+from blockchainetl.service.label_index import build_label_index
+
+
+@click.command(context_settings=dict(help_option_names=["-h", "--help"]))
+@global_click_options
+@click.option(
+    "--db-url",
+    type=str,
+    required=True,
+    envvar="BLOCKCHAIN_ETL_LABEL_DB_URL",
+    help="The label database conneciton url",
+)
+@click.option(
+    "--db-schema",
+    type=str,
+    default=None,
+    show_default=True,
+    help="The schema of the label table, default is the chain",
+)
+@click.option(
+    "--db-table",
+    type=str,
+    default="addr_labels",
+    show_default=True,
+    help="The label table",
+)
+@click.option(
+    "--updated-at-column",
+    type=str,
+    default="updated_at",
+    show_default=True,
+    help="The column used to read the updated labels incrementally",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=str,
+    required=True,
+    envvar="BLOCKCHAIN_ETL_LABEL_INDEX_PATH",
+    help="The label index file, read by LabelService",
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    show_default=True,
+    help="Rebuild the whole index rather than refresh it incrementally",
+)
+@click.option(
+    "--period-seconds",
+    default=0,
+    show_default=True,
+    type=int,
+    help="How many seconds to sleep between refreshes, 0 to build once",
+)
+def label_index(
+    chain,
+    db_url,
+    db_schema,
+    db_table,
+    updated_at_column,
+    output,
+    full,
+    period_seconds,
+):
+    """Bulk load the address labels into a memory-mapped index file"""
+    engine = create_engine(db_url)
+    db_table = f"{db_schema or chain}.{db_table}"
+
+    while True:
+        st = time.time()
+        n_rows = build_label_index(
+            engine, db_table, output, updated_at_column=updated_at_column, full=full
+        )
+        logging.info(f"refreshed {output} with #{n_rows} rows in {time.time() - st}s")
+        if period_seconds <= 0:
+            break
+        full = False
+        time.sleep(period_seconds)
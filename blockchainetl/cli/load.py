@@ -38,6 +38,7 @@ from blockchainetl.streaming.postgres_utils import (
     external_copy_file_into_redo,
     external_load_files_into_table,
 )
+from blockchainetl.streaming.postgres_batch_loader import BatchCopyLoader
 from bitcoinetl.enumeration.column_type import ColumnType as BtcColumnType
 from ethereumetl.enumeration.column_type import ColumnType as EthColumnType
 from ethereumetl.misc.easy_etl import easy_etl as eth_easy_etl
@@ -69,6 +70,9 @@ class Loader:
         max_workers: int,
         period_seconds: int,
         minimum_block: Optional[str] = None,
+        copy_batch_bytes: int = 0,
+        copy_pool_size: int = 2,
+        copy_concurrency: int = 1,
     ):
         self.chain = chain
         self.redis_url = redis_url
@@ -89,6 +93,9 @@ class Loader:
         self.redis_enriched_stream_prefix = redis_enriched_stream_prefix
         self.max_workers = max_workers
         self.period_seconds = period_seconds
+        self.copy_batch_bytes = copy_batch_bytes
+        self.copy_pool_size = copy_pool_size
+        self.copy_concurrency = copy_concurrency
         self.minimum_blknums = {}
         if minimum_block is not None:
             # eg: block:100,trace:1000
@@ -205,6 +212,19 @@ class Loader:
 
         minimum_blknum = self.minimum_blknums.get(entity_type, 0)
 
+        batch_loader = None
+        if self.copy_batch_bytes > 0:
+            # the files of the messages in flight are merged into a few COPYs
+            batch_loader = BatchCopyLoader(
+                self.postgres_url,
+                table,
+                entity_type,
+                self.ct,
+                batch_bytes=self.copy_batch_bytes,
+                pool_size=self.copy_pool_size,
+                ignore_error=self.ignore_postgres_copy_error,
+            )
+
         def handler(conn: connection, st: float, keyvals: Dict):
             blk, file = self._decode_task(keyvals)
 
@@ -224,16 +244,21 @@ class Loader:
 
             self.check_and_autofix_block(entity_type, int(blk), file)
 
-            rowcount = save_file_into_table(
-                conn,
-                table,
-                entity_type,
-                file,
-                self.ct,
-                ignore_error=self.ignore_postgres_copy_error,
-            )
+            if batch_loader is not None:
+                rowcount = batch_loader.load(file, self._file_size(file))
+            else:
+                rowcount = save_file_into_table(
+                    conn,
+                    table,
+                    entity_type,
+                    file,
+                    self.ct,
+                    ignore_error=self.ignore_postgres_copy_error,
+                )
+            # the #row of the merged COPYs is logged once for each batch
+            row_stat = "" if rowcount is None else f" #row={rowcount}"
             logging.info(
-                f"handle save table={table} #row={rowcount} file={file} elapsed={time_elapsed(st)}"
+                f"handle save table={table}{row_stat} file={file} elapsed={time_elapsed(st)}"
             )
             red.setex(result_key, RESULT_TTL_SECONDS, 1)
 
@@ -251,9 +276,13 @@ class Loader:
             workers=self.max_workers,
             worker_mode="thread",
             period_seconds=self.period_seconds,
+            concurrency=1 if batch_loader is None else self.copy_concurrency,
         )
 
-        red_cg.consume(handler, initer, deiniter)
+        if batch_loader is None:
+            red_cg.consume(handler, initer, deiniter)
+        else:
+            red_cg.consume(handler)
 
     def check_and_autofix_block(self, entity_type: str, blknum: int, file: str):
         if self._file_exists(file):
@@ -295,6 +324,15 @@ class Loader:
     def _need_autofix(self) -> bool:
         return self.autofix is True and self.chain in Chain.ALL_ETHEREUM_FORKS
 
+    def _file_size(self, file: str) -> int:
+        try:
+            if file.startswith("s3://"):
+                return self.s3.size(file)
+            return os.path.getsize(file)
+        except OSError:
+            # the batch fails, and the file is loaded(and reported) alone
+            return 0
+
     def _file_exists(self, file: str) -> bool:
         return (file.startswith("s3://") and self.s3.exists(file)) or (
             not file.startswith("s3://") and os.path.exists(file)
@@ -460,6 +498,30 @@ class Loader:
     help="(EXPERIMENTAL) Load with required minimum block number, ONLY available in psycopg load. "
     "Comma separated, eg: trace:100,block:10",
 )
+@click.option(
+    "--copy-batch-bytes",
+    show_default=True,
+    type=int,
+    default=0,
+    envvar="BLOCKCHAIN_ETL_LOAD_COPY_BATCH_BYTES",
+    help="Merge the files of one entity into COPYs up to this size(eg: 33554432), "
+    "0 to COPY file by file",
+)
+@click.option(
+    "--copy-pool-size",
+    show_default=True,
+    type=int,
+    default=2,
+    help="The number of connections to COPY the batches of one entity",
+)
+@click.option(
+    "--copy-concurrency",
+    show_default=True,
+    type=int,
+    default=8,
+    help="The number of files in flight of each consuming worker, merged into the batches, "
+    "only used with --copy-batch-bytes",
+)
 def load(
     ctx,
     chain,
@@ -485,6 +547,9 @@ def load(
     external_load_count,
     external_load_path,
     minimum_block,
+    copy_batch_bytes,
+    copy_pool_size,
+    copy_concurrency,
 ):
     """Load all data from CSV files into GreenPlum/PostgreSQL."""
     entity_types = parse_entity_types(entity_types)
@@ -524,6 +589,9 @@ def load(
         max_workers,
         period_seconds,
         minimum_block,
+        copy_batch_bytes=copy_batch_bytes,
+        copy_pool_size=copy_pool_size,
+        copy_concurrency=copy_concurrency,
     )
 
     threads = loader.spawn_loading_threads(
@@ -2,7 +2,7 @@ import os
 import logging
 import click
 
-from web3 import Web3, HTTPProvider
+from web3 import Web3
 
 from blockchainetl.cli.utils import (
     global_click_options,
@@ -22,6 +22,7 @@ from bitcoinetl.rpc.bitcoin_rpc import BitcoinRpc
 from bitcoinetl.streaming.btc_streamer_adapter import BtcStreamerAdapter
 
 from ethereumetl.providers.auto import get_provider_from_uri
+from ethereumetl.providers.rpc import BatchHTTPProvider
 from ethereumetl.streaming.eth_streamer_adapter import EthStreamerAdapter
 from ethereumetl.service.eth_token_service import EthTokenService
 
@@ -206,7 +207,7 @@ def track(
 
     token_service = None
     if chain in Chain.ALL_ETHEREUM_FORKS:
-        web3 = Web3(HTTPProvider(provider_uri))
+        web3 = Web3(BatchHTTPProvider(provider_uri))
         token_service = EthTokenService(web3)
 
     track_exporter = TrackExporter(
@@ -1,7 +1,11 @@
+import ast
 import click
 import random
 import functools
-from typing import Optional, Dict
+import importlib
+import importlib.util
+from typing import Optional, Dict, List
+from click.utils import make_default_short_help
 
 from blockchainetl.enumeration.chain import Chain
 
@@ -43,9 +47,12 @@ def str2bool(val: Optional[str]) -> bool:
     return val.lower() in _bool_strs if val is not None else False
 
 
+def split_provider_uris(provider_uri: str) -> List[str]:
+    return [uri.strip() for uri in provider_uri.split(",")]
+
+
 def pick_random_provider_uri(provider_uri: str) -> str:
-    provider_uris = [uri.strip() for uri in provider_uri.split(",")]
-    return random.choice(provider_uris)
+    return random.choice(split_provider_uris(provider_uri))
 
 
 # extract the redundant command line arguments into kwargs
@@ -57,3 +64,65 @@ def extract_cmdline_kwargs(ctx) -> Dict:
             args[i].replace("-", "_"): args[i + 1] for i in range(0, len(args), 2)
         }
     return kwargs
+
+
+class LazyGroup(click.Group):
+    """A command group which imports the module of a subcommand on dispatch only.
+
+    The commands are registered by "module:attribute", the short help listed by
+    `--help` is read from the docstring in the module's source, without importing it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands: Dict[str, str] = dict()
+
+    def add_lazy_command(self, import_path: str, name: str):
+        self.lazy_commands[name] = import_path
+
+    def list_commands(self, ctx) -> List[str]:
+        return sorted(set(self.commands) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module, attr = self.lazy_commands[cmd_name].split(":")
+            self.commands[cmd_name] = getattr(importlib.import_module(module), attr)
+        return self.commands.get(cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        names = [
+            e
+            for e in self.list_commands(ctx)
+            if e not in self.commands or not self.commands[e].hidden
+        ]
+        if len(names) == 0:
+            return
+
+        # the same layout as click.Group
+        limit = formatter.width - 6 - max(len(e) for e in names)
+        rows = []
+        for name in names:
+            if name in self.commands:
+                rows.append((name, self.commands[name].get_short_help_str(limit)))
+            else:
+                help = _docstring_of(self.lazy_commands[name]) or ""
+                rows.append((name, make_default_short_help(help, limit)))
+
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
+
+
+def _docstring_of(import_path: str) -> Optional[str]:
+    module, attr = import_path.split(":")
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None:
+        return None
+    with open(spec.origin, "r") as fr:
+        tree = ast.parse(fr.read())
+    for node in tree.body:
+        if (
+            isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and node.name == attr
+        ):
+            return ast.get_docstring(node)
+    return None
@@ -0,0 +1,218 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger("EndpointRouter")
+
+
+class EndpointHealth:
+    def __init__(self, uri: str, window: int = 100):
+        self.uri = uri
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.ejected_until = 0.0
+        self.head: Optional[int] = None
+        self.behind = False
+        self._lock = threading.Lock()
+
+    def record_success(self, elapsed: float):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(elapsed)
+            self.error_rate *= 0.9
+            self.consecutive_errors = 0
+
+    def record_error(self, max_consecutive_errors: int, cooldown_seconds: float):
+        with self._lock:
+            self.requests += 1
+            self.errors += 1
+            self.error_rate = self.error_rate * 0.9 + 0.1
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= max_consecutive_errors:
+                self.ejected_until = time.time() + cooldown_seconds
+
+    def percentile(self, p: float) -> Optional[float]:
+        latencies = sorted(self.latencies)
+        if len(latencies) == 0:
+            return None
+        return latencies[min(int(len(latencies) * p), len(latencies) - 1)]
+
+    def is_healthy(self) -> bool:
+        return not self.behind and self.ejected_until <= time.time()
+
+    def score(self) -> float:
+        # lower is better, endpoints without samples yet are tried first
+        p50 = self.percentile(0.5) or 0.0
+        return p50 * (1 + 10 * self.error_rate)
+
+    def __repr__(self):
+        p95 = self.percentile(0.95)
+        return (
+            f"{self.uri}(p95={round(p95, 3) if p95 is not None else None}s "
+            f"err={round(self.error_rate, 3)} #R={self.requests} #E={self.errors} "
+            f"head={self.head} healthy={self.is_healthy()})"
+        )
+
+
+# Routes each request to the healthiest endpoint:
+# - endpoints are ranked by their median latency and recent error rate,
+# - a duplicate request is sent to the next endpoint if the first one
+#   doesn't respond within its p95 latency(hedged request),
+# - a failed request is retried on the next endpoint(failover),
+# - endpoints with consecutive errors, or whose head block falls behind
+#   the highest head by more than `max_head_lag` blocks, are ejected for a while.
+class EndpointRouter:
+    def __init__(
+        self,
+        endpoint_uris: List[str],
+        head_fetcher: Optional[Callable[[str], int]] = None,
+        max_head_lag: int = 5,
+        head_interval_seconds: float = 10,
+        hedge: bool = True,
+        min_hedge_samples: int = 20,
+        min_hedge_delay_seconds: float = 0.05,
+        max_consecutive_errors: int = 3,
+        cooldown_seconds: float = 30,
+        max_workers: int = 32,
+    ):
+        if len(endpoint_uris) == 0:
+            raise ValueError("at least one endpoint is required")
+
+        self.endpoints = [EndpointHealth(uri) for uri in endpoint_uris]
+        self.head_fetcher = head_fetcher
+        self.max_head_lag = max_head_lag
+        self.head_interval_seconds = head_interval_seconds
+        self.hedge = hedge and len(self.endpoints) > 1
+        self.min_hedge_samples = min_hedge_samples
+        self.min_hedge_delay_seconds = min_hedge_delay_seconds
+        self.max_consecutive_errors = max_consecutive_errors
+        self.cooldown_seconds = cooldown_seconds
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="endpoint-router"
+        )
+        self._head_lock = threading.Lock()
+        self._last_head_refresh = 0.0
+
+    def call(self, fn: Callable[[str], T]) -> T:
+        """Call `fn(endpoint_uri)` on the best endpoints,
+        return the first successful result, raise the last error if all of them failed.
+        """
+        self._maybe_refresh_heads()
+
+        candidates = self._rank()
+        pending = dict()
+        launched, hedged = 0, False
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            nonlocal launched
+            endpoint = candidates[launched]
+            launched += 1
+            future = self._executor.submit(self._timed_call, endpoint, fn)
+            pending[future] = endpoint
+
+        launch()
+        while len(pending) > 0:
+            timeout = None
+            if self.hedge and not hedged and launched < len(candidates):
+                timeout = self._hedge_delay(candidates[0])
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if len(done) == 0:
+                hedged = True
+                logger.debug(
+                    f"{candidates[launched-1].uri} doesn't respond in {timeout}s, "
+                    f"hedge to {candidates[launched].uri}"
+                )
+                launch()
+                continue
+
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    logger.warning(f"request to {endpoint.uri} failed: {e}")
+                    last_error = e
+
+            # failover to the next endpoint
+            if len(pending) == 0 and launched < len(candidates):
+                launch()
+
+        assert last_error is not None
+        raise last_error
+
+    def _timed_call(self, endpoint: EndpointHealth, fn: Callable[[str], T]) -> T:
+        st = time.time()
+        try:
+            result = fn(endpoint.uri)
+        except Exception:
+            endpoint.record_error(self.max_consecutive_errors, self.cooldown_seconds)
+            raise
+        endpoint.record_success(time.time() - st)
+        return result
+
+    def _rank(self) -> List[EndpointHealth]:
+        healthy = [e for e in self.endpoints if e.is_healthy()]
+        # don't give up if all of them are unhealthy
+        if len(healthy) == 0:
+            healthy = [e for e in self.endpoints if not e.behind] or self.endpoints
+        return sorted(healthy, key=lambda e: e.score())
+
+    def _hedge_delay(self, endpoint: EndpointHealth) -> Optional[float]:
+        if len(endpoint.latencies) < self.min_hedge_samples:
+            return None
+        p95 = endpoint.percentile(0.95) or 0.0
+        return max(p95, self.min_hedge_delay_seconds)
+
+    def _maybe_refresh_heads(self):
+        if self.head_fetcher is None:
+            return
+        if time.time() - self._last_head_refresh < self.head_interval_seconds:
+            return
+        if not self._head_lock.acquire(blocking=False):
+            return
+        self._last_head_refresh = time.time()
+        threading.Thread(
+            target=self._refresh_heads, name="endpoint-router-head", daemon=True
+        ).start()
+
+    def _refresh_heads(self):
+        try:
+            for endpoint in self.endpoints:
+                try:
+                    endpoint.head = self.head_fetcher(endpoint.uri)
+                except Exception as e:
+                    logger.warning(f"failed to get head block of {endpoint.uri}: {e}")
+                    endpoint.record_error(
+                        self.max_consecutive_errors, self.cooldown_seconds
+                    )
+
+            heads = [e.head for e in self.endpoints if e.head is not None]
+            if len(heads) == 0:
+                return
+            max_head = max(heads)
+            for endpoint in self.endpoints:
+                endpoint.behind = (
+                    endpoint.head is None
+                    or max_head - endpoint.head > self.max_head_lag
+                )
+                if endpoint.behind:
+                    logger.warning(
+                        f"eject {endpoint.uri}, head {endpoint.head} is behind {max_head}"
+                    )
+            logger.info(f"endpoints: {self.endpoints}")
+        finally:
+            self._head_lock.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
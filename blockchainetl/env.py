@@ -20,6 +20,19 @@ GETH_TRACE_IGNORE_GASUSED_ERROR = (
 )
 PARITY_TRACE_IGNORE_ERROR = os.getenv("BLOCKCHAIN_ETL_PARITY_TRACE_IGNORE_ERROR") == "1"
 
+# the receipts are fetched by eth_getBlockReceipts(one call for each block) if the
+# node supports it, set this to use eth_getTransactionReceipt for each transaction
+DISABLE_BLOCK_RECEIPTS = os.getenv("BLOCKCHAIN_ETL_DISABLE_BLOCK_RECEIPTS") == "1"
+
+# the geth blocks predicted to take longer than this(by their gas used) are traced
+# by debug_traceTransaction across the workers instead of debug_traceBlockByNumber
+GETH_TRACE_HEAVY_BLOCK_SECONDS = float(
+    os.getenv("BLOCKCHAIN_ETL_GETH_TRACE_HEAVY_BLOCK_SECONDS", "20")
+)
+# the timed out transactions are retried with a doubled tracer timeout up to this,
+# REQUEST_TIMEOUT_SECONDS should be large enough to cover it
+GETH_TRACE_MAX_TIMEOUT = os.getenv("BLOCKCHAIN_ETL_GETH_TRACE_MAX_TIMEOUT", "240s")
+
 # FIXME: disable if this issue is resolved https://github.com/Fantom-foundation/go-opera/issues/218
 IGNORE_PARENT_TRACE_MISSING = os.getenv("BLOCKCHAIN_ETL_IGNORE_TRACE_ERROR") == "1"
 
@@ -39,3 +52,38 @@ REQUEST_TIMEOUT_SECONDS = int(os.getenv("BLOCKCHAIN_ETL_REQUEST_TIMEOUT_SECONDS"
 
 SKIP_STREAM_IF_FAILED = os.getenv("BLOCKCHAIN_ETL_SKIP_STREAM_IF_FAILED") == "1"
 SKIP_STREAM_SAVE_PATH = os.getenv("BLOCKCHAIN_ETL_SKIP_STREAM_SAVE_PATH")
+
+# the memory limit of the write-through cache of the latest cumulative balances,
+# which saves the lookup of the previous balances from database, 0 to disable it
+BALANCE_CACHE_SIZE_MB = int(os.getenv("BLOCKCHAIN_ETL_BALANCE_CACHE_SIZE_MB", "256"))
+
+# share the resolved token metadata(symbol, name, decimals...) between workers,
+# tokens that can't be resolved are kept for TOKEN_STORE_NEGATIVE_TTL seconds
+TOKEN_STORE_REDIS_URL = os.getenv("BLOCKCHAIN_ETL_TOKEN_STORE_REDIS_URL")
+TOKEN_STORE_TTL = int(os.getenv("BLOCKCHAIN_ETL_TOKEN_STORE_TTL", str(7 * 86400)))
+TOKEN_STORE_NEGATIVE_TTL = int(
+    os.getenv("BLOCKCHAIN_ETL_TOKEN_STORE_NEGATIVE_TTL", "3600")
+)
+# resolve token metadata via Multicall3(eg: 0xcA11bde05977b3631167028862bE2a173976CA11)
+# instead of one eth_call for each function
+TOKEN_MULTICALL_ADDRESS = os.getenv("BLOCKCHAIN_ETL_TOKEN_MULTICALL_ADDRESS")
+
+# evaluate the alert rules by the closures compiled from their AST(rule_compiler.py)
+# instead of walking the AST for each item
+ALERT_COMPILE_RULES = os.getenv("BLOCKCHAIN_ETL_ALERT_COMPILE_RULES") == "1"
+
+# evaluate the alert rules over all the items of a block column-wise(rule_vectorizer.py),
+# the unsupported parts of the rules are evaluated row by row still
+ALERT_VECTORIZE_RULES = os.getenv("BLOCKCHAIN_ETL_ALERT_VECTORIZE_RULES") == "1"
+
+# the label index file bulk-loaded from the label table(`label-index` command), the
+# labels are looked up in it instead of the database if it's set
+LABEL_INDEX_PATH = os.getenv("BLOCKCHAIN_ETL_LABEL_INDEX_PATH")
+
+# the local UTXO index(SQLite) of the bitcoin forks, built by `btc.utxo-index` and
+# updated while streaming, the inputs are enriched from it instead of the node
+BTC_UTXO_INDEX_PATH = os.getenv("BLOCKCHAIN_ETL_BTC_UTXO_INDEX_PATH")
+
+# the decoder of the JSON-RPC responses: json or orjson(if it's installed), the
+# responses with the exact floats(bitcoin) are decoded by the stdlib json always
+JSON_RPC_DECODER = os.getenv("BLOCKCHAIN_ETL_JSON_RPC_DECODER", "json")
@@ -69,6 +69,19 @@ class BatchWorkExecutor:
         for batch in dynamic_batch_iterator(work_iterable, lambda: self.batch_size):
             self.executor.submit(self._fail_safe_execute, work_handler, batch)
 
+    # Executes a single batch request of each batch with the given provider,
+    # the request is built by `request_builder(batch)`,
+    # the response is handled by `response_handler(batch, response)`.
+    def execute_requests(
+        self, work_iterable, batch_web3_provider, request_builder, response_handler
+    ):
+        self.execute(
+            work_iterable,
+            lambda batch: request_and_handle(
+                batch, batch_web3_provider, request_builder, response_handler
+            ),
+        )
+
     def _fail_safe_execute(self, work_handler, batch):
         try:
             work_handler(batch)
@@ -117,6 +130,16 @@ class BatchWorkExecutor:
         self.executor.shutdown()
 
 
+def request_and_handle(batch, batch_web3_provider, request_builder, response_handler):
+    request = request_builder(batch)
+    # nothing to request, eg: the batch contains only empty blocks
+    if request is None:
+        response = None
+    else:
+        response = batch_web3_provider.make_batch_request(request)
+    response_handler(batch, response)
+
+
 def execute_with_retries(
     func, *args, max_retries=5, retry_exceptions=RETRY_EXCEPTIONS, sleep_seconds=1
 ):
@@ -0,0 +1,103 @@
+import logging
+from collections import deque
+
+from blockchainetl.executors.batch_work_executor import (
+    BatchWorkExecutor,
+    RETRY_EXCEPTIONS,
+    execute_with_retries,
+    request_and_handle,
+)
+from blockchainetl.utils import dynamic_batch_iterator
+
+
+# Executes the given work in batches through an asynchronous JSON-RPC provider,
+# keeps up to `max_in_flight` batch requests on the wire,
+# and handles the responses in the caller thread in the order they were submitted.
+class PipelinedBatchWorkExecutor:
+    def __init__(
+        self,
+        starting_batch_size,
+        max_in_flight,
+        retry_exceptions=RETRY_EXCEPTIONS,
+        max_retries=5,
+    ):
+        self.batch_size = starting_batch_size
+        self.max_in_flight = max_in_flight
+        self.retry_exceptions = retry_exceptions
+        self.max_retries = max_retries
+        self.logger = logging.getLogger("PipelinedBatchWorkExecutor")
+
+        # for work handlers which are not a single request/response,
+        # they are executed in a thread pool as usual
+        self._fallback = None
+
+    def execute(self, work_iterable, work_handler):
+        if self._fallback is None:
+            self._fallback = BatchWorkExecutor(
+                self.batch_size,
+                self.max_in_flight,
+                retry_exceptions=self.retry_exceptions,
+                max_retries=self.max_retries,
+            )
+        self._fallback.execute(work_iterable, work_handler)
+
+    def execute_requests(
+        self, work_iterable, batch_web3_provider, request_builder, response_handler
+    ):
+        def submit(batch):
+            request = request_builder(batch)
+            # nothing to request, eg: the batch contains only empty blocks
+            if request is None:
+                return None
+            return batch_web3_provider.submit_batch_request(request)
+
+        def handle(batch, pending):
+            try:
+                response = pending.result() if pending is not None else None
+                response_handler(batch, response)
+            except self.retry_exceptions:
+                self._retry_one_by_one(
+                    batch, batch_web3_provider, request_builder, response_handler
+                )
+
+        in_flight = deque()
+        for batch in dynamic_batch_iterator(work_iterable, lambda: self.batch_size):
+            in_flight.append((batch, submit(batch)))
+            if len(in_flight) >= self.max_in_flight:
+                handle(*in_flight.popleft())
+
+        while len(in_flight) > 0:
+            handle(*in_flight.popleft())
+
+    def _retry_one_by_one(
+        self, batch, batch_web3_provider, request_builder, response_handler
+    ):
+        self.logger.exception("An exception occurred while executing response_handler.")
+        self.logger.info(
+            "The batch of size {} will be retried one item at a time.".format(
+                len(batch)
+            )
+        )
+        for item in batch:
+            execute_with_retries(
+                request_and_handle,
+                [item],
+                batch_web3_provider,
+                request_builder,
+                response_handler,
+                max_retries=self.max_retries,
+                retry_exceptions=self.retry_exceptions,
+            )
+
+    def shutdown(self):
+        if self._fallback is not None:
+            self._fallback.shutdown()
+
+
+def new_batch_work_executor(
+    starting_batch_size, max_workers, batch_web3_provider, **kwargs
+):
+    # AsyncBatchHTTPProvider is able to keep many requests in flight without threads
+    if hasattr(batch_web3_provider, "submit_batch_request"):
+        return PipelinedBatchWorkExecutor(starting_batch_size, max_workers, **kwargs)
+    return BatchWorkExecutor(starting_batch_size, max_workers, **kwargs)
@@ -27,10 +27,16 @@ import pathlib
 import sys
 import shutil
 import logging
+import functools
 
-import s3fs
 
-s3 = s3fs.S3FileSystem()
+@functools.lru_cache(maxsize=None)
+def s3_filesystem():
+    # s3fs(aiobotocore) is slow to import, so it's imported and connected on the
+    # first use rather than by each `etl` command
+    import s3fs
+
+    return s3fs.S3FileSystem()
 
 
 def smart_copy_file(src, dst):
@@ -38,7 +44,7 @@ def smart_copy_file(src, dst):
 
     if src.startswith("s3://"):
         # FIXME: s3.get('aaa', '/tmp') returns None, but /tmp/aaa not exists
-        s3.get(src, os.path.join(dst, os.path.basename(src)))
+        s3_filesystem().get(src, os.path.join(dst, os.path.basename(src)))
     else:
         # FIXME: in some cases, the source file is exists, but shutil.copy2 failed to copy:
         # stack: Traceback (most recent call last):
@@ -78,7 +84,7 @@ def get_file_handle(filename, mode="w", binary=False, create_parent_dirs=True):
         pathlib.Path(dirname).mkdir(parents=True, exist_ok=True)
     full_mode = mode + ("b" if binary else "")
     if is_s3:
-        fh = s3.open(filename, full_mode)
+        fh = s3_filesystem().open(filename, full_mode)
     elif is_file:
         fh = open(filename, full_mode)
     elif filename == "-":
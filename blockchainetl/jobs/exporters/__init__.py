@@ -1,12 +1,32 @@
-from .composite_item_exporter import CompositeItemExporter  # noqa: F401
-from .console_item_exporter import ConsoleItemExporter  # noqa: F401
-from .file_item_exporter import FileItemExporter  # noqa: F401
-from .in_memory_item_exporter import InMemoryItemExporter  # noqa: F401
-from .kafka_item_exporter import KafkaItemExporter  # noqa: F401
-from .multi_item_exporter import MultiItemExporter  # noqa: F401
-from .pandas_item_exporter import PandasItemExporter  # noqa: F401
-from .postgres_item_exporter import PostgresItemExporter  # noqa: F401
-from .redis_item_exporter import RedisItemExporter  # noqa: F401
-from .redis_stream_item_exporter import RedisStreamItemExporter  # noqa: F401
-from .redis_publish_item_exporter import RedisPublishItemExporter  # noqa: F401
-from .slack_item_exporter import SlackItemExporter  # noqa: F401
+import importlib
+
+# the exporters are imported on the first access(PEP 562), importing a submodule
+# of the package shouldn't pull in all the clients(eg: kafka, redis)
+_EXPORTERS = {
+    "CompositeItemExporter": ".composite_item_exporter",
+    "ConsoleItemExporter": ".console_item_exporter",
+    "FileItemExporter": ".file_item_exporter",
+    "InMemoryItemExporter": ".in_memory_item_exporter",
+    "KafkaItemExporter": ".kafka_item_exporter",
+    "MultiItemExporter": ".multi_item_exporter",
+    "PandasItemExporter": ".pandas_item_exporter",
+    "PostgresItemExporter": ".postgres_item_exporter",
+    "RedisItemExporter": ".redis_item_exporter",
+    "RedisStreamItemExporter": ".redis_stream_item_exporter",
+    "RedisPublishItemExporter": ".redis_publish_item_exporter",
+    "SlackItemExporter": ".slack_item_exporter",
+}
+
+__all__ = list(_EXPORTERS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTERS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    exporter = getattr(importlib.import_module(_EXPORTERS[name], __name__), name)
+    globals()[name] = exporter
+    return exporter
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTERS))
@@ -3,17 +3,17 @@ from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from itertools import groupby
 from typing import Dict, List, Optional
 
-import pypeln as pl
-
 from blockchainetl.alert.receivers import BaseReceiver
 from blockchainetl.alert.rule_set import RuleSet
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.service.label_service import LabelService
-from blockchainetl.service.price_service import PriceService
+from blockchainetl.service.price_service import PriceKey, PriceService
 from blockchainetl.service.token_service import TokenService
 from ethereumetl.domain.token import EthToken
 
+LABELED_TYPES = ("tx", "token_xfer", "trace")
+
 
 class AlertExporter:
     def __init__(
@@ -40,6 +40,7 @@ class AlertExporter:
         self._token_service = token_service
         self._price_service = price_service
         self._label_service = label_service
+        self._enrich_executor = ThreadPoolExecutor(max_workers=1)
 
     def open(self):
         pass
@@ -127,47 +128,84 @@ class AlertExporter:
                     receiver.post(rule, result)
 
     def enrich_items(self, items: List[Dict]):
-        pl.thread.each(self.enrich_item, items, workers=10, run=True)
-
-    def enrich_item(self, item: Dict):
+        """Enriches the items of a block with a per-block plan: the distinct addresses,
+        tokens and (token, time) prices are resolved together(one bulk query or batch
+        call each), then joined into the items in memory."""
         ts = self._token_service
         ps = self._price_service
         lb = self._label_service
 
-        if lb is not None and item["type"] in ("tx", "token_xfer", "trace"):
-            self.enrich_address(lb, item)
-
-        if item["type"] in ("tx", "trace"):
-            self.enrich_ether(ps, item)
-        elif ts is not None and item["type"] == "token_xfer":
-            self.enrich_erc20(ts, ps, item)
+        # the labels are independent of the tokens and prices, resolve them meanwhile
+        labels = None
+        if lb is not None:
+            labels = self._enrich_executor.submit(
+                lb.labels_of,
+                [
+                    e[key]
+                    for e in items
+                    if e["type"] in LABELED_TYPES
+                    for key in ("from_address", "to_address")
+                ],
+            )
 
-    def enrich_address(self, lb: LabelService, item: Dict):
-        item["from_label"] = lb.label_of(item["from_address"])
-        item["to_label"] = lb.label_of(item["to_address"])
+        if ts is not None:
+            # enrich only if item is rpc or from not enriched db
+            unknown = [
+                e
+                for e in items
+                if e["type"] == "token_xfer"
+                and e.get("name") is None
+                and e.get("decimals") is None
+            ]
+            tokens = ts.get_tokens(e["token_address"] for e in unknown)
+            for item in unknown:
+                self.enrich_token(tokens[item["token_address"]], item)
+
+        prices = dict()
+        if ps is not None:
+            prices = ps.get_prices(self._chain, self.price_keys(items, ts is not None))
 
-    def enrich_ether(self, ps: PriceService, item: Dict):
+        for item in items:
+            if item["type"] in ("tx", "trace"):
+                self.enrich_ether(prices, item)
+            elif ts is not None and item["type"] == "token_xfer":
+                self.enrich_erc20(prices, item)
+
+        if labels is not None:
+            labels = labels.result()
+            for item in items:
+                if item["type"] in LABELED_TYPES:
+                    item["from_label"] = labels[item["from_address"]]
+                    item["to_label"] = labels[item["to_address"]]
+
+    def price_keys(self, items: List[Dict], with_erc20: bool) -> List[PriceKey]:
+        keys = []
+        for item in items:
+            if item["type"] in ("tx", "trace"):
+                keys.append((None, item.get("block_timestamp")))
+            elif (
+                with_erc20
+                and item["type"] == "token_xfer"
+                and item.get("decimals") is not None
+            ):
+                keys.append((item["token_address"], item.get("block_timestamp")))
+        return keys
+
+    def enrich_token(self, token: EthToken, item: Dict):
+        item["name"] = token.symbol or token.name
+        item["decimals"] = token.decimals
+
+    def enrich_ether(self, prices: Dict[PriceKey, Optional[float]], item: Dict):
         # convert Decimals to float
         # else raise TypeError: unsupported operand type(s) for *: 'float' and 'decimal.Decimal'
         # The value field may not exist or is None,
         # eg: https://cronoscan.com/tx/0x0893bd0b33bcb00c69c5d8d9d59c0077efdfcb0eaa4a3d454607b910e6a6293d # noqa
         item["value_amount"] = float((item.get("value") or 0)) / 1e18
 
-        if ps is not None:
-            price = ps.get_price(self._chain, day=item.get("block_timestamp"))
+        price = prices.get((None, item.get("block_timestamp")))
         item["value_usd"] = item["value_amount"] * price if price else None
 
-    def enrich_erc20(self, ts: TokenService, ps: PriceService, item: Dict):
-        token_address = item["token_address"]
-
-        # enrich only if item is rpc or from not enriched db
-        if item.get("name") is None and item.get("decimals") is None:
-            token: EthToken = ts.get_token(token_address)
-            if item.get("name") is None:
-                item["name"] = token.symbol or token.name
-
-            item["decimals"] = token.decimals
-
+    def enrich_erc20(self, prices: Dict[PriceKey, Optional[float]], item: Dict):
         # set default attributes to None
         item["value_amount"] = None
         item["value_usd"] = None
@@ -175,11 +213,8 @@ class AlertExporter:
         if decimals is not None:
             item["value_amount"] = float(item["value"]) / math.pow(10, decimals)
 
-            if ps is not None:
-                price = ps.get_price(
-                    self._chain, token_address, day=item.get("block_timestamp")
-                )
+            price = prices.get((item["token_address"], item.get("block_timestamp")))
             item["value_usd"] = item["value_amount"] * price if price else None
 
     def close(self):
-        pass
+        self._enrich_executor.shutdown()
@@ -1,4 +1,5 @@
 from .composite_item_converter import CompositeItemConverter  # noqa: F401
+from .fused_item_converter import FusedItemConverter  # noqa: F401
 from .nan_to_none_item_converter import NanToNoneItemConverter  # noqa: F401
 from .int_to_string_item_converter import IntToStringItemConverter  # noqa: F401
 from .int_to_decimal_item_converter import IntToDecimalItemConverter  # noqa: F401
@@ -1,4 +1,5 @@
 from datetime import datetime, timezone
+from functools import lru_cache
 
 
 class AppendTimestampItemConverter:
@@ -16,8 +17,14 @@ def to_timestamp(st):
     if isinstance(st, int):
         return st
     else:
-        return int(
-            datetime.strptime(st, "%Y-%m-%d %H:%M:%S")
-            .replace(tzinfo=timezone.utc)
-            .timestamp()
-        )
+        return parse_timestamp(st)
+
+
+# all the items in one block share the same timestamp
+@lru_cache(maxsize=1024)
+def parse_timestamp(st: str) -> int:
+    return int(
+        datetime.strptime(st, "%Y-%m-%d %H:%M:%S")
+        .replace(tzinfo=timezone.utc)
+        .timestamp()
+    )
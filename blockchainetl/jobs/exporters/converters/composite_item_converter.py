@@ -30,7 +30,7 @@
 # copies of the Software, and to permit persons to whom the Software is
 # furnished to do so, subject to the following conditions:
 
-from typing import Tuple, Dict, Optional
+from typing import Tuple, Dict, List, Optional
 
 
 class CompositeItemConverter:
@@ -44,3 +44,6 @@ class CompositeItemConverter:
         for converter in self.converters:
             item = converter.convert_item(item)
         return item
+
+    def convert_items(self, items: List[Dict]) -> List[Dict]:
+        return [self.convert_item(item) for item in items]
@@ -0,0 +1,181 @@
+from typing import Dict, List, Optional, Tuple
+
+from .composite_item_converter import CompositeItemConverter
+from .simple_item_converter import SimpleItemConverter
+from .rename_field_item_converter import RenameFieldItemConverter
+
+_MISSING = object()
+
+
+class FieldStage:
+    """A run of consecutive key/field converters (SimpleItemConverter and RenameFieldItemConverter)
+    applied in one pass over the item.
+
+    For each item type and key layout, the renames and the field conversions of every converter
+    are resolved once into a plan of `(output key, input key, field converters)`,
+    so that the item is walked once instead of once per converter.
+    """
+
+    max_plans = 1024
+
+    def __init__(self, converters: List):
+        self.converters = converters
+        self._plans: Dict[Tuple, Optional[Tuple]] = dict()
+        self._static_fields = self._compile_static()
+
+    def convert_item(self, item: Dict, in_place: bool = False) -> Dict:
+        # the converted fields are known without looking at the item
+        if self._static_fields is not None:
+            result = item if in_place else item.copy()
+            for key, convert_fields in self._static_fields:
+                if key not in result:
+                    continue
+                value = result[key]
+                for convert_field, field_key in convert_fields:
+                    value = convert_field(field_key, value)
+                result[key] = value
+            return result
+
+        keys = tuple(item)
+        cache_key = (item.get("type"), keys)
+        plan = self._plans.get(cache_key, _MISSING)
+        if plan is _MISSING:
+            if len(self._plans) >= self.max_plans:
+                self._plans.clear()
+            plan = self._plans[cache_key] = self._compile(item, keys)
+
+        # can't be fused, convert one by one
+        if plan is None:
+            for converter in self.converters:
+                item = converter.convert_item(item)
+            return item
+
+        renamed, fields = plan
+        if renamed is False:
+            result = item if in_place else item.copy()
+            for key, convert_fields in fields:
+                value = result[key]
+                for convert_field, field_key in convert_fields:
+                    value = convert_field(field_key, value)
+                result[key] = value
+            return result
+
+        result = dict()
+        for key, input_key, convert_fields in fields:
+            value = item[input_key]
+            for convert_field, field_key in convert_fields:
+                value = convert_field(field_key, value)
+            result[key] = value
+        return result
+
+    def _compile_static(self) -> Optional[List[Tuple]]:
+        # only for the converters without renaming and with explicit keys,
+        # eg: IntToStringItemConverter(keys=[...])
+        fields = dict()
+        for converter in self.converters:
+            if not isinstance(converter, SimpleItemConverter):
+                return None
+            if type(converter).convert_key is not SimpleItemConverter.convert_key:
+                return None
+            keys = getattr(converter, "keys", None)
+            if not isinstance(keys, (set, frozenset)):
+                return None
+            for key in sorted(keys):
+                fields.setdefault(key, [])
+
+        for key, convert_fields in fields.items():
+            for converter in self.converters:
+                if converter.converts_field(key):
+                    convert_fields.append((converter.convert_field, key))
+        return [(key, tuple(fns)) for key, fns in fields.items() if fns]
+
+    def _compile(self, item: Dict, keys: Tuple) -> Optional[Tuple]:
+        current = list(keys)
+        convert_fields = [[] for _ in keys]
+        for converter in self.converters:
+            if isinstance(converter, RenameFieldItemConverter):
+                # the mapping is chosen by item type,
+                # only fuse it if the type field is still the original one
+                sources = [i for i, key in enumerate(current) if key == "type"]
+                if (
+                    len(sources) != 1
+                    or keys[sources[0]] != "type"
+                    or len(convert_fields[sources[0]]) > 0
+                ):
+                    return None
+                mapping = converter.item_mapping.get(item["type"])
+                if mapping is not None:
+                    current = [mapping.get(key, key) for key in current]
+            else:
+                for i, key in enumerate(current):
+                    if converter.converts_field(key):
+                        convert_fields[i].append((converter.convert_field, key))
+                current = [converter.convert_key(key) for key in current]
+
+        if current == list(keys):
+            fields = [
+                (key, tuple(fns)) for key, fns in zip(keys, convert_fields) if fns
+            ]
+            return False, fields
+
+        # the same as dict comprehension, if several keys are renamed into one,
+        # it keeps the position of the first one and the value of the last one
+        fields = [
+            (key, input_key, tuple(fns))
+            for key, input_key, fns in zip(current, keys, convert_fields)
+        ]
+        return True, fields
+
+
+class FusedItemConverter(CompositeItemConverter):
+    """Drop-in replacement of CompositeItemConverter with exactly the same output.
+
+    Consecutive key/field converters are fused into one FieldStage,
+    the other converters(eg: AppendDateItemConverter) are applied as is.
+    """
+
+    def __init__(self, converters: Optional[Tuple] = None):
+        CompositeItemConverter.__init__(self, converters)
+        self.stages = fuse_converters(converters) if converters is not None else []
+
+    def convert_item(self, item: Dict):
+        if self.converters is None:
+            return item
+
+        # the input item is never modified, unless the first converter does so
+        owned = False
+        for stage in self.stages:
+            if isinstance(stage, FieldStage):
+                item = stage.convert_item(item, in_place=owned)
+                owned = True
+            else:
+                item = stage.convert_item(item)
+        return item
+
+    def convert_items(self, items: List[Dict]) -> List[Dict]:
+        convert_item = self.convert_item
+        return [convert_item(item) for item in items]
+
+
+def fuse_converters(converters) -> List:
+    stages = []
+    run = []
+    for converter in converters:
+        if is_field_converter(converter):
+            run.append(converter)
+            continue
+        if len(run) > 0:
+            stages.append(FieldStage(run))
+            run = []
+        stages.append(converter)
+    if len(run) > 0:
+        stages.append(FieldStage(run))
+    return stages
+
+
+def is_field_converter(converter) -> bool:
+    if isinstance(converter, RenameFieldItemConverter):
+        return type(converter).convert_item is RenameFieldItemConverter.convert_item
+    if isinstance(converter, SimpleItemConverter):
+        return type(converter).convert_item is SimpleItemConverter.convert_item
+    return False
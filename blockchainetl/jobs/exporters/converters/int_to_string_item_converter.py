@@ -43,3 +43,6 @@ class IntToStringItemConverter(SimpleItemConverter):
             return str(value)
         else:
             return value
+
+    def converts_field(self, key):
+        return self.keys is None or key in self.keys
@@ -13,3 +13,6 @@ class ListToStringItemConverter(SimpleItemConverter):
             return str(value)
         else:
             return value
+
+    def converts_field(self, key):
+        return self.keys is None or key in self.keys
@@ -43,3 +43,8 @@ class SimpleItemConverter:
 
     def convert_field(self, key, value):
         return value
+
+    # whether convert_field may change the value of this key or not,
+    # FusedItemConverter passes the other fields through as is
+    def converts_field(self, key):
+        return type(self).convert_field is not SimpleItemConverter.convert_field
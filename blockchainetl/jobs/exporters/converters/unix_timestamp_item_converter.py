@@ -21,6 +21,7 @@
 # SOFTWARE.
 
 from datetime import datetime
+from functools import lru_cache
 
 from .simple_item_converter import SimpleItemConverter
 
@@ -32,11 +33,20 @@ class UnixTimestampItemConverter(SimpleItemConverter):
         else:
             return value
 
+    def converts_field(self, key):
+        return key is not None and key.endswith("timestamp")
+
 
 def to_timestamp(value):
     if isinstance(value, int):
-        return datetime.utcfromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+        return format_unix_timestamp(value)
     elif isinstance(value, datetime):
         return value.strftime("%Y-%m-%d %H:%M:%S")
     else:
         return value
+
+
+# all the items in one block share the same timestamp
+@lru_cache(maxsize=1024)
+def format_unix_timestamp(value: int) -> str:
+    return datetime.utcfromtimestamp(value).strftime("%Y-%m-%d %H:%M:%S")
@@ -10,6 +10,7 @@ from typing import List, Dict, Optional
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.enumeration.column_type import ColumnType
+from blockchainetl.misc.arrow_file import FILE_FORMAT_CSV, save_df_into_arrow_file
 from blockchainetl.misc.pd_write_file import save_df_into_file
 from blockchainetl.utils import time_elapsed
 from bitcoinetl.enumeration.column_type import ColumnType as BtcColumnType
@@ -24,6 +25,7 @@ class FileItemExporter:
         notify_callback=None,
         output_file: Optional[str] = None,
         df_saver=None,
+        file_format: str = FILE_FORMAT_CSV,
     ):
         assert not (
             output_dir is None and output_file is None
@@ -33,6 +35,7 @@ class FileItemExporter:
         self._notify_callback = notify_callback
         self._output_file = output_file
         self._df_saver = df_saver
+        self._file_format = file_format
 
         if output_dir is not None and not output_dir.startswith("s3://"):
             os.makedirs(output_dir, exist_ok=True)
@@ -118,17 +121,27 @@ class FileItemExporter:
             base_dir = os.path.join(base_dir, entity_type)
             if not base_dir.startswith("s3://"):
                 os.makedirs(base_dir, exist_ok=True)
-            output = os.path.join(base_dir, f"{block_num}.csv")
+            output = os.path.join(base_dir, f"{block_num}.{self._file_format}")
         else:
             output = self._output_file
 
-        save_df_into_file(
-            df,
-            output,
-            columns=self._ct[entity_type],
-            types=self._ct.astype(entity_type),
-            entity_type=entity_type,
-        )
+        if self._file_format == FILE_FORMAT_CSV:
+            save_df_into_file(
+                df,
+                output,
+                columns=self._ct[entity_type],
+                types=self._ct.astype(entity_type),
+                entity_type=entity_type,
+            )
+        else:
+            save_df_into_arrow_file(
+                df,
+                output,
+                columns=self._ct[entity_type],
+                types=self._ct.astype(entity_type),
+                entity_type=entity_type,
+                file_format=self._file_format,
+            )
 
         st2 = time()
         if len(df) > 1024:
@@ -1,4 +1,7 @@
 from blockchainetl.jobs.exporters.postgres_item_exporter import PostgresItemExporter
+from blockchainetl.jobs.exporters.postgres_copy_item_exporter import (
+    PostgresCopyItemExporter,
+)
 from blockchainetl.streaming.postgres_utils import create_insert_statement_for_table
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.enumeration.entity_type import EntityType
@@ -25,12 +28,14 @@ def create_postgres_exporter(
     pool_size=5,
     batch_size=100,
     print_sql=False,
+    copy_mode=False,
 ):
     item_exporter_type = determine_item_exporter_type(connection_url)
     if item_exporter_type != ItemExporterType.POSTGRES:
         raise ValueError("not implemented")
 
-    item_exporter = PostgresItemExporter(
+    exporter_class = PostgresCopyItemExporter if copy_mode else PostgresItemExporter
+    item_exporter = exporter_class(
         connection_url,
         dbschema,
         item_type_to_insert_stmt_mapping={
@@ -107,6 +112,7 @@ def create_tsdb_exporter(
     pool_size=5,
     batch_size=100,
     print_sql=False,
+    copy_mode=False,
 ):
     item_exporter_type = determine_item_exporter_type(connection_url)
     if item_exporter_type != ItemExporterType.POSTGRES:
@@ -144,7 +150,8 @@ def create_tsdb_exporter(
             EntityType.TRACE: create_insert_statement_for_table(btc_ts.TRACES, False),
         }
 
-    return PostgresItemExporter(
+    exporter_class = PostgresCopyItemExporter if copy_mode else PostgresItemExporter
+    return exporter_class(
         connection_url,
         dbschema,
         item_type_to_insert_stmt_mapping=item_type_to_insert_stmt_mapping,
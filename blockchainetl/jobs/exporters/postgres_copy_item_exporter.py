@@ -0,0 +1,141 @@
+import io
+import json
+import logging
+import concurrent.futures
+from decimal import Decimal
+from typing import List, Dict, Iterable
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Engine, Connection
+from sqlalchemy.dialects.postgresql.dml import Insert, OnConflictDoUpdate
+
+from blockchainetl.streaming.postgres_utils import POSTGRES_COPY_BUFFER_SIZE
+from .postgres_item_exporter import PostgresItemExporter
+from ._utils import group_by_item_type
+
+
+# Loads items with `COPY FROM STDIN` instead of executemany INSERTs:
+# - the converted rows of each entity type are streamed as CSV into
+#   a session-level temporary staging table(created once per pooled connection),
+# - then merged into the target table by a single `INSERT ... SELECT ... ON CONFLICT`,
+#   so that the ON CONFLICT clause of the original insert statement still applies.
+# Everything of an entity type is done in one transaction, the staging table is
+# emptied on commit.
+class PostgresCopyItemExporter(PostgresItemExporter):
+    def __init__(self, *args, **kwargs):
+        if kwargs.get("multiprocess") is True:
+            raise ValueError("multiprocess is not supported in copy mode")
+        PostgresItemExporter.__init__(self, *args, **kwargs)
+
+    def export_items(self, items: List[Dict]) -> int:
+        if len(items) == 0:
+            return 0
+
+        items_grouped_by_type = group_by_item_type(items)
+
+        rowcount = 0
+        futures = []
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            for item_type, insert_stmt in self.item_type_to_insert_stmt_mapping.items():
+                item_group = items_grouped_by_type.get(item_type)
+                if item_group is None:
+                    continue
+
+                converted_items = self.convert_items(item_group)
+                f = executor.submit(
+                    copy_in_thread, self.engine, insert_stmt, converted_items
+                )
+                futures.append(f)
+            for f in concurrent.futures.as_completed(futures):
+                exception = f.exception()
+                if exception:
+                    logging.error(exception)
+                    raise Exception(exception)
+                rowcount += f.result()
+        return rowcount
+
+
+def copy_in_thread(engine: Engine, stmt: Insert, items: List[Dict]) -> int:
+    table = stmt.table
+    columns = [c.name for c in table.columns if any(c.name in e for e in items)]
+    if isinstance(getattr(stmt, "_post_values_clause", None), OnConflictDoUpdate):
+        # ON CONFLICT DO UPDATE can't affect the same row twice in one command
+        items = dedup_by_primary_key(table, items)
+
+    staging = f"tmp_copy_{table.name}"
+    with engine.connect() as conn:
+        with conn.begin():
+            create_staging_table(conn, table, staging)
+            copy_into_staging_table(conn, staging, columns, items)
+
+            staging_table = sa.table(staging, *[sa.column(c) for c in columns])
+            merge_stmt = stmt.from_select(
+                columns, sa.select(*[staging_table.c[c] for c in columns])
+            )
+            return conn.execute(merge_stmt).rowcount
+
+
+def create_staging_table(conn: Connection, table: sa.Table, staging: str):
+    preparer = conn.dialect.identifier_preparer
+    # temporary tables live in pg_temp, which is searched before the search_path
+    conn.execute(
+        sa.text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {preparer.quote(staging)} "
+            f"(LIKE {preparer.format_table(table)} INCLUDING DEFAULTS) "
+            "ON COMMIT DELETE ROWS"
+        )
+    )
+
+
+def copy_into_staging_table(
+    conn: Connection, staging: str, columns: List[str], items: List[Dict]
+):
+    preparer = conn.dialect.identifier_preparer
+    stream = io.StringIO()
+    write_csv_rows(stream, columns, items)
+    stream.seek(0)
+
+    quoted = ", ".join(preparer.quote(c) for c in columns)
+    # use the DBAPI cursor of the same connection, so COPY is in the same transaction
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {preparer.quote(staging)} ({quoted}) FROM STDIN WITH (FORMAT csv)",
+            stream,
+            POSTGRES_COPY_BUFFER_SIZE,
+        )
+
+
+def dedup_by_primary_key(table: sa.Table, items: List[Dict]) -> List[Dict]:
+    keys = [c.name for c in table.columns if c.primary_key]
+    if len(keys) == 0:
+        return items
+
+    # the latter wins, as executemany INSERT ... ON CONFLICT DO UPDATE does
+    result = dict()
+    for item in items:
+        result[tuple(item.get(k) for k in keys)] = item
+    return list(result.values())
+
+
+def write_csv_rows(stream: io.StringIO, columns: List[str], items: Iterable[Dict]):
+    for item in items:
+        stream.write(",".join(to_csv_field(item.get(c)) for c in columns))
+        stream.write("\n")
+
+
+def to_csv_field(value) -> str:
+    # an unquoted empty field is NULL, a quoted one("") is an empty string
+    if value is None:
+        return ""
+    # bool is a subclass of int, check it first
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, Decimal)):
+        return str(value)
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    else:
+        value = str(value)
+    return '"' + value.replace('"', '""') + '"'
@@ -2,14 +2,15 @@ import logging
 import concurrent.futures
 from functools import lru_cache
 from multiprocessing.pool import Pool
-from typing import List, Dict
+from datetime import datetime
+from typing import List, Dict, Optional
 
 from sqlalchemy.engine.base import Engine
 from sqlalchemy.dialects.postgresql.dml import Insert
 
 from blockchainetl.utils import dynamic_batch_iterator
 from blockchainetl.misc.sqlalchemy_extra import sqlalchemy_engine_builder
-from .converters.composite_item_converter import CompositeItemConverter
+from .converters.fused_item_converter import FusedItemConverter
 from ._utils import group_by_item_type
 
 
@@ -30,7 +31,7 @@ class PostgresItemExporter:
         self.connection_url = connection_url
         self.dbschema = dbschema
         self.item_type_to_insert_stmt_mapping = item_type_to_insert_stmt_mapping
-        self.converter = CompositeItemConverter(converters)
+        self.converter = FusedItemConverter(converters)
         self.print_sql = print_sql
         self.workers = workers
         self.pool_size = pool_size
@@ -108,14 +109,34 @@ class PostgresItemExporter:
             rowcount += result
         return rowcount
 
+    def rollback_blocks(
+        self,
+        start_block: int,
+        end_block: int,
+        start_timestamp: Optional[datetime] = None,
+    ) -> int:
+        """Deletes the rows of the blocks in [start_block, end_block] in one transaction,
+        eg: the orphaned blocks of a chain reorganization."""
+        rowcount = 0
+        with self.engine.begin() as conn:
+            for insert_stmt in self.item_type_to_insert_stmt_mapping.values():
+                table = insert_stmt.table
+                if "blknum" not in table.c:
+                    continue
+                cond = table.c.blknum.between(start_block, end_block)
+                # skip the chunks of hypertable before the orphaned blocks
+                if start_timestamp is not None and "block_timestamp" in table.c:
+                    cond = cond & (table.c.block_timestamp >= start_timestamp)
+                rowcount += conn.execute(table.delete().where(cond)).rowcount
+        return rowcount
+
     def export_item(self, item: Dict) -> int:
         item = self.converter.convert_item(item)
         insert_stmt = self.item_type_to_insert_stmt_mapping[item["type"]]
         return execute_in_thread(self.engine, insert_stmt, [item])
 
-    def convert_items(self, items: List[Dict]):
-        for item in items:
-            yield self.converter.convert_item(item)
+    def convert_items(self, items: List[Dict]) -> List[Dict]:
+        return self.converter.convert_items(items)
 
     def create_engine(self) -> Engine:
         builder = sqlalchemy_engine_builder(
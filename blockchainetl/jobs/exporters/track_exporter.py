@@ -269,6 +269,7 @@ class TrackExporter:
         ts: EthTokenService = self._token_service
         if ts is None:
             return df
+        ts.get_tokens(df["token_address"].unique(), self._chain)
 
         def apply_decimals(token_address, val):
             token: EthToken = ts.get_token(token_address, self._chain)
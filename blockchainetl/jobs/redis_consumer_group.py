@@ -1,12 +1,43 @@
+"""Consumes a Redis stream with a consumer group.
+
+Each consumer reads the messages in batches(XREADGROUP COUNT), runs the handler of
+them on a bounded pool of threads(each with its own initer() resource), and reads
+no more than the free slots of the pool. The handled messages are acked together,
+pipelined with the next XREADGROUP in one round trip. A failed message is not
+acked, the consumer stops after acking the others, and the message is reclaimed by
+the autoclaim consumer once it's idle for `min_idle_seconds`, which sleeps until
+the oldest pending message turns idle enough rather than a fixed interval.
+"""
+
+import queue
 import redis
 import logging
 from redis import DataError
 from time import time, sleep
-from typing import Callable, Dict, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from enum import Enum
 from threading import Thread
 from multiprocessing import Process
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from prometheus_client import Counter, Gauge
+
+CONSUMED_MESSAGES = Counter(
+    "redis_consumer_messages",
+    "The messages handled by the consumers",
+    ["stream", "group", "status"],
+)
+CONSUMER_GROUP_LAG = Gauge(
+    "redis_consumer_group_lag",
+    "The messages not delivered to the consumer group yet",
+    ["stream", "group"],
+)
+CONSUMER_GROUP_PENDING = Gauge(
+    "redis_consumer_group_pending",
+    "The messages delivered to the consumer group but not acked",
+    ["stream", "group"],
+)
+
+STAT_INTERVAL_SECONDS = 60
 
 
 class RedisConsumerGroupWorkerMode(Enum):
@@ -22,14 +53,123 @@ class RedisConsumerGroupWorkerMode(Enum):
             return RedisConsumerGroupWorkerMode.Thread
         elif s == "process":
             return RedisConsumerGroupWorkerMode.Process
-        if s == "thread-pool":
+        elif s == "thread-pool":
             return RedisConsumerGroupWorkerMode.ThreadPool
-        elif s == "process":
+        elif s == "process-pool":
             return RedisConsumerGroupWorkerMode.ProcessPool
         else:
             raise ValueError("Invalid mode")
 
 
+class _HandlerPool(object):
+    """Runs the handler of the messages on `size` threads, each thread calls
+    initer() once, or in the consumer's thread if size is 1. The error of initer()
+    is raised in the consumer's thread either way."""
+
+    def __init__(
+        self,
+        handler: Callable[[Any, float, Dict], None],
+        initer: Optional[Callable],
+        deiniter: Optional[Callable],
+        size: int,
+    ):
+        self._handler = handler
+        self._initer = initer
+        self._deiniter = deiniter
+        self._size = max(size, 1)
+        self._in_flight = 0
+        self._done: "queue.Queue[Tuple[bytes, Optional[Exception]]]" = queue.Queue()
+        self._tasks: "queue.Queue[Optional[Tuple[bytes, Dict]]]" = queue.Queue()
+        self._threads: List[Thread] = []
+        if self._size == 1:
+            self._inited = initer() if initer else None
+        else:
+            inits: "queue.Queue[Optional[Exception]]" = queue.Queue()
+            self._threads = [
+                Thread(target=self._work, args=(inits,)) for _ in range(self._size)
+            ]
+            for t in self._threads:
+                t.start()
+            errors = [e for e in (inits.get() for _ in self._threads) if e is not None]
+            if len(errors) > 0:
+                self._stop()
+                raise errors[0]
+
+    def _handle(self, inited, ackid: bytes, keyvals: Dict):
+        try:
+            self._handler(inited, time(), keyvals)
+            self._done.put((ackid, None))
+        except Exception as e:
+            self._done.put((ackid, e))
+
+    def _work(self, inits: "queue.Queue[Optional[Exception]]"):
+        try:
+            inited = self._initer() if self._initer else None
+        except Exception as e:
+            inits.put(e)
+            return
+        inits.put(None)
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                self._handle(inited, *task)
+        finally:
+            if self._deiniter is not None:
+                self._deiniter(inited)
+
+    def _stop(self):
+        for _ in self._threads:
+            self._tasks.put(None)
+        for t in self._threads:
+            t.join()
+
+    def free(self) -> int:
+        return self._size - self._in_flight
+
+    def submit(self, ackid: bytes, keyvals: Dict):
+        self._in_flight += 1
+        if self._size == 1:
+            self._handle(self._inited, ackid, keyvals)
+        else:
+            self._tasks.put((ackid, keyvals))
+
+    def completed(
+        self, timeout: Optional[float] = None
+    ) -> Tuple[List[bytes], Optional[Exception]]:
+        """Returns the handled messages and the first error, waits up to `timeout`
+        seconds for one if there is none yet."""
+        ackids, error = [], None
+        while self._in_flight > 0:
+            try:
+                if len(ackids) == 0 and error is None and timeout is not None:
+                    ackid, e = self._done.get(timeout=timeout)
+                else:
+                    ackid, e = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight -= 1
+            if e is None:
+                ackids.append(ackid)
+            elif error is None:
+                error = e
+        return ackids, error
+
+    def close(self) -> List[bytes]:
+        """Waits for the messages in flight, returns the handled ones."""
+        ackids = []
+        while self._in_flight > 0:
+            ackid, e = self._done.get()
+            self._in_flight -= 1
+            if e is None:
+                ackids.append(ackid)
+        self._stop()
+        if self._size == 1 and self._deiniter is not None:
+            self._deiniter(self._inited)
+        return ackids
+
+
 class RedisConsumerGroup(object):
     def __init__(
         self,
@@ -40,7 +180,10 @@ class RedisConsumerGroup(object):
         workers: int = 1,
         worker_mode: str = "thread",
         period_seconds: int = 5,
+        concurrency: int = 1,
+        min_idle_seconds: int = 600,
     ):
+        self._redis_url = redis_url
         self._red = redis.from_url(redis_url)
         self._stream_name = stream_name
         self._consumer_group = consumer_group
@@ -48,6 +191,19 @@ class RedisConsumerGroup(object):
         self._workers = workers
         self._worker_mode = RedisConsumerGroupWorkerMode.from_str(worker_mode)
         self._period_seconds = period_seconds
+        # the messages handled at the same time by each consumer
+        self._concurrency = concurrency
+        self._min_idle_seconds = min_idle_seconds
+
+    def __getstate__(self):
+        # the connection pool can't be pickled into the process(-pool) workers
+        state = self.__dict__.copy()
+        del state["_red"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._red = redis.from_url(self._redis_url)
 
     def _mp(self):
         if self._worker_mode == RedisConsumerGroupWorkerMode.Process:
@@ -67,10 +223,10 @@ class RedisConsumerGroup(object):
 
     def consume(
         self,
-        handler: Callable[[float, Dict], None],
+        handler: Callable[[Any, float, Dict], None],
         initer: Optional[Callable[..., Any]] = None,
         deiniter: Optional[Callable[..., Any]] = None,
-        count: int = 1,
+        count: int = 16,
         block: int = 10,
         is_leader: bool = False,
     ):
@@ -103,44 +259,50 @@ class RedisConsumerGroup(object):
                 count=count,
                 block=block,
             )
+            return
 
-        mp = self._mp()
-        threads = [
-            mp(
-                target=self.consumer_consume,
-                args=(self.consumer_name(idx), handler),
-                kwargs=dict(
-                    initer=initer,
-                    deiniter=deiniter,
-                    autoclaim=False,
-                    leader=idx == 0,
-                    count=count,
-                    block=block,
-                ),
-            )
-            for idx in range(0, self._workers)
+        consumers = [
+            (self.consumer_name(idx), False, idx == 0) for idx in range(self._workers)
         ]
-        threads.append(
-            mp(
-                target=self.consumer_consume,
-                args=(self.consumer_name(-1), handler),
-                kwargs=dict(
-                    initer=initer,
-                    deiniter=deiniter,
-                    autoclaim=True,
-                    leader=False,
-                    count=count,
-                    block=block,
-                ),
-            )
-        )
-
-        for p in threads:
-            p.start()
+        # the last one reclaims the messages of the dead consumers
+        consumers.append((self.consumer_name(-1), True, False))
+        kwargs = dict(initer=initer, deiniter=deiniter, count=count, block=block)
+
+        if self._worker_mode in (
+            RedisConsumerGroupWorkerMode.ThreadPool,
+            RedisConsumerGroupWorkerMode.ProcessPool,
+        ):
+            with self._mp_pool()(max_workers=len(consumers)) as executor:
+                futures = [
+                    executor.submit(
+                        self.consumer_consume,
+                        consumer,
+                        handler,
+                        autoclaim=autoclaim,
+                        leader=leader,
+                        **kwargs,
+                    )
+                    for consumer, autoclaim, leader in consumers
+                ]
+                # raise the error of the failed consumer
+                for future in futures:
+                    future.result()
+        else:
+            mp = self._mp()
+            threads = [
+                mp(
+                    target=self.consumer_consume,
+                    args=(consumer, handler),
+                    kwargs=dict(autoclaim=autoclaim, leader=leader, **kwargs),
+                )
+                for consumer, autoclaim, leader in consumers
+            ]
+            for p in threads:
+                p.start()
 
-        for p in threads:
-            if p.is_alive():
-                p.join()
+            for p in threads:
+                if p.is_alive():
+                    p.join()
 
         logging.info("finish all tasks")
 
@@ -155,7 +317,7 @@ class RedisConsumerGroup(object):
         deiniter: Optional[Callable] = None,
         autoclaim: bool = False,
         leader: bool = False,
-        count: int = 1,
+        count: int = 16,
         block: int = 10,
     ):
         stream = self._stream_name
@@ -163,63 +325,75 @@ class RedisConsumerGroup(object):
 
         logging.info(
             f"start consume with stream={stream} group={cgroup} consumer={consumer} "
-            f"autoclaim={autoclaim}"
+            f"autoclaim={autoclaim} concurrency={self._concurrency}"
         )
 
-        inited = initer() if initer else None
-
-        def handle(ackid, keyvals):
-            logging.info(f"consumer:{consumer} => ({ackid}, {keyvals})")
-            handler(inited, time(), keyvals)
-            self._red.xack(stream, cgroup, ackid)
+        def handle(inited, st: float, keyvals: Dict):
+            logging.info(f"consumer:{consumer} => {keyvals}")
+            handler(inited, st, keyvals)
 
+        pool = _HandlerPool(handle, initer, deiniter, self._concurrency)
+        ackids: List[bytes] = []
         try:
-            self._loop_consume(consumer, handle, autoclaim, leader, count, block)
+            if autoclaim is True:
+                self._claim_consume(consumer, pool, ackids, count)
+            else:
+                self._normal_consume(consumer, pool, ackids, leader, count, block)
         finally:
-            if deiniter is not None:
-                deiniter(inited)  # type: ignore
-
-    def _loop_consume(
-        self,
-        consumer: str,
-        handle: Callable[[str, Dict], None],
-        autoclaim: bool = False,
-        leader: bool = False,
-        count: int = 1,
-        block: int = 10,
+            # ack the handled ones, the failed one is left to be reclaimed
+            ackids += pool.close()
+            self._ack(ackids)
+
+    def _ack(self, ackids: List[bytes], pipe=None) -> int:
+        if len(ackids) == 0:
+            return 0
+        n = len(ackids)
+        (pipe or self._red).xack(self._stream_name, self._consumer_group, *ackids)
+        CONSUMED_MESSAGES.labels(
+            self._stream_name, self._consumer_group, "handled"
+        ).inc(n)
+        ackids.clear()
+        return n
+
+    def _collect(
+        self, pool: _HandlerPool, ackids: List[bytes], timeout: Optional[float] = None
     ):
-        if autoclaim is True:
-            self._claim_consume(consumer, handle)
-        else:
-            self._normal_consume(consumer, handle, leader, count, block)
-
-    def _claim_consume(self, consumer: str, handle: Callable[[str, Dict], None]):
-        # handle the pending items first
-        start_id = 0
-        claim_count = 10
+        handled, error = pool.completed(timeout)
+        ackids += handled
+        if error is not None:
+            CONSUMED_MESSAGES.labels(
+                self._stream_name, self._consumer_group, "failed"
+            ).inc()
+            raise error
+
+    def _submit(self, pool: _HandlerPool, ackids: List[bytes], messages: List):
+        for ackid, kvs in messages:
+            if kvs is None:
+                # the message was deleted from the stream, nothing to handle
+                ackids.append(ackid)
+                continue
+            if isinstance(kvs, list):
+                kvs = {kvs[e]: kvs[e + 1] for e in range(0, len(kvs), 2)}
+            # back-pressure: wait for a free slot of the pool
+            while pool.free() == 0:
+                self._collect(pool, ackids, timeout=1)
+            pool.submit(ackid, kvs)
+            self._collect(pool, ackids)
+
+    def _claim_consume(
+        self, consumer: str, pool: _HandlerPool, ackids: List[bytes], count: int
+    ):
+        min_idle_time = self._min_idle_seconds * 1000
+        start_id = "0-0"
         while True:
             reply = self.xautoclaim(
                 self._stream_name,
                 self._consumer_group,
                 consumer,
-                min_idle_time=600_000,  # 10mins
+                min_idle_time=min_idle_time,
                 start_id=start_id,
-                count=claim_count,
+                count=count,
             )
-            if len(reply) == 0:  # the empty messages
-                sleep(10)
-                continue
-
-            if isinstance(reply[0], bytes):  # the standard way
-                start_id = reply[0]
-                messages = reply[1]
-            else:
-                last_id = reply[-1][0].decode().split("-")
-                assert (
-                    len(last_id) == 2
-                ), f"last message's id is malformed: {reply[-1][0]}"
-                start_id = last_id[0] + "-" + str(int(last_id[1]) + 1)
-                messages = reply
 
             # The redis protocol reply as below:
             # [
@@ -229,48 +403,94 @@ class RedisConsumerGroup(object):
             #         (b'1633482125911-0', {b'10575711': b'/jfs/etl/2020-08-01/transaction/10575711.csv'}), # noqa
             #     ],
             # ]
-            # but in our case, return as below:
+            # but in some versions, return the messages only as below:
             #  [
             #      (b'1633482125411-0', {b'10575710': b'/jfs/etl/2020-08-01/transaction/10575710.csv'}), # noqa
             #      (b'1633482125911-0', {b'10575711': b'/jfs/etl/2020-08-01/transaction/10575711.csv'}), # noqa
             #  ]
-
-            for message in messages:
-                ackid, kvs = message
-                if isinstance(kvs, list):
-                    kvs = {kvs[e]: kvs[e + 1] for e in range(0, len(kvs), 2)}
-                handle(ackid, kvs)
-
-            # no more messages
-            if len(messages) < claim_count:
-                logging.info("no more to claim, sleep 60s, reset start_id=0")
-                sleep(60)
-                start_id = 0
+            if len(reply) > 0 and isinstance(reply[0], bytes):  # the standard way
+                start_id = reply[0]
+                messages = reply[1]
+            elif len(reply) > 0:
+                last_id = reply[-1][0].decode().split("-")
+                assert (
+                    len(last_id) == 2
+                ), f"last message's id is malformed: {reply[-1][0]}"
+                start_id = last_id[0] + "-" + str(int(last_id[1]) + 1)
+                messages = reply
+            else:
+                start_id, messages = b"0-0", []
+
+            if len(messages) > 0:
+                logging.info(f"consumer:{consumer} claimed #{len(messages)} messages")
+                CONSUMED_MESSAGES.labels(
+                    self._stream_name, self._consumer_group, "claimed"
+                ).inc(len(messages))
+                self._submit(pool, ackids, messages)
+            self._ack(ackids)
+
+            # scanned all the pending messages
+            if start_id in (b"0-0", "0-0") or len(messages) < count:
+                start_id = "0-0"
+                while pool.free() < self._concurrency:
+                    self._collect(pool, ackids, timeout=1)
+                self._ack(ackids)
+                seconds = self._seconds_to_next_claim(min_idle_time)
+                logging.info(f"no more to claim, sleep {seconds}s")
+                sleep(seconds)
+
+    def _seconds_to_next_claim(self, min_idle_time: int) -> float:
+        """Returns the seconds until the oldest pending message turns idle enough."""
+        pending = self._red.xpending_range(
+            name=self._stream_name,
+            groupname=self._consumer_group,
+            min="-",
+            max="+",
+            count=100,
+        )
+        if len(pending) == 0:
+            # the messages delivered from now on won't be idle before that
+            return self._min_idle_seconds
+        idle = max(e["time_since_delivered"] for e in pending)
+        return max(1, (min_idle_time - idle) / 1000)
 
     def _normal_consume(
         self,
         consumer: str,
-        handle: Callable[[str, Dict], None],
+        pool: _HandlerPool,
+        ackids: List[bytes],
         leader: bool = False,
-        count: int = 1,
+        count: int = 16,
         block: int = 10,
     ):
         stream = self._stream_name
         cgroup = self._consumer_group
+        stat_at, n_handled = time(), 0
         while True:
-            reply = self._red.xreadgroup(
-                cgroup,
-                consumer,
-                {stream: ">"},  # > stands for all new messages
-                count=count,
-                block=block,
-            )
-            if len(reply) == 0:
+            # ack the handled messages and read the next batch in one round trip
+            pipe = self._red.pipeline(transaction=False)
+            n_handled += self._ack(ackids, pipe)
+            n = min(count, pool.free())
+            if n > 0:
+                pipe.xreadgroup(cgroup, consumer, {stream: ">"}, count=n, block=block)
+            reply = pipe.execute()[-1] if n > 0 else []
+            if n == 0:
+                self._collect(pool, ackids, timeout=1)
+                continue
+
+            if time() - stat_at > STAT_INTERVAL_SECONDS:
+                self._log_stat(consumer, leader, n_handled, time() - stat_at)
+                stat_at, n_handled = time(), 0
+
+            if not isinstance(reply, list) or len(reply) == 0:
                 if leader is True:
                     logging.info(
                         f"no more messages to read for stream {stream} and group {cgroup}"
                     )
-                sleep(self._period_seconds)
+                # wait for the messages in flight
+                self._collect(pool, ackids, timeout=self._period_seconds)
+                if pool.free() == self._concurrency and len(ackids) == 0:
+                    sleep(self._period_seconds)
                 continue
 
             assert len(reply) == 1
@@ -284,8 +504,24 @@ class RedisConsumerGroup(object):
             #         ],
             #     ]
             # ]
-            for message in reply[0][1]:
-                handle(*message)
+            self._submit(pool, ackids, reply[0][1])
+
+    def _log_stat(self, consumer: str, leader: bool, n_handled: int, elapsed: float):
+        msg = (
+            f"STAT consumer:{consumer} handled #{n_handled} messages "
+            f"({round(n_handled / elapsed, 2)}/s)"
+        )
+        if leader is True:
+            # the lag is given by redis>=7.0 only
+            for e in self._red.xinfo_groups(self._stream_name):
+                if e["name"].decode() != self._consumer_group:
+                    continue
+                labels = (self._stream_name, self._consumer_group)
+                CONSUMER_GROUP_PENDING.labels(*labels).set(e["pending"])
+                if e.get("lag") is not None:
+                    CONSUMER_GROUP_LAG.labels(*labels).set(e["lag"])
+                msg += f", group pending={e['pending']} lag={e.get('lag')}"
+        logging.info(msg)
 
     # backport from https://github.com/andymccurdy/redis-py/blob/e9837c1d6360d27fac0d8fed6384fd9b2b568b5c/redis/commands.py#L1791-L1829 # noqa
     def xautoclaim(
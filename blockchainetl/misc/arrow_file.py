@@ -0,0 +1,170 @@
+"""Typed Arrow IPC/Parquet files of the exported items, the columnar alternative to the
+CSV files of pd_write_file.py.
+
+The columns listed in the ColumnType of the chain are written with their types,
+the `Int64` ones of `ColumnType.astype` as int64, the others by their values:
+bool, int64(if all of them fit), or else the same text as the CSV files. So the
+loader copies them into PostgreSQL as is, without the type-rewriting of the CSV.
+
+The Parquet files are zstd compressed, with the row group statistics(eg: the
+min/max of blknum), the Arrow IPC files are lz4 compressed and read by mmap. They're
+copied into PostgreSQL by the CSV rendered batch by batch as COPY reads it.
+"""
+
+import io
+import math
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from blockchainetl.file_utils import smart_open
+
+FILE_FORMAT_CSV = "csv"
+FILE_FORMAT_PARQUET = "parquet"
+FILE_FORMAT_ARROW = "arrow"
+FILE_FORMATS = (FILE_FORMAT_CSV, FILE_FORMAT_PARQUET, FILE_FORMAT_ARROW)
+
+ROW_GROUP_SIZE = 65536
+
+# the rows rendered into CSV at a time while copying
+COPY_BATCH_ROWS = 8192
+
+INT64_MIN, INT64_MAX = -(2**63), 2**63 - 1
+
+
+def is_arrow_file(file: str) -> bool:
+    return file.endswith(f".{FILE_FORMAT_PARQUET}") or file.endswith(
+        f".{FILE_FORMAT_ARROW}"
+    )
+
+
+def _is_null(value) -> bool:
+    # the missing keys of the items are NaN in the DataFrame
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _to_arrow_array(values: List, dtype: Optional[Union[str, type]]) -> pa.Array:
+    values = [None if _is_null(e) else e for e in values]
+    if dtype == "Int64":
+        return pa.array(values, type=pa.int64())
+
+    present = [e for e in values if e is not None]
+    if len(present) > 0 and all(isinstance(e, bool) for e in present):
+        return pa.array(values, type=pa.bool_())
+    if len(present) > 0 and all(
+        isinstance(e, int) and not isinstance(e, bool) and INT64_MIN <= e <= INT64_MAX
+        for e in present
+    ):
+        return pa.array(values, type=pa.int64())
+
+    # the same text as DataFrame.to_csv, the empty string is NULL in the CSV either
+    return pa.array(
+        [None if e is None or e == "" else str(e) for e in values], type=pa.string()
+    )
+
+
+def df_to_arrow_table(
+    df: pd.DataFrame,
+    columns: List[str],
+    types: Optional[Dict[str, Union[str, type]]],
+    entity_type: str,
+) -> pa.Table:
+    missing = set(columns) - set(df.columns)
+    if len(missing) > 0:
+        raise ValueError(
+            f"to be saved column diffs for type({entity_type}) is: {missing}"
+        )
+
+    types = types or {}
+    return pa.table(
+        [_to_arrow_array(df[e].tolist(), types.get(e)) for e in columns],
+        names=columns,
+    )
+
+
+def save_df_into_arrow_file(
+    df: pd.DataFrame,
+    output: str,
+    columns: List[str],
+    types: Optional[Dict[str, Union[str, type]]],
+    entity_type: str,
+    file_format: str = FILE_FORMAT_PARQUET,
+):
+    table = df_to_arrow_table(df, columns, types, entity_type)
+    with smart_open(output, "w", binary=True) as fw:
+        if file_format == FILE_FORMAT_PARQUET:
+            pq.write_table(
+                table,
+                fw,
+                compression="zstd",
+                row_group_size=ROW_GROUP_SIZE,
+                write_statistics=True,
+            )
+        elif file_format == FILE_FORMAT_ARROW:
+            options = pa.ipc.IpcWriteOptions(compression="lz4")
+            with pa.ipc.new_file(fw, table.schema, options=options) as writer:
+                writer.write_table(table, max_chunksize=ROW_GROUP_SIZE)
+        else:
+            raise ValueError(f"file format({file_format}) not supported")
+
+
+def read_arrow_file(file: str) -> pa.Table:
+    if file.startswith("s3://"):
+        with smart_open(file, "r", binary=True) as fr:
+            source = pa.BufferReader(fr.read())
+    else:
+        source = pa.memory_map(file)
+
+    if file.endswith(f".{FILE_FORMAT_PARQUET}"):
+        return pq.read_table(source)
+    return pa.ipc.open_file(source).read_all()
+
+
+class ArrowCsvReader(io.RawIOBase):
+    """A file-like object of the rows(without header) as the CSV of PostgreSQL's COPY.
+
+    The record batches of the table are rendered one by one as they're read, so only
+    one batch's CSV is in memory besides the table, not the whole table's.
+    """
+
+    def __init__(
+        self, table: pa.Table, delimiter: str, batch_rows: int = COPY_BATCH_ROWS
+    ):
+        self._batches = iter(table.to_batches(max_chunksize=batch_rows))
+        self._options = pa_csv.WriteOptions(include_header=False, delimiter=delimiter)
+        self._buf = memoryview(b"")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            return b"".join(iter(lambda: self.read(1 << 20), b""))
+
+        while self._pos >= len(self._buf):
+            batch = next(self._batches, None)
+            if batch is None:
+                return b""
+            sink = pa.BufferOutputStream()
+            pa_csv.write_csv(batch, sink, self._options)
+            self._buf = memoryview(sink.getvalue())
+            self._pos = 0
+
+        chunk = self._buf[self._pos : self._pos + size]
+        self._pos += len(chunk)
+        return bytes(chunk)
+
+    def readinto(self, b) -> int:
+        chunk = self.read(len(b))
+        b[: len(chunk)] = chunk
+        return len(chunk)
+
+
+def arrow_table_to_csv(table: pa.Table, delimiter: str) -> ArrowCsvReader:
+    """Returns the rows(without header) as the CSV of PostgreSQL's COPY, rendered
+    batch by batch as it's read."""
+    return ArrowCsvReader(table, delimiter)
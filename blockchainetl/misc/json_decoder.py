@@ -0,0 +1,240 @@
+"""Decoding of the JSON-RPC responses.
+
+The responses are decoded by the stdlib json, or by orjson if it's installed and
+chosen(BLOCKCHAIN_ETL_JSON_RPC_DECODER=orjson). orjson can't parse the floats as
+Decimal, so the responses needing the exact floats(eg: the bitcoin amounts) are
+decoded by the stdlib always. orjson parses the ints beyond 64 bits as floats, the
+responses that may have them(`_may_have_big_int`) are decoded by the stdlib too, as
+are the ones orjson rejects, the malformed ones raise there as before.
+
+The stdlib's scanner is recursive, the payloads nested deeper than the recursion
+limit(the callTracer results of the deep call stacks) are decoded by `iterative_loads`,
+which keeps the open arrays/objects in a list, instead of raising the recursion limit
+for the whole process.
+
+The decoded arrays/objects can't form reference cycles, but allocating millions of
+them triggers the gc over and over, which costs as much as the parsing itself. So the
+gc is paused while decoding the large responses, shared by the threads.
+
+The decode time and size of each response is observed by the prometheus metrics,
+labelled by the decoder.
+"""
+
+import gc
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from time import perf_counter
+from typing import Any, Callable, Optional
+from json.decoder import JSONDecodeError, WHITESPACE, scanstring
+from json.scanner import NUMBER_RE
+
+from prometheus_client import Counter, Histogram
+
+from blockchainetl import env
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DECODE_SECONDS = Histogram(
+    "json_rpc_decode_seconds",
+    "The time to decode a JSON-RPC response",
+    ["decoder"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+DECODE_BYTES = Counter(
+    "json_rpc_decode_bytes",
+    "The size of the decoded JSON-RPC responses",
+    ["decoder"],
+)
+
+# log the responses taking longer than this to decode
+SLOW_DECODE_SECONDS = 1
+
+# pause the gc while decoding the responses larger than this
+GC_PAUSE_MIN_BYTES = 1 << 20
+
+# any int beyond 64 bits has 19+ digits, following a ':', ',' or '[' and the optional
+# whitespaces or '-'(mapped to '0' as the digits), the strings never match as their
+# quote is mapped to 'x'
+BIG_INT_TABLE = bytes(
+    ord("0") if c in b"0123456789- \t\n\r" else ord(":") if c in b":,[" else ord("x")
+    for c in range(256)
+)
+BIG_INT_PATTERN = b":" + b"0" * 19
+
+CONSTANTS = {
+    "null": None,
+    "true": True,
+    "false": False,
+    "NaN": float("nan"),
+    "Infinity": float("inf"),
+    "-Infinity": float("-inf"),
+}
+
+
+def _use_orjson() -> bool:
+    decoder = env.JSON_RPC_DECODER.lower()
+    if decoder not in ("json", "orjson"):
+        raise ValueError(f"unknown JSON-RPC decoder: {env.JSON_RPC_DECODER}")
+    if decoder == "orjson" and orjson is None:
+        logger.warning("orjson is not installed, decode by the stdlib json")
+        return False
+    return decoder == "orjson"
+
+
+USE_ORJSON = _use_orjson()
+
+
+def decode_rpc_response(response: bytes, use_decimal: bool = False) -> Any:
+    """Decodes the JSON-RPC response, the floats are parsed as Decimal if use_decimal."""
+    st = perf_counter()
+    if len(response) >= GC_PAUSE_MIN_BYTES:
+        with _gc_paused():
+            result, decoder = _decode(response, use_decimal)
+    else:
+        result, decoder = _decode(response, use_decimal)
+    elapsed = perf_counter() - st
+
+    DECODE_SECONDS.labels(decoder).observe(elapsed)
+    DECODE_BYTES.labels(decoder).inc(len(response))
+    if elapsed > SLOW_DECODE_SECONDS:
+        logger.info(
+            f"STAT decode #bytes={len(response)} decoder={decoder} "
+            f"elapsed={round(elapsed, 3)}s"
+        )
+    return result
+
+
+def _decode(response: bytes, use_decimal: bool):
+    if use_decimal is False and USE_ORJSON is True:
+        if _may_have_big_int(response) is False:
+            try:
+                return orjson.loads(response), "orjson"
+            except orjson.JSONDecodeError:
+                pass
+
+    text = response.decode("utf-8")
+    parse_float = Decimal if use_decimal else None
+    try:
+        return json.loads(text, parse_float=parse_float), "json"
+    except RecursionError:
+        return iterative_loads(text, parse_float=parse_float), "iterative"
+
+
+def _may_have_big_int(response: bytes) -> bool:
+    translated = response.translate(BIG_INT_TABLE)
+    return BIG_INT_PATTERN in translated or translated.startswith(BIG_INT_PATTERN[1:])
+
+
+_gc_lock = threading.Lock()
+_gc_pausers = 0
+_gc_was_enabled = False
+
+
+@contextmanager
+def _gc_paused():
+    global _gc_pausers, _gc_was_enabled
+    with _gc_lock:
+        if _gc_pausers == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pausers += 1
+    try:
+        yield
+    finally:
+        with _gc_lock:
+            _gc_pausers -= 1
+            if _gc_pausers == 0 and _gc_was_enabled:
+                gc.enable()
+
+
+def iterative_loads(s: str, parse_float: Optional[Callable[[str], Any]] = None) -> Any:
+    """The same as json.loads(s, parse_float=parse_float), without recursion."""
+    parse_float = parse_float or float
+    end = len(s)
+    # the open arrays and objects, with the key of the value being parsed(None in arrays)
+    stack = []
+    idx = WHITESPACE.match(s, 0).end()
+    while True:
+        nextchar = s[idx : idx + 1]
+        if nextchar == '"':
+            value, idx = scanstring(s, idx + 1)
+        elif nextchar == "{":
+            idx = WHITESPACE.match(s, idx + 1).end()
+            if s[idx : idx + 1] != "}":
+                key, idx = _scan_key(s, idx)
+                stack.append([{}, key])
+                continue
+            value, idx = {}, idx + 1
+        elif nextchar == "[":
+            idx = WHITESPACE.match(s, idx + 1).end()
+            if s[idx : idx + 1] != "]":
+                stack.append([[], None])
+                continue
+            value, idx = [], idx + 1
+        else:
+            value, idx = _scan_scalar(s, idx, parse_float)
+
+        # add the value into its parent, and close the parents ending here
+        while True:
+            if len(stack) == 0:
+                idx = WHITESPACE.match(s, idx).end()
+                if idx != end:
+                    raise JSONDecodeError("Extra data", s, idx)
+                return value
+
+            top = stack[-1]
+            container = top[0]
+            is_object = isinstance(container, dict)
+            if is_object:
+                container[top[1]] = value
+            else:
+                container.append(value)
+
+            idx = WHITESPACE.match(s, idx).end()
+            nextchar = s[idx : idx + 1]
+            if nextchar == ",":
+                idx = WHITESPACE.match(s, idx + 1).end()
+                if is_object:
+                    top[1], idx = _scan_key(s, idx)
+                break
+            if nextchar == ("}" if is_object else "]"):
+                stack.pop()
+                value, idx = container, idx + 1
+                continue
+            raise JSONDecodeError("Expecting ',' delimiter", s, idx)
+
+
+def _scan_key(s: str, idx: int):
+    if s[idx : idx + 1] != '"':
+        raise JSONDecodeError(
+            "Expecting property name enclosed in double quotes", s, idx
+        )
+    key, idx = scanstring(s, idx + 1)
+    idx = WHITESPACE.match(s, idx).end()
+    if s[idx : idx + 1] != ":":
+        raise JSONDecodeError("Expecting ':' delimiter", s, idx)
+    return key, WHITESPACE.match(s, idx + 1).end()
+
+
+def _scan_scalar(s: str, idx: int, parse_float: Callable[[str], Any]):
+    m = NUMBER_RE.match(s, idx)
+    if m is not None:
+        integer, frac, exp = m.groups()
+        if frac or exp:
+            value = parse_float(integer + (frac or "") + (exp or ""))
+        else:
+            value = int(integer)
+        return value, m.end()
+
+    for literal, value in CONSTANTS.items():
+        if s.startswith(literal, idx):
+            return value, idx + len(literal)
+    raise JSONDecodeError("Expecting value", s, idx)
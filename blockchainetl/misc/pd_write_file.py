@@ -5,9 +5,8 @@ from io import StringIO
 from typing import List, Dict, Union, Optional
 import sqlalchemy as sa
 from sqlalchemy.dialects.postgresql import insert
-import s3fs
 
-s3 = s3fs.S3FileSystem()
+from blockchainetl.file_utils import s3_filesystem
 
 
 DEFAULT_FIELD_TERMINATED = "^"
@@ -55,7 +54,7 @@ def rewrite_file_with_types(file: str, types: Dict[str, Union[str, type]]):
     df.to_csv(bak, sep=DEFAULT_FIELD_TERMINATED, index=False)
 
     if file.startswith("s3://"):
-        s3.rename(bak, file)
+        s3_filesystem().rename(bak, file)
     else:
         os.rename(bak, file)
 
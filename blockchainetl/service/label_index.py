@@ -0,0 +1,345 @@
+"""A memory-mapped index of the address labels, shared by the worker processes.
+
+The label table(eg: addr_labels) is bulk-loaded into a compact file, then looked
+up without any database query. The file is mapped read-only, so the processes on
+the same host share the pages of the page cache. The layout(little-endian) is
+
+    header          magic, prefix bits, #addresses, #label ids, #labels, watermark
+    directory       uint32[2**bits + 1], the first address of each key prefix
+    keys            bytes[20][#addresses], the sorted address keys
+    offsets         uint32[#addresses + 1], the label ids of each address
+    label ids       uint32[#label ids]
+    label offsets   uint32[#labels + 1], the interned label strings
+    label blob      utf-8
+
+The key of a lowercase EVM address is its 20 bytes, the key of the others(eg:
+bitcoin addresses) is the 20 bytes blake2b of it. The watermark is the max
+`updated_at` of the loaded rows, the next refresh reads the addresses updated after
+it only(the deleted addresses are dropped by a full rebuild).
+
+The file is replaced atomically by the builder, and reopened by the readers.
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+MAGIC = b"LBLIDX01"
+# magic, prefix bits, #addresses, #label ids, #labels, watermark(isoformat)
+HEADER = struct.Struct("<8sIQQQ32s")
+# the big-endian prefix of a key, in the directory
+PREFIX = struct.Struct(">I")
+
+KEY_SIZE = 20
+# as `SELECT ... WHERE address = %s LIMIT 10` of LabelService
+MAX_LABELS_PER_ADDRESS = 10
+
+
+def address_key(address: str) -> bytes:
+    if len(address) == 42 and address.startswith("0x") and address.islower():
+        try:
+            return bytes.fromhex(address[2:])
+        except ValueError:
+            pass
+    return hashlib.blake2b(address.encode(), digest_size=KEY_SIZE).digest()
+
+
+def _isoformat(watermark: Optional[Union[datetime, str]]) -> str:
+    if isinstance(watermark, datetime):
+        return watermark.isoformat()
+    return watermark or ""
+
+
+def _aligned(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+
+def _layout(bits: int, n_addresses: int, n_label_ids: int, n_labels: int) -> Dict:
+    offsets = dict()
+    offset = _aligned(HEADER.size)
+    for name, size in (
+        ("directory", (2**bits + 1) * 4),
+        ("keys", n_addresses * KEY_SIZE),
+        ("offsets", (n_addresses + 1) * 4),
+        ("label_ids", n_label_ids * 4),
+        ("label_offsets", (n_labels + 1) * 4),
+    ):
+        offsets[name] = offset
+        offset = _aligned(offset + size)
+    offsets["label_blob"] = offset
+    return offsets
+
+
+class LabelIndex(object):
+    """The reader of the label index file, reopens the file if it's replaced."""
+
+    def __init__(self, path: str, reload_seconds: int = 60):
+        self._path = path
+        self._reload_seconds = reload_seconds
+        self._open()
+
+    def _open(self):
+        with open(self._path, "rb") as f:
+            self._stat = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, bits, n_addresses, n_label_ids, n_labels, watermark = HEADER.unpack_from(
+            mm, 0
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{self._path} is not a label index")
+        layout = _layout(bits, n_addresses, n_label_ids, n_labels)
+
+        label_offsets = struct.unpack_from(
+            f"<{n_labels + 1}I", mm, layout["label_offsets"]
+        )
+        blob = mm[layout["label_blob"] : layout["label_blob"] + label_offsets[-1]]
+        # the mmap of the replaced file is released by gc, the lookups in progress
+        # are still safe
+        labels = tuple(
+            sys.intern(blob[label_offsets[i] : label_offsets[i + 1]].decode())
+            for i in range(n_labels)
+        )
+
+        def uint32s(name: str, count: int) -> memoryview:
+            # the native unsigned int, the file is written by the little-endian hosts
+            return memoryview(mm)[layout[name] : layout[name] + count * 4].cast("I")
+
+        # swapped at once, the lookups in progress keep the replaced file mapped
+        self._view = (
+            mm,
+            32 - bits,
+            uint32s("directory", 2**bits + 1),
+            layout["keys"],
+            uint32s("offsets", n_addresses + 1),
+            uint32s("label_ids", n_label_ids),
+            labels,
+        )
+        self._layout = layout
+        self._n_addresses = n_addresses
+        self._n_label_ids = n_label_ids
+        self._watermark = watermark.rstrip(b"\0").decode() or None
+        self._checked_at = time.monotonic()
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self._reload_seconds:
+            return
+        self._checked_at = now
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return
+        if (st.st_ino, st.st_mtime_ns) != (self._stat.st_ino, self._stat.st_mtime_ns):
+            logging.info(f"reload the label index {self._path}")
+            self._open()
+
+    @property
+    def watermark(self) -> Optional[str]:
+        return self._watermark
+
+    def __len__(self) -> int:
+        return self._n_addresses
+
+    def labels_of(self, address: str) -> Set[str]:
+        self._maybe_reload()
+        mm, shift, directory, keys, offsets, label_ids, labels = self._view
+
+        key = address_key(address)
+        prefix = PREFIX.unpack_from(key)[0] >> shift
+        start = keys + directory[prefix] * KEY_SIZE
+        end = keys + directory[prefix + 1] * KEY_SIZE
+        # scan the bucket of the prefix in C, the match must be at a key boundary
+        found = mm.find(key, start, end)
+        while found >= 0 and (found - start) % KEY_SIZE != 0:
+            found = mm.find(key, found + 1, end)
+        if found < 0:
+            return set()
+
+        i = (found - keys) // KEY_SIZE
+        return {labels[e] for e in label_ids[offsets[i] : offsets[i + 1]]}
+
+    def _arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+        """Returns the keys, offsets, label ids and labels, for the refresh."""
+        mm, layout, n = self._view[0], self._layout, self._n_addresses
+        keys = np.frombuffer(mm, dtype=f"S{KEY_SIZE}", count=n, offset=layout["keys"])
+        offsets = np.frombuffer(mm, dtype="<u4", count=n + 1, offset=layout["offsets"])
+        label_ids = np.frombuffer(
+            mm, dtype="<u4", count=self._n_label_ids, offset=layout["label_ids"]
+        )
+        return keys, offsets, label_ids, list(self._view[-1])
+
+
+def write_label_index(
+    path: str,
+    keys: np.ndarray,
+    label_ids: np.ndarray,
+    labels: List[str],
+    watermark: Optional[Union[datetime, str]],
+) -> int:
+    """Writes the (key, label id) rows into the index file atomically, returns the
+    number of the addresses."""
+    # sort by key then label id, drop the duplicated rows
+    order = np.lexsort((label_ids, keys))
+    keys, label_ids = keys[order], label_ids[order]
+    if len(keys) > 0:
+        distinct = np.ones(len(keys), dtype=bool)
+        distinct[1:] = (keys[1:] != keys[:-1]) | (label_ids[1:] != label_ids[:-1])
+        keys, label_ids = keys[distinct], label_ids[distinct]
+
+    # keep the first labels of each address
+    unique_keys, starts = np.unique(keys, return_index=True)
+    group = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(keys))))
+    kept = np.arange(len(keys)) - starts[group] < MAX_LABELS_PER_ADDRESS
+    label_ids = label_ids[kept]
+    counts = np.bincount(group[kept], minlength=len(unique_keys))
+    offsets = np.zeros(len(unique_keys) + 1, dtype="<u4")
+    np.cumsum(counts, out=offsets[1:])
+
+    # ~4 addresses in each bucket of the directory
+    n = len(unique_keys)
+    bits = max(8, min(28, math.ceil(math.log2(max(n, 1))) - 2))
+    key_bytes = unique_keys.astype(f"S{KEY_SIZE}").tobytes()
+    prefixes = np.frombuffer(key_bytes, dtype=">u4").reshape(-1, KEY_SIZE // 4)
+    prefixes = prefixes[:, 0] >> (32 - bits)
+    directory = np.searchsorted(prefixes, np.arange(2**bits + 1), side="left")
+
+    blobs = [e.encode() for e in labels]
+    label_offsets = np.zeros(len(blobs) + 1, dtype="<u4")
+    np.cumsum([len(e) for e in blobs], out=label_offsets[1:])
+
+    layout = _layout(bits, n, len(label_ids), len(labels))
+    sections = (
+        ("directory", directory.astype("<u4").tobytes()),
+        ("keys", key_bytes),
+        ("offsets", offsets.tobytes()),
+        ("label_ids", label_ids.astype("<u4").tobytes()),
+        ("label_offsets", label_offsets.tobytes()),
+        ("label_blob", b"".join(blobs)),
+    )
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                bits,
+                n,
+                len(label_ids),
+                len(labels),
+                _isoformat(watermark).encode(),
+            )
+        )
+        for name, data in sections:
+            f.seek(layout[name])
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return n
+
+
+class _Rows(object):
+    """The (key, label id) rows read from the label table, with interned labels."""
+
+    def __init__(self, labels: Optional[List[str]] = None):
+        self.labels = labels or []
+        self.label_ids = {e: i for i, e in enumerate(self.labels)}
+        self.keys: List[np.ndarray] = []
+        self.ids: List[np.ndarray] = []
+        self.watermark: Optional[datetime] = None
+
+    def extend(self, rows: Iterable):
+        keys, ids = [], []
+        for address, label, updated_at in rows:
+            if address is None or label is None:
+                continue
+            label_id = self.label_ids.get(label)
+            if label_id is None:
+                label_id = self.label_ids[label] = len(self.labels)
+                self.labels.append(label)
+            keys.append(address_key(address))
+            ids.append(label_id)
+            if updated_at is not None and (
+                self.watermark is None or updated_at > self.watermark
+            ):
+                self.watermark = updated_at
+        self.keys.append(np.array(keys, dtype=f"S{KEY_SIZE}"))
+        self.ids.append(np.array(ids, dtype="<u4"))
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            np.concatenate(self.keys or [np.zeros(0, dtype=f"S{KEY_SIZE}")]),
+            np.concatenate(self.ids or [np.zeros(0, dtype="<u4")]),
+        )
+
+
+def build_label_index(
+    engine,
+    db_table: str,
+    path: str,
+    updated_at_column: str = "updated_at",
+    full: bool = False,
+    batch_size: int = 100000,
+) -> int:
+    """Builds(or refreshes incrementally) the label index file from the label table,
+    returns the number of the rows read."""
+    sql = f"SELECT address, label, {updated_at_column} FROM {db_table}"
+    previous = None
+    if not full and os.path.exists(path):
+        previous = LabelIndex(path)
+
+    params = dict()
+    if previous is not None and previous.watermark is not None:
+        # all the labels of the updated addresses, some of them may be deleted
+        sql += (
+            f" WHERE address IN (SELECT address FROM {db_table}"
+            f" WHERE {updated_at_column} > %(watermark)s)"
+        )
+        params["watermark"] = previous.watermark
+        old_keys, old_offsets, old_ids, labels = previous._arrays()
+        rows = _Rows(labels)
+    else:
+        previous = None
+        rows = _Rows()
+
+    n_rows = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(sql, **params)
+        while True:
+            batch = result.fetchmany(batch_size)
+            if len(batch) == 0:
+                break
+            rows.extend(batch)
+            n_rows += len(batch)
+            logging.info(f"read #{n_rows} labels from {db_table}")
+
+    keys, label_ids = rows.arrays()
+    watermark = rows.watermark
+    if previous is not None:
+        if n_rows == 0:
+            logging.info(f"no labels updated after {previous.watermark}")
+            return 0
+        # replace the labels of the updated addresses
+        old_keys = np.repeat(old_keys, np.diff(old_offsets))
+        kept = ~np.isin(old_keys, keys)
+        keys = np.concatenate([old_keys[kept], keys])
+        label_ids = np.concatenate([old_ids[kept], label_ids])
+        # the updated rows are all after the previous watermark
+        watermark = watermark or previous.watermark
+
+    n_addresses = write_label_index(path, keys, label_ids, rows.labels, watermark)
+    logging.info(
+        f"STAT label index {path}: #{n_addresses} addresses "
+        f"#{len(rows.labels)} labels, watermark {watermark}"
+    )
+    return n_rows
@@ -1,28 +1,80 @@
-from typing import Optional, Set
+from typing import Dict, Iterable, Optional, Set
 from threading import Lock
 from sqlalchemy import create_engine
-from cachetools import cached, TTLCache
+from cachetools import TTLCache
+
+from blockchainetl import env
+from blockchainetl.service.label_index import LabelIndex
+from blockchainetl.utils import dynamic_batch_iterator
 
 
 class LabelService:
-    def __init__(self, db_url: str, db_table: str, db_schema: Optional[str]):
+    def __init__(
+        self,
+        db_url: str,
+        db_table: str,
+        db_schema: Optional[str],
+        query_batch_size: int = 1000,
+        label_index: Optional[LabelIndex] = None,
+    ):
         self._engine = create_engine(db_url)
         if db_schema is None:
             self._db_table = db_table
         else:
             self._db_table = db_schema + "." + db_table
+        self._query_batch_size = query_batch_size
+        # cache for 1hour, per instance
+        self._cache = TTLCache(maxsize=10000, ttl=3600)
+        self._lock = Lock()
+        # look up the bulk-loaded labels without any query, if it's built
+        if label_index is None and env.LABEL_INDEX_PATH is not None:
+            label_index = LabelIndex(env.LABEL_INDEX_PATH)
+        self._label_index = label_index
 
-    # cache for 1hour
-    @cached(cache=TTLCache(maxsize=10000, ttl=3600), lock=Lock())
     def label_of(self, address: str) -> Optional[Set[str]]:
-        result = self._engine.execute(
-            f"SELECT address, label FROM {self._db_table} WHERE address = %s LIMIT 10",
-            address,
-        )
-        if result is None:
-            return None
-        rows = result.fetchall()
-        return set(row["label"] for row in rows)
+        return self.labels_of([address])[address]
+
+    def labels_of(self, addresses: Iterable[str]) -> Dict[str, Set[str]]:
+        """Returns the labels of the given addresses, the ones not cached are read
+        together with one `WHERE address IN (...)` query per batch."""
+        if self._label_index is not None:
+            return {
+                e: set() if e is None else self._label_index.labels_of(e)
+                for e in addresses
+            }
+
+        result = dict()
+        missing = []
+        with self._lock:
+            for address in dict.fromkeys(addresses):
+                labels = self._cache.get(address)
+                if labels is not None:
+                    result[address] = labels
+                elif address is None:
+                    # `address = NULL` matches nothing
+                    result[address] = set()
+                else:
+                    missing.append(address)
+        if len(missing) == 0:
+            return result
+
+        labels = {e: set() for e in missing}
+        for batch in dynamic_batch_iterator(missing, lambda: self._query_batch_size):
+            rows = self._engine.execute(
+                f"SELECT address, label FROM {self._db_table} "
+                "WHERE address IN %(addresses)s",
+                addresses=tuple(batch),
+            ).fetchall()
+            for row in rows:
+                address_labels = labels.get(row["address"])
+                # at most 10 labels of each address, as `LIMIT 10` of one address
+                if address_labels is not None and len(address_labels) < 10:
+                    address_labels.add(row["label"])
+
+        with self._lock:
+            self._cache.update(labels)
+        result.update(labels)
+        return result
 
     def category_of(self, address: str) -> Set[str]:
         labels = self.label_of(address)
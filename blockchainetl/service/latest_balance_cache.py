@@ -0,0 +1,120 @@
+import sys
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class LatestBalanceCache:
+    """Write-through LRU of the last exported cumulative balance of each key.
+
+    The balance adapters are the only writers of the history balances, so the row
+    written by the previous batch is what PreviousBalanceService would read back,
+    as long as its blknum is not greater than the requested one.
+
+    Only the key columns, blknum and the cumsum columns are kept, the size of each
+    entry is estimated with sys.getsizeof and the least recently used ones are
+    evicted once max_bytes is exceeded.
+    """
+
+    def __init__(
+        self,
+        value_columns: Sequence[str],
+        key_columns: Sequence[str] = ("address",),
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.key_columns = list(key_columns)
+        self.columns = list(
+            dict.fromkeys(self.key_columns + ["blknum", *value_columns])
+        )
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        self._rows: OrderedDict = OrderedDict()
+        self._sizes: Dict[Tuple, int] = dict()
+        self.nbytes = 0
+        self.max_blknum: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._rows)
+
+    def lookup(self, items: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Returns the cached balances and the items not found in cache."""
+        found, missing = [], []
+        for item in items:
+            key = tuple(item[c] for c in self.key_columns)
+            row = self._rows.get(key)
+            # a future balance(eg: after rewind) can't be used, ask the database
+            if row is None or row["blknum"] > item["blknum"]:
+                self.misses += 1
+                missing.append(item)
+                continue
+
+            self.hits += 1
+            self._rows.move_to_end(key)
+            found.append(row)
+        return found, missing
+
+    def update(self, rows: List[Dict]):
+        """Should be called after the rows are exported successfully."""
+        for row in rows:
+            key = tuple(row[c] for c in self.key_columns)
+            value = {c: row.get(c) for c in self.columns}
+            size = sizeof_row(key, value)
+
+            self.nbytes += size - self._sizes.get(key, 0)
+            self._rows[key] = value
+            self._rows.move_to_end(key)
+            self._sizes[key] = size
+            if self.max_blknum is None or value["blknum"] > self.max_blknum:
+                self.max_blknum = value["blknum"]
+
+        while self.nbytes > self.max_bytes and len(self._rows) > 0:
+            key, _ = self._rows.popitem(last=False)
+            self.nbytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def rewind(self, start_block: int):
+        """Drops the balances of start_block and later, should be called before
+        exporting [start_block, ...], the range may be exported again
+        after the last-synced file is rewound or a chain reorg."""
+        if self.max_blknum is None or self.max_blknum < start_block:
+            return
+
+        stale = [key for key, row in self._rows.items() if row["blknum"] >= start_block]
+        for key in stale:
+            del self._rows[key]
+            self.nbytes -= self._sizes.pop(key)
+        self.invalidations += len(stale)
+        self.max_blknum = max(
+            (row["blknum"] for row in self._rows.values()), default=None
+        )
+        logging.warning(
+            f"rewind balance cache to block {start_block}, #{len(stale)} invalidated"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def stats(self) -> str:
+        return (
+            f"(hit_rate={round(self.hit_rate, 4)} #hits={self.hits} "
+            f"#misses={self.misses} #evictions={self.evictions} "
+            f"#invalidations={self.invalidations} #size={len(self._rows)} "
+            f"#mb={round(self.nbytes / 1024 / 1024, 2)})"
+        )
+
+
+def sizeof_row(key: Tuple, row: Dict) -> int:
+    # the column names are shared by all the rows, only count the values
+    return (
+        sys.getsizeof(key)
+        + sys.getsizeof(row)
+        + sum(sys.getsizeof(v) for v in row.values())
+    )
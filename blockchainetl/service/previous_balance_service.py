@@ -0,0 +1,98 @@
+import logging
+import concurrent.futures
+from typing import Dict, List, Sequence
+
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Engine
+
+from blockchainetl.utils import dynamic_batch_iterator
+
+
+class PreviousBalanceService:
+    """Looks up the latest balance row(blknum <= the given one) of many keys at once.
+
+    All the `(key_columns..., blknum)` of a chunk are sent as arrays in one statement,
+    each of them is resolved by an index scan in a LATERAL subquery:
+
+        SELECT t.* FROM unnest(:address, :blknum) AS k(address, blknum)
+        CROSS JOIN LATERAL (
+            SELECT * FROM history_balances h
+            WHERE h.address = k.address AND h.blknum <= k.blknum
+            ORDER BY h.blknum DESC LIMIT 1
+        ) t
+
+    The engine is kept by the caller for the whole process lifetime.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        table: Table,
+        key_columns: Sequence[str] = ("address",),
+        chunk_size: int = 5000,
+        max_workers: int = 1,
+    ):
+        self.engine = engine
+        self.table = table
+        self.key_columns = list(key_columns)
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self._query = self._build_query()
+
+    def get_previous_balances(self, items: List[Dict]) -> List[Dict]:
+        # the same key may appear more than once, query it once only
+        keys = list(
+            dict.fromkeys(
+                tuple(item[c] for c in self.key_columns) + (item["blknum"],)
+                for item in items
+            )
+        )
+        chunks = list(dynamic_batch_iterator(keys, lambda: self.chunk_size))
+        if len(chunks) <= 1 or self.max_workers <= 1:
+            result = []
+            for chunk in chunks:
+                result.extend(self._get_chunk(chunk))
+            return result
+
+        result = []
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+            futures = [executor.submit(self._get_chunk, chunk) for chunk in chunks]
+            for f in concurrent.futures.as_completed(futures):
+                exception = f.exception()
+                if exception:
+                    logging.error(exception)
+                    raise Exception(exception)
+                result.extend(f.result())
+        return result
+
+    def _get_chunk(self, keys: List[tuple]) -> List[Dict]:
+        columns = self.key_columns + ["blknum"]
+        params = {c: [key[i] for key in keys] for i, c in enumerate(columns)}
+        with self.engine.connect() as conn:
+            return [row._asdict() for row in conn.execute(self._query, params)]
+
+    def _build_query(self):
+        dialect = self.engine.dialect
+        quote = dialect.identifier_preparer.quote
+        columns = self.key_columns + ["blknum"]
+
+        arrays = ", ".join(
+            f"CAST(:{c} AS {self.table.c[c].type.compile(dialect=dialect)}[])"
+            for c in columns
+        )
+        aliases = ", ".join(quote(c) for c in columns)
+        conditions = " AND ".join(
+            f"h.{quote(c)} = k.{quote(c)}" for c in self.key_columns
+        )
+        table = dialect.identifier_preparer.format_table(self.table)
+        return text(
+            f"""
+SELECT t.* FROM unnest({arrays}) AS k({aliases})
+CROSS JOIN LATERAL (
+    SELECT * FROM {table} h
+    WHERE {conditions} AND h.blknum <= k.blknum
+    ORDER BY h.blknum DESC
+    LIMIT 1
+) t
+"""
+        )
@@ -1,17 +1,22 @@
-from typing import Optional, Union
+from typing import Dict, Iterable, Optional, Tuple, Union
 from requests import Session
 from datetime import datetime
-from cachetools import cached, TTLCache
+from cachetools import TTLCache
 from threading import Lock
 
+PriceKey = Tuple[Optional[str], Optional[Union[str, int, datetime]]]
+
+_MISSING = object()
+
 
 class PriceService:
     def __init__(self, endpoint: str):
         self.endpoint = endpoint
         self.session = Session()
+        # cache for 1min, per instance
+        self._cache = TTLCache(maxsize=10000, ttl=60)
+        self._lock = Lock()
 
-    # cache for 1min
-    @cached(cache=TTLCache(maxsize=10000, ttl=60), lock=Lock())
     def get_price(
         self,
         chain: str,
@@ -19,3 +24,34 @@ class PriceService:
         time: Optional[Union[str, int, datetime]] = None,
     ) -> Optional[float]:
         raise NotImplementedError
+
+    def get_prices(
+        self, chain: str, keys: Iterable[PriceKey]
+    ) -> Dict[PriceKey, Optional[float]]:
+        """Returns the prices of the distinct (token_address, time) keys, the ones not
+        cached are resolved together by fetch_prices."""
+        result = dict()
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                price = self._cache.get((chain, key), _MISSING)
+                if price is not _MISSING:
+                    result[key] = price
+                else:
+                    missing.append(key)
+        if len(missing) == 0:
+            return result
+
+        prices = self.fetch_prices(chain, missing)
+        with self._lock:
+            for key, price in prices.items():
+                self._cache[(chain, key)] = price
+        result.update(prices)
+        return result
+
+    def fetch_prices(
+        self, chain: str, keys: Iterable[PriceKey]
+    ) -> Dict[PriceKey, Optional[float]]:
+        """Reads the prices from upstream, override it with a batch request if the
+        endpoint supports."""
+        return {key: self.get_price(chain, *key) for key in keys}
@@ -1,3 +1,12 @@
+from typing import Dict, Iterable
+
+
 class TokenService(object):
     def get_token(self, token_address: str):
         raise NotImplementedError
+
+    def get_tokens(self, token_addresses: Iterable[str], *args, **kwargs) -> Dict:
+        return {
+            e: self.get_token(e, *args, **kwargs)
+            for e in dict.fromkeys(token_addresses)
+        }
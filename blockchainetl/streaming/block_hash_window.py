@@ -0,0 +1,141 @@
+"""The (number, hash, parent_hash) of the last exported blocks, used by the
+Streamer to detect the chain reorganizations.
+
+The window is persisted next to the last synced block file(`{file}.hashes`), each
+new block range must follow its last block, else the blocks after the fork are
+rolled back and exported again.
+
+The window is shared by the extract and load threads of the PipelinedStreamer, all the
+accesses of the entries are guarded by a lock.
+"""
+
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+
+class BlockHash(NamedTuple):
+    number: int
+    hash: str
+    parent_hash: str
+    timestamp: int
+
+
+def block_hash_of(block: Dict) -> BlockHash:
+    return BlockHash(
+        block["number"], block["hash"], block["parent_hash"], block["timestamp"]
+    )
+
+
+def block_hashes_file_of(last_synced_block_file: str) -> str:
+    return last_synced_block_file + ".hashes"
+
+
+class BlockHashWindow(object):
+    def __init__(self, file: str, size: int, last_synced_block: int):
+        if size < 1:
+            raise ValueError("the size of block hash window should be greater than 0")
+        self.file = file
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, BlockHash]" = OrderedDict()
+
+        if os.path.isfile(file):
+            with open(file, "r") as fr:
+                for e in json.loads(fr.read() or "[]"):
+                    block = BlockHash(*e)
+                    # the blocks after the last synced one will be exported again
+                    if block.number <= last_synced_block:
+                        self._entries[block.number] = block
+            logging.info(
+                f"read #{len(self._entries)} block hashes [{self.first()}, {self.last()}] "
+                f"from {file}"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def first(self) -> Optional[int]:
+        with self._lock:
+            return next(iter(self._entries), None)
+
+    def last(self) -> Optional[int]:
+        with self._lock:
+            return next(reversed(self._entries), None)
+
+    def follows(self, blocks: List[BlockHash]) -> bool:
+        """Returns whether the blocks follow the window, raises ValueError if
+        they don't make a chain themselves(eg: reorganized while exporting)."""
+        for prev, block in zip(blocks, blocks[1:]):
+            if block.number != prev.number + 1 or block.parent_hash != prev.hash:
+                raise ValueError(
+                    f"block {block.number}({block.hash}) doesn't follow the block "
+                    f"{prev.number}({prev.hash}), the chain was reorganized while exporting"
+                )
+
+        if len(blocks) == 0:
+            return True
+        with self._lock:
+            if len(self._entries) == 0:
+                return True
+            # a missing previous block can't be checked, find the fork by the chain
+            prev = self._entries.get(blocks[0].number - 1)
+            return prev is not None and prev.hash == blocks[0].parent_hash
+
+    def extend(self, blocks: List[BlockHash]):
+        with self._lock:
+            if len(blocks) > 0:
+                self._truncate(blocks[0].number)
+            for block in blocks:
+                self._entries[block.number] = block
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def find_fork(self, canonical: List[BlockHash]) -> Optional[int]:
+        """Returns the first block of the window which is not in the canonical chain
+        anymore, None if all of them are."""
+        hashes = {e.number: e.hash for e in canonical}
+        with self._lock:
+            entries = list(self._entries.items())
+        for number, block in entries:
+            if number in hashes and hashes[number] != block.hash:
+                return number
+        return None
+
+    def timestamp_since(self, number: int) -> Optional[int]:
+        """Returns the earliest timestamp of the blocks since `number`."""
+        with self._lock:
+            return min(
+                (e.timestamp for e in self._entries.values() if e.number >= number),
+                default=None,
+            )
+
+    def rollback(self, number: int):
+        """Drops the blocks since `number`."""
+        with self._lock:
+            self._truncate(number)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def save(self, upto: Optional[int] = None):
+        with self._lock:
+            entries = [
+                list(e)
+                for e in self._entries.values()
+                if upto is None or e.number <= upto
+            ]
+        tmp = self.file + ".tmp"
+        with open(tmp, "w") as fw:
+            fw.write(json.dumps(entries))
+        os.replace(tmp, self.file)
+
+    def _truncate(self, number: int):
+        # the caller holds the lock
+        while len(self._entries) > 0 and next(reversed(self._entries)) >= number:
+            self._entries.popitem(last=True)
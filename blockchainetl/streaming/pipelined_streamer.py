@@ -0,0 +1,142 @@
+import queue
+import logging
+import threading
+from time import time
+from typing import Optional, Tuple, List, Dict
+
+from blockchainetl.utils import time_elapsed
+from blockchainetl.streaming.streamer import Streamer
+
+# a marker pushed into the queue to tell the loader there is nothing more to load
+_STOP = None
+
+
+class PipelinedStreamer(Streamer):
+    """Streamer that overlaps extracting block range N+1 with exporting range N.
+
+    The calling thread is the extract stage (RPC fetch, enrich, item id calculation),
+    a dedicated thread is the load stage (item_exporter.export_items),
+    at most `pipeline_depth` extracted ranges are buffered in between.
+
+    Ranges are loaded one by one in the order they were extracted,
+    so the last synced block file only moves forward after every earlier range
+    has been committed, a crash never skips blocks.
+    """
+
+    def __init__(self, *args, pipeline_depth=2, **kwargs):
+        if pipeline_depth < 1:
+            raise ValueError("pipeline depth must be greater or equal to 1")
+        Streamer.__init__(self, *args, **kwargs)
+        self.pipeline_depth = pipeline_depth
+
+        self._queue: "queue.Queue[Optional[Tuple[int, int, List[Dict]]]]" = queue.Queue(
+            maxsize=pipeline_depth
+        )
+        self._load_error: Optional[BaseException] = None
+        self._load_error_range = (None, None)
+
+    def _sync_cycle(self):
+        self._load_error = None
+        self._load_error_range = (None, None)
+
+        loader = threading.Thread(
+            target=self._load_loop, name="streamer-loader", daemon=True
+        )
+        loader.start()
+
+        last_synced = self.last_synced_block
+        extracted = last_synced
+        reorg_block = None
+        try:
+            while self.end_block is None or extracted < self.end_block:
+                current_block = self._get_current_block()
+                target_block = self._calculate_target_block(current_block, extracted)
+                blocks_to_sync = max(target_block - extracted, 0)
+                if blocks_to_sync == 0:
+                    break
+
+                logging.info(
+                    f"Current block {current_block}, target block {target_block}, "
+                    f"last extracted block {extracted}, last synced block {self.last_synced_block}, "
+                    f"blocks to sync #{blocks_to_sync}, lag #{current_block-self.last_synced_block}"
+                )
+
+                self.block_range = (extracted + 1, target_block)
+                st = time()
+                items = self._extract_items(*self.block_range)
+                if items is None:
+                    reorg_block = self.block_range[0]
+                    break
+                logging.debug(
+                    f"Extracted blocks={self.block_range} size={len(items)} "
+                    f"(elapsed: {time_elapsed(st)}s)"
+                )
+                if not self._put((*self.block_range, items)):
+                    break
+                extracted = target_block
+        except BaseException as e:
+            # let the loader commit the ranges extracted before the failed one
+            self._stop_loader(loader)
+            if self._load_error is None or not isinstance(e, Exception):
+                raise
+        else:
+            self._stop_loader(loader)
+
+        # the ranges after the failed one were extracted but never loaded,
+        # they are dropped here and extracted again in the next cycle
+        if self._load_error is not None:
+            self.block_range = self._load_error_range
+            raise self._load_error
+
+        # roll back after all the extracted ranges are loaded
+        if reorg_block is not None:
+            self._rollback_reorg(reorg_block)
+            return max(reorg_block - 1 - last_synced, 1)
+
+        return extracted - last_synced
+
+    def _stop_loader(self, loader: threading.Thread):
+        self._put(_STOP)
+        loader.join()
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    def _get_current_block(self) -> int:
+        current = self.blockchain_streamer_adapter.get_current_block_number()
+        if isinstance(current, tuple):
+            return current[0]
+        return current
+
+    def _put(self, job) -> bool:
+        # don't block forever once the loader is gone
+        while self._load_error is None:
+            try:
+                self._queue.put(job, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _load_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                return
+
+            start_block, end_block, items = job
+            try:
+                st = time()
+                if len(items) > 0:
+                    self.blockchain_streamer_adapter.export_items(items)
+                self._write_last_synced_block(end_block)
+                logging.debug(
+                    f"Loaded blocks=({start_block}, {end_block}) size={len(items)} "
+                    f"pending-ranges={self._queue.qsize()} (elapsed: {time_elapsed(st)}s)"
+                )
+            except BaseException as e:
+                logging.exception(
+                    f"An exception occurred while loading blocks=({start_block}, {end_block})"
+                )
+                self._load_error_range = (start_block, end_block)
+                self._load_error = e
+                return
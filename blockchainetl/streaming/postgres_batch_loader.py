@@ -0,0 +1,185 @@
+"""Loads the exported files of one table with a few large COPYs.
+
+The files submitted by the consumers are queued, merged into batches of up to
+`batch_bytes`(the files with the same columns share one COPY) and loaded by a
+bounded pool of connections, one transaction per batch. The consumers wait for
+their batch to be committed, so the messages are acked only after that.
+
+If a batch fails(eg: the duplicated or malformed rows), it's rolled back and the
+files are loaded one by one as save_file_into_table does.
+"""
+
+import io
+import queue
+import logging
+from time import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from threading import Thread
+from concurrent.futures import Future
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+from blockchainetl.utils import time_elapsed
+from blockchainetl.file_utils import smart_open
+from blockchainetl.executors.bounded_executor import BoundedExecutor
+from blockchainetl.misc.arrow_file import (
+    arrow_table_to_csv,
+    is_arrow_file,
+    read_arrow_file,
+)
+from blockchainetl.streaming.postgres_utils import (
+    POSTGRES_COPY_BUFFER_SIZE,
+    ColumnType,
+    save_file_into_table,
+)
+
+# how long to wait for more files before a batch is loaded
+BATCH_LINGER_SECONDS = 1
+
+
+class _PendingFile(NamedTuple):
+    file: str
+    size: int
+    future: Future
+
+
+class BatchCopyLoader(object):
+    def __init__(
+        self,
+        postgres_url: str,
+        tbl: str,
+        entity_type: str,
+        ct: Optional[ColumnType],
+        batch_bytes: int = 32 * 1024 * 1024,
+        pool_size: int = 2,
+        ignore_error: bool = False,
+        delimiter: str = "^",
+    ):
+        self._tbl = tbl
+        self._entity_type = entity_type
+        self._ct = ct
+        self._batch_bytes = batch_bytes
+        self._ignore_error = ignore_error
+        self._delimiter = delimiter
+        # connected on demand, at most `pool_size` COPYs of the table at the same time
+        self._pool = ThreadedConnectionPool(0, pool_size, postgres_url)
+        self._executor = BoundedExecutor(0, pool_size)
+        self._queue: "queue.Queue[_PendingFile]" = queue.Queue()
+        self._thread = Thread(target=self._batch_files, daemon=True)
+        self._thread.start()
+
+    def load(self, file: str, size: int) -> Optional[int]:
+        """Blocks until the file is committed, returns its #row, or None if it's
+        merged with the other files(the #row of the batch is logged instead)."""
+        future: Future = Future()
+        self._queue.put(_PendingFile(file, size, future))
+        return future.result()
+
+    def _batch_files(self):
+        while True:
+            batch = [self._queue.get()]
+            nbytes = batch[0].size
+            deadline = time() + BATCH_LINGER_SECONDS
+            while nbytes < self._batch_bytes:
+                try:
+                    pending = self._queue.get(timeout=max(0, deadline - time()))
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                nbytes += pending.size
+
+            # blocks while all the connections are busy, the files queued meanwhile
+            # are merged into the next batch
+            self._executor.submit(self._copy_batch, batch, nbytes)
+
+    def _copy_batch(self, batch: List[_PendingFile], nbytes: int):
+        st = time()
+        files = [e.file for e in batch]
+        conn = None
+        broken = False
+        try:
+            # raises in here if can't connect, so that the consumers don't wait forever
+            conn = self._pool.getconn()
+            try:
+                rowcount = self._copy_files(conn, files)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+                raise
+            except Exception as e:
+                logging.warning(
+                    f"failed to load #{len(files)} files into table: {self._tbl} "
+                    f"together, error: {e}, load them one by one"
+                )
+                try:
+                    conn.rollback()
+                    rowcounts = [self._copy_file(conn, e) for e in files]
+                    # the ON CONFLICT DO NOTHING fallback of the CSV is not committed
+                    conn.commit()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    broken = True
+                    raise
+                for pending, rowcount in zip(batch, rowcounts):
+                    pending.future.set_result(rowcount)
+                return
+
+            logging.info(
+                f"STAT batch save table={self._tbl} #file={len(files)} "
+                f"#byte={nbytes} #row={rowcount} [{files[0]} ... {files[-1]}] "
+                f"elapsed={time_elapsed(st)}"
+            )
+            for pending in batch:
+                pending.future.set_result(rowcount if len(batch) == 1 else None)
+
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        finally:
+            if conn is not None:
+                self._pool.putconn(conn, close=broken)
+
+    def _copy_file(self, conn, file: str) -> int:
+        return save_file_into_table(
+            conn,
+            self._tbl,
+            self._entity_type,
+            file,
+            self._ct,
+            ignore_error=self._ignore_error,
+        )
+
+    def _copy_files(self, conn, files: List[str]) -> int:
+        streams: Dict[Tuple[str, ...], io.StringIO] = dict()
+        for file in files:
+            columns, rows = self._read_rows(file)
+            streams.setdefault(columns, io.StringIO()).write(rows)
+
+        rowcount = 0
+        with conn.cursor() as cursor:
+            for columns, stream in streams.items():
+                stream.seek(0)
+                cursor.copy_expert(
+                    f"COPY {self._tbl} ({','.join(columns)}) FROM STDIN "
+                    f"WITH DELIMITER '{self._delimiter}' CSV",
+                    stream,
+                    POSTGRES_COPY_BUFFER_SIZE,
+                )
+                rowcount += cursor.rowcount
+        conn.commit()
+        return rowcount
+
+    def _read_rows(self, file: str) -> Tuple[Tuple[str, ...], str]:
+        """Returns the columns and the CSV rows(without header) of the file."""
+        if is_arrow_file(file):
+            table = read_arrow_file(file)
+            # merged with the other files of the batch in memory, as the CSV files are
+            rows = arrow_table_to_csv(table, self._delimiter).read().decode()
+            return tuple(table.column_names), rows
+
+        with smart_open(file, "r") as fr:
+            header = fr.readline().rstrip("\r\n")
+            rows = fr.read()
+        if len(rows) > 0 and not rows.endswith("\n"):
+            rows += "\n"
+        return tuple(header.split(self._delimiter)), rows
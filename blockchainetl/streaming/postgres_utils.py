@@ -18,6 +18,11 @@ from psycopg2.extensions import connection, cursor
 
 from blockchainetl.utils import time_elapsed
 from blockchainetl.file_utils import smart_open, smart_copy_file
+from blockchainetl.misc.arrow_file import (
+    arrow_table_to_csv,
+    is_arrow_file,
+    read_arrow_file,
+)
 from blockchainetl.misc.pd_write_file import rewrite_file_with_types
 
 
@@ -121,17 +126,26 @@ def save_file_into_table(
 ) -> int:
     rowcount = 0
     try:
-        rowcount = copy_from_csv_file(
-            conn,
-            tbl,
-            file,
-            rollback=False,
-            on_conflict_do_nothing=on_conflict_do_nothing,
-        )
+        if is_arrow_file(file):
+            rowcount = copy_from_arrow_file(
+                conn,
+                tbl,
+                file,
+                on_conflict_do_nothing=on_conflict_do_nothing,
+            )
+        else:
+            rowcount = copy_from_csv_file(
+                conn,
+                tbl,
+                file,
+                rollback=False,
+                on_conflict_do_nothing=on_conflict_do_nothing,
+            )
 
     except psycopg2.errors.InvalidTextRepresentation as e:
         logging.warn(f"failed to load file: {file} error: {e}, try to rewrite it")
-        if ct is None:
+        # the Arrow files are typed when written, there is nothing to rewrite
+        if ct is None or is_arrow_file(file):
             raise ValueError("not supported column type") from e
 
         rewrite_file_with_types(file, ct.astype(entity_type))
@@ -386,6 +400,41 @@ def copy_from_csv_file(
         )
 
 
+def copy_from_arrow_file(
+    conn: connection,
+    tbl: str,
+    file: str,
+    delimiter: str = "^",
+    on_conflict_do_nothing: bool = True,
+) -> int:
+    table = read_arrow_file(file)
+    columns = ",".join(table.column_names)
+    with conn.cursor() as cursor:
+        try:
+            cursor.copy_expert(
+                f"COPY {tbl} ({columns}) FROM STDIN WITH DELIMITER '{delimiter}' CSV",
+                arrow_table_to_csv(table, delimiter),
+                POSTGRES_COPY_BUFFER_SIZE,
+            )
+            conn.commit()
+            return cursor.rowcount
+
+        except psycopg2.errors.UniqueViolation as e:
+            if on_conflict_do_nothing is False:
+                raise e
+
+            cursor.execute("ROLLBACK")
+            query = "INSERT INTO {}({}) VALUES %s ON CONFLICT DO NOTHING".format(
+                tbl, columns
+            )
+            data = [tuple(row.values()) for row in table.to_pylist()]
+            psycopg2.extras.execute_values(
+                cursor, query, data, template=None, page_size=100
+            )
+            conn.commit()
+            return -1
+
+
 def copy_into_csv_file(
     conn: connection,
     query: str,
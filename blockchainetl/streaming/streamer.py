@@ -25,11 +25,16 @@ import logging
 import os
 import time
 from datetime import datetime
+from typing import Dict, List, Optional
 
 from blockchainetl.streaming.streamer_adapter_stub import StreamerAdapterStub
 from blockchainetl.file_utils import smart_open
 from blockchainetl import env
 from blockchainetl.streaming.streamer_jsonl_skiper import StreamerJsonlSkiper
+from blockchainetl.streaming.block_hash_window import (
+    BlockHashWindow,
+    block_hashes_file_of,
+)
 
 
 class Streamer:
@@ -44,6 +49,7 @@ class Streamer:
         block_batch_size=10,
         retry_errors=True,
         pid_file=None,
+        reorg_window=0,
     ):
         last_synced_block_dir = os.path.dirname(last_synced_block_file)
         if last_synced_block_dir != "":
@@ -73,6 +79,31 @@ class Streamer:
 
         self.last_synced_block = read_last_synced_block(self.last_synced_block_file)
 
+        # check the parent hash of each new block range against the last exported
+        # blocks, and roll back the orphaned ones if the chain was reorganized
+        self.block_hashes: Optional[BlockHashWindow] = None
+        if reorg_window > 0:
+            if not hasattr(
+                blockchain_streamer_adapter, "extract_items_and_block_hashes"
+            ):
+                raise ValueError(
+                    f"{type(blockchain_streamer_adapter).__name__} can't detect reorgs"
+                )
+            # fail here instead of at the first reorg
+            can_rollback = getattr(
+                blockchain_streamer_adapter, "can_rollback_blocks", None
+            )
+            if can_rollback is None or not can_rollback():
+                raise ValueError(
+                    f"the exporter of {type(blockchain_streamer_adapter).__name__} "
+                    "can't roll back the orphaned blocks, only the postgres exporter can"
+                )
+            self.block_hashes = BlockHashWindow(
+                block_hashes_file_of(self.last_synced_block_file),
+                reorg_window,
+                self.last_synced_block,
+            )
+
         self.skiper = lambda _, __: None
         if env.SKIP_STREAM_IF_FAILED is True:
             self.skiper = StreamerJsonlSkiper(env.SKIP_STREAM_SAVE_PATH)
@@ -103,6 +134,9 @@ class Streamer:
                 if env.SKIP_STREAM_IF_FAILED is True:
                     logging.info(f"Skip and save {self.block_range}")
                     self.skiper(*self.block_range)
+                    # the hashes of the skipped blocks are unknown, start over
+                    if self.block_hashes is not None:
+                        self.block_hashes.clear()
                     self._write_last_synced_block(self.block_range[1])
                     continue
 
@@ -142,9 +176,17 @@ class Streamer:
         )
 
         self.block_range = (last_synced + 1, target_block)
-        if blocks_to_sync != 0:
+        if blocks_to_sync != 0 and self.block_hashes is None:
             self.blockchain_streamer_adapter.export_all(*self.block_range)
             self._write_last_synced_block(target_block)
+        elif blocks_to_sync != 0:
+            items = self._extract_items(*self.block_range)
+            if items is None:
+                self._rollback_reorg(self.block_range[0])
+                return blocks_to_sync
+            if len(items) > 0:
+                self.blockchain_streamer_adapter.export_items(items)
+            self._write_last_synced_block(target_block)
 
         return blocks_to_sync
 
@@ -155,9 +197,58 @@ class Streamer:
             target_block = min(target_block, self.end_block)
         return target_block
 
+    def _extract_items(self, start_block: int, end_block: int) -> Optional[List[Dict]]:
+        """Returns None if the blocks don't follow the exported ones."""
+        adapter = self.blockchain_streamer_adapter
+        if self.block_hashes is None:
+            return adapter.extract_items(start_block, end_block)
+
+        items, blocks = adapter.extract_items_and_block_hashes(start_block, end_block)
+        if len(blocks) != end_block - start_block + 1:
+            raise ValueError(
+                f"got #{len(blocks)} blocks of range [{start_block}, {end_block}]"
+            )
+        if not self.block_hashes.follows(blocks):
+            return None
+        self.block_hashes.extend(blocks)
+        return items
+
+    def _rollback_reorg(self, start_block: int):
+        """Finds the fork before `start_block`, deletes the exported blocks since the
+        fork, and rewinds the last synced block to export them again."""
+        window = self.block_hashes
+        canonical = self.blockchain_streamer_adapter.get_block_hashes(
+            window.first(), start_block - 1
+        )
+        fork = window.find_fork(canonical)
+        if fork is None:
+            # the exported blocks are still canonical, read the range again
+            logging.warning(f"block {start_block} was reorganized while exporting")
+            return
+        if fork == window.first():
+            raise ValueError(
+                f"the chain was reorganized before block {fork}, "
+                f"deeper than the reorg window(#{window.size} blocks)"
+            )
+
+        end_block = max(self.last_synced_block, window.last())
+        logging.warning(
+            f"REORG the chain was reorganized since block {fork}, "
+            f"roll back the exported blocks [{fork}, {end_block}]"
+        )
+        # keep the window until the rows are deleted, so that a failed delete is
+        # detected and retried in the next cycle
+        self.blockchain_streamer_adapter.rollback_blocks(
+            fork, end_block, window.timestamp_since(fork)
+        )
+        window.rollback(fork)
+        self._write_last_synced_block(fork - 1)
+
     def _write_last_synced_block(self, target_block):
         if target_block is None:
             return
+        if self.block_hashes is not None:
+            self.block_hashes.save(upto=target_block)
         logging.debug("Writing last synced block {}".format(target_block))
         write_last_synced_block(self.last_synced_block_file, target_block)
         self.last_synced_block = target_block
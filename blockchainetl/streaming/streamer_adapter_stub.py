@@ -1,4 +1,4 @@
-from typing import Tuple, Union
+from typing import Tuple, Union, List, Dict
 
 
 class StreamerAdapterStub:
@@ -12,5 +12,13 @@ class StreamerAdapterStub:
         start_block, end_block = start_block, end_block
         pass
 
+    def extract_items(self, start_block, end_block) -> List[Dict]:
+        start_block, end_block = start_block, end_block
+        return []
+
+    def export_items(self, items: List[Dict]):
+        items = items
+        pass
+
     def close(self):
         pass
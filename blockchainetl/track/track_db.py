@@ -72,8 +72,8 @@ GROUP BY
 
     @lru_cache(maxsize=1024000)
     def get_label_by_address(self, address) -> Optional[str]:
-        sql = f"SELECT label FROM {self._track_schema}.{self._track_table} WHERE address = '{address}'"
-        result = self._engine.execute(sql)
+        sql = f"SELECT label FROM {self._track_schema}.{self._track_table} WHERE address = %s"
+        result = self._engine.execute(sql, address)
         if result is None:
             return None
         row = result.fetchone()
@@ -23,7 +23,6 @@
 
 import time
 import logging
-import pandas as pd
 from datetime import datetime
 from typing import (
     Optional,
@@ -200,6 +199,9 @@ def chunkify(lst: List[int], n: int) -> List[List[int]]:
 
 
 def dates_of_timestamps(min_st, max_st) -> List[str]:
+    # blockchainetl.utils is imported by all the commands, import pandas on demand
+    import pandas as pd
+
     def _to_date(st: int):
         return datetime.utcfromtimestamp(st).date()
 
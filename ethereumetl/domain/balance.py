@@ -2,6 +2,15 @@ from typing import Optional
 
 
 class EthBalance(object):
+    __slots__ = (
+        "address",
+        "balance",
+        "nonce",
+        "root",
+        "code_hash",
+        "key",
+    )
+
     def __init__(self):
         self.address: Optional[str] = None
         self.balance: Optional[str] = None
@@ -26,6 +26,34 @@ from ethereumetl.domain.transaction import EthTransaction
 
 
 class EthBlock(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "number",
+        "hash",
+        "parent_hash",
+        "nonce",
+        "sha3_uncles",
+        "logs_bloom",
+        "transactions_root",
+        "state_root",
+        "receipts_root",
+        "miner",
+        "difficulty",
+        "total_difficulty",
+        "size",
+        "extra_data",
+        "gas_limit",
+        "gas_used",
+        "timestamp",
+        "transactions",
+        "transaction_count",
+        "base_fee_per_gas",
+        "uncle_count",
+        "uncle0_hash",
+        "uncle1_hash",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
@@ -58,6 +86,32 @@ class EthBlock(object):
 
 
 class EthUncleBlock(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "number",
+        "hash",
+        "parent_hash",
+        "mix_hash",
+        "nonce",
+        "sha3_uncles",
+        "logs_bloom",
+        "transactions_root",
+        "state_root",
+        "receipts_root",
+        "miner",
+        "difficulty",
+        "size",
+        "extra_data",
+        "gas_limit",
+        "gas_used",
+        "timestamp",
+        "base_fee_per_gas",
+        "hermit_blknum",
+        "hermit_uncle_pos",
+        "uncle_count",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
@@ -24,6 +24,23 @@ from typing import Optional, List
 
 
 class EthContract(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "address",
+        "creater",
+        "initcode",
+        "bytecode",
+        "function_sighashes",
+        "is_erc20",
+        "is_erc721",
+        "block_number",
+        "transaction_hash",
+        "transaction_index",
+        "trace_type",
+        "trace_address",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
@@ -2,6 +2,25 @@ from typing import Optional
 
 
 class EthErc1155Transfer(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "token_address",
+        "token_name",
+        "operator",
+        "from_address",
+        "to_address",
+        "id",
+        "value",
+        "id_pos",
+        "id_cnt",
+        "xfer_type",
+        "transaction_hash",
+        "transaction_index",
+        "log_index",
+        "block_number",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
@@ -2,6 +2,20 @@ from typing import Optional
 
 
 class EthErc721Transfer(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "token_address",
+        "token_name",
+        "from_address",
+        "to_address",
+        "id",
+        "transaction_hash",
+        "transaction_index",
+        "log_index",
+        "block_number",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
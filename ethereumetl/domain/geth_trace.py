@@ -24,6 +24,12 @@ from typing import Optional, List, Dict
 
 
 class EthGethTrace(object):
+    __slots__ = (
+        "block_number",
+        "tx_traces",
+        "tx_hashes",
+    )
+
     def __init__(self):
         self.block_number: Optional[int] = None
         self.tx_traces: List = []
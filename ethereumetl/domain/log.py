@@ -24,6 +24,17 @@ from typing import Optional, List
 
 
 class EthLog(object):
+    __slots__ = (
+        "log_index",
+        "transaction_hash",
+        "transaction_index",
+        "block_hash",
+        "block_number",
+        "address",
+        "data",
+        "topics",
+    )
+
     def __init__(self):
         self.log_index: Optional[int] = None
         self.transaction_hash: Optional[str] = None
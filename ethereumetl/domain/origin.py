@@ -1,4 +1,19 @@
 class OriginMarketplaceListing(object):
+    __slots__ = (
+        "listing_id",
+        "ipfs_hash",
+        "listing_type",
+        "category",
+        "subcategory",
+        "language",
+        "title",
+        "description",
+        "price",
+        "currency",
+        "block_number",
+        "log_index",
+    )
+
     def __init__(self):
         self.listing_id = None
         self.ipfs_hash = None
@@ -15,6 +30,24 @@ class OriginMarketplaceListing(object):
 
 
 class OriginShopProduct(object):
+    __slots__ = (
+        "listing_id",
+        "product_id",
+        "ipfs_path",
+        "external_id",
+        "parent_external_id",
+        "title",
+        "description",
+        "price",
+        "currency",
+        "image",
+        "option1",
+        "option2",
+        "option3",
+        "block_number",
+        "log_index",
+    )
+
     def __init__(self):
         self.listing_id = None
         self.product_id = None
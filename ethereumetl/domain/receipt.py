@@ -26,6 +26,20 @@ from ethereumetl.domain.log import EthLog
 
 
 class EthReceipt(object):
+    __slots__ = (
+        "transaction_hash",
+        "transaction_index",
+        "block_hash",
+        "block_number",
+        "cumulative_gas_used",
+        "gas_used",
+        "contract_address",
+        "logs",
+        "root",
+        "status",
+        "effective_gas_price",
+    )
+
     def __init__(self):
         self.transaction_hash: Optional[str] = None
         self.transaction_index: Optional[int] = None
@@ -24,6 +24,22 @@ from typing import Optional
 
 
 class EthToken(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "address",
+        "symbol",
+        "name",
+        "decimals",
+        "total_supply",
+        "block_number",
+        "transaction_hash",
+        "transaction_index",
+        "trace_address",
+        "is_erc20",
+        "is_erc721",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
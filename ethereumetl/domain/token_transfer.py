@@ -24,6 +24,22 @@ from typing import Optional
 
 
 class EthTokenTransfer(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "token_address",
+        "from_address",
+        "to_address",
+        "value",
+        "transaction_hash",
+        "transaction_index",
+        "log_index",
+        "block_number",
+        "name",
+        "symbol",
+        "decimals",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
@@ -24,6 +24,29 @@ from typing import Optional, List
 
 
 class EthTrace(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "block_number",
+        "transaction_hash",
+        "transaction_index",
+        "from_address",
+        "to_address",
+        "value",
+        "input",
+        "output",
+        "trace_type",
+        "call_type",
+        "reward_type",
+        "gas",
+        "gas_used",
+        "subtraces",
+        "trace_address",
+        "error",
+        "status",
+        "trace_id",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
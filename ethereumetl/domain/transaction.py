@@ -24,6 +24,33 @@ from typing import Optional
 
 
 class EthTransaction(object):
+    __slots__ = (
+        "_st",
+        "_st_day",
+        "hash",
+        "nonce",
+        "block_hash",
+        "block_number",
+        "block_timestamp",
+        "transaction_index",
+        "from_address",
+        "to_address",
+        "value",
+        "gas",
+        "gas_price",
+        "input",
+        "max_fee_per_gas",
+        "max_priority_fee_per_gas",
+        "transaction_type",
+        "receipt_log_count",
+        "receipt_cumulative_gas_used",
+        "receipt_gas_used",
+        "receipt_contract_address",
+        "receipt_root",
+        "receipt_status",
+        "receipt_effective_gas_price",
+    )
+
     def __init__(self):
         self._st: Optional[int] = None
         self._st_day: Optional[str] = None
@@ -2,6 +2,22 @@ from typing import Optional
 
 
 class EthTxpool(object):
+    __slots__ = (
+        "hash",
+        "nonce",
+        "transaction_index",
+        "from_address",
+        "to_address",
+        "value",
+        "gas",
+        "gas_price",
+        "input",
+        "max_fee_per_gas",
+        "max_priority_fee_per_gas",
+        "transaction_type",
+        "pool_type",
+    )
+
     def __init__(self):
         self.hash: Optional[str] = None
         self.nonce: Optional[int] = None
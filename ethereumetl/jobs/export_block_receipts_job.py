@@ -0,0 +1,102 @@
+import json
+import logging
+from typing import Dict, Iterable, List
+
+from blockchainetl.misc.retriable_value_error import RetriableValueError
+from blockchainetl.utils import is_retriable_error, rpc_response_batch_to_results
+from ethereumetl.json_rpc_requests import (
+    generate_get_block_receipts_json_rpc,
+    generate_json_rpc,
+)
+from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
+
+logger = logging.getLogger(__name__)
+
+
+class ExportBlockReceiptsJob(ExportReceiptsJob):
+    """Exports the receipts by eth_getBlockReceipts, all the receipts of a block in
+    one call instead of one eth_getTransactionReceipt for each transaction.
+
+    Only the receipts of the given transactions are exported, the same ones as
+    ExportReceiptsJob(eg: bor's state-sync receipts are not in the block's transactions).
+    """
+
+    def __init__(
+        self,
+        block_transaction_hashes: Dict[int, Iterable[str]],
+        batch_size: int,
+        batch_web3_provider,
+        max_workers: int,
+        item_exporter,
+        **kwargs,
+    ):
+        self.block_transaction_hashes = {
+            blknum: set(hashes) for blknum, hashes in block_transaction_hashes.items()
+        }
+        ExportReceiptsJob.__init__(
+            self,
+            (e for hashes in self.block_transaction_hashes.values() for e in hashes),
+            batch_size,
+            batch_web3_provider,
+            max_workers,
+            item_exporter,
+            **kwargs,
+        )
+
+    def _export(self):
+        self.batch_work_executor.execute_requests(
+            sorted(self.block_transaction_hashes),
+            self.batch_web3_provider,
+            self._build_request,
+            self._export_block_receipts,
+        )
+
+    def _build_request(self, block_numbers: List[int]) -> str:
+        receipts_rpc = list(generate_get_block_receipts_json_rpc(block_numbers))
+        if self.batch_size == 1:
+            receipts_rpc = receipts_rpc[0]
+        return json.dumps(receipts_rpc)
+
+    def _export_block_receipts(self, block_numbers: List[int], response):
+        results = rpc_response_batch_to_results(
+            response, ignore_error=self.ignore_error, with_id=True
+        )
+        receipts = []
+        for result, idx in results:
+            if result is None:
+                continue
+
+            blknum = block_numbers[idx]
+            hashes = self.block_transaction_hashes[blknum]
+            block_receipts = [e for e in result if e.get("transactionHash") in hashes]
+            if len(block_receipts) != len(hashes) and self.ignore_error is False:
+                raise RetriableValueError(
+                    f"got #{len(block_receipts)} receipts of block {blknum}, "
+                    f"expected #{len(hashes)}. Make sure the full node is synchronized."
+                )
+            receipts.extend(block_receipts)
+        self._export_receipt_results(receipts)
+
+
+def supports_block_receipts(batch_web3_provider, block_number: int) -> bool:
+    """Probes whether the node serves eth_getBlockReceipts, by the given block."""
+    response = batch_web3_provider.make_batch_request(
+        json.dumps(generate_json_rpc("eth_getBlockReceipts", [hex(block_number)]))
+    )
+    if isinstance(response, list):
+        response = response[0]
+    # the result of the blocks not synced yet is null
+    error = response.get("error")
+    if error is None:
+        return True
+    # some nodes answer -32000 for the unknown methods
+    message = str(error.get("message", "")).lower()
+    unknown = any(e in message for e in ("not exist", "not found", "not supported"))
+    if is_retriable_error(error.get("code")) and not unknown:
+        raise RetriableValueError(f"failed to probe eth_getBlockReceipts: {error}")
+
+    logger.warning(
+        f"eth_getBlockReceipts is not supported({error}), "
+        "fetch the receipts by eth_getTransactionReceipt"
+    )
+    return False
@@ -23,7 +23,9 @@
 
 import json
 
-from blockchainetl.executors.batch_work_executor import BatchWorkExecutor
+from blockchainetl.executors.pipelined_batch_work_executor import (
+    new_batch_work_executor,
+)
 from blockchainetl.jobs.base_job import BaseJob
 from ethereumetl.json_rpc_requests import generate_get_block_by_number_json_rpc
 from ethereumetl.mappers.block_mapper import EthBlockMapper
@@ -55,7 +57,9 @@ class ExportBlocksJob(BaseJob):
         self.batch_web3_provider = batch_web3_provider
 
         self.batch_size = batch_size
-        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
+        self.batch_work_executor = new_batch_work_executor(
+            batch_size, max_workers, batch_web3_provider
+        )
         self.item_exporter = item_exporter
 
         self.export_blocks = export_blocks
@@ -72,9 +76,14 @@ class ExportBlocksJob(BaseJob):
         self.item_exporter.open()
 
     def _export(self):
-        self.batch_work_executor.execute(self.blocks, self._export_batch)
+        self.batch_work_executor.execute_requests(
+            self.blocks,
+            self.batch_web3_provider,
+            self._build_request,
+            self._export_response,
+        )
 
-    def _export_batch(self, block_number_batch):
+    def _build_request(self, block_number_batch) -> str:
         blocks_rpc = list(
             generate_get_block_by_number_json_rpc(
                 block_number_batch, self.export_transactions
@@ -82,7 +91,9 @@ class ExportBlocksJob(BaseJob):
         )
         if self.batch_size == 1:
             blocks_rpc = blocks_rpc[0]
-        response = self.batch_web3_provider.make_batch_request(json.dumps(blocks_rpc))
+        return json.dumps(blocks_rpc)
+
+    def _export_response(self, block_number_batch, response):
         results = rpc_response_batch_to_results(response)
         blocks = [self.block_mapper.json_dict_to_block(result) for result in results]
 
@@ -1,7 +1,9 @@
 import json
 from typing import Optional, List, Union
 
-from blockchainetl.executors.batch_work_executor import BatchWorkExecutor
+from blockchainetl.executors.pipelined_batch_work_executor import (
+    new_batch_work_executor,
+)
 from blockchainetl.utils import rpc_response_to_result, validate_range
 from blockchainetl.jobs.base_job import BaseJob
 from ethereumetl.json_rpc_requests import generate_get_log_by_number_json_rpc
@@ -29,7 +31,9 @@ class ExportLogsJob(BaseJob):
         self.address = address
 
         self.batch_web3_provider = batch_web3_provider
-        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
+        self.batch_work_executor = new_batch_work_executor(
+            batch_size, max_workers, batch_web3_provider
+        )
         self.item_exporter = item_exporter
         self.log_mapper = EthLogMapper()
 
@@ -37,17 +41,21 @@ class ExportLogsJob(BaseJob):
         self.item_exporter.open()
 
     def _export(self):
-        self.batch_work_executor.execute(
+        self.batch_work_executor.execute_requests(
             range(self.start_block, self.end_block + 1),
-            self._export_batch,
+            self.batch_web3_provider,
+            self._build_request,
+            self._export_response,
         )
 
-    def _export_batch(self, block_number_batch):
+    def _build_request(self, block_number_batch) -> str:
         from_block, to_block = block_number_batch[0], block_number_batch[-1]
         logs_rpc = generate_get_log_by_number_json_rpc(
             from_block, to_block, self.topics, self.address
         )
-        response = self.batch_web3_provider.make_batch_request(json.dumps(logs_rpc))
+        return json.dumps(logs_rpc)
+
+    def _export_response(self, block_number_batch, response):
         results = rpc_response_to_result(response)
         logs = [self.log_mapper.json_dict_to_log(result) for result in results]
 
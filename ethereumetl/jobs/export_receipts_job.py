@@ -26,7 +26,9 @@ import logging
 from typing import Iterable, Optional, Dict, Tuple, List
 
 from blockchainetl.jobs.base_job import BaseJob
-from blockchainetl.executors.batch_work_executor import BatchWorkExecutor
+from blockchainetl.executors.pipelined_batch_work_executor import (
+    new_batch_work_executor,
+)
 from blockchainetl.utils import rpc_response_batch_to_results
 from ethereumetl.domain.receipt import EthReceipt
 from ethereumetl.json_rpc_requests import generate_get_receipt_json_rpc
@@ -59,7 +61,9 @@ class ExportReceiptsJob(BaseJob):
         self.transaction_hashes_iterable = set(list(transaction_hashes_iterable))
 
         self.batch_size = batch_size
-        self.batch_work_executor = BatchWorkExecutor(batch_size, max_workers)
+        self.batch_work_executor = new_batch_work_executor(
+            batch_size, max_workers, batch_web3_provider
+        )
         self.item_exporter = item_exporter
 
         self.export_receipts = export_receipts
@@ -82,18 +86,26 @@ class ExportReceiptsJob(BaseJob):
         self.item_exporter.open()
 
     def _export(self):
-        self.batch_work_executor.execute(
-            self.transaction_hashes_iterable, self._export_receipts
+        self.batch_work_executor.execute_requests(
+            self.transaction_hashes_iterable,
+            self.batch_web3_provider,
+            self._build_request,
+            self._export_receipts,
         )
 
-    def _export_receipts(self, transaction_hashes: Iterable[str]):
+    def _build_request(self, transaction_hashes: Iterable[str]) -> str:
         receipts_rpc = list(generate_get_receipt_json_rpc(transaction_hashes))
         if self.batch_size == 1:
             receipts_rpc = receipts_rpc[0]
-        response = self.batch_web3_provider.make_batch_request(json.dumps(receipts_rpc))
+        return json.dumps(receipts_rpc)
+
+    def _export_receipts(self, transaction_hashes: Iterable[str], response):
         results = rpc_response_batch_to_results(
             response, ignore_error=self.ignore_error
         )
+        self._export_receipt_results(results)
+
+    def _export_receipt_results(self, results: Iterable[Optional[Dict]]):
         receipts = [
             self.receipt_mapper.json_dict_to_receipt(result)
             for result in results
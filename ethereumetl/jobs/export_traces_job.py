@@ -22,12 +22,13 @@
 
 import json
 import logging
-from collections import defaultdict
 
 from web3 import Web3
 from web3.types import ParityFilterParams
-from typing import List, Dict, Optional, Generator, Tuple
-from blockchainetl.executors.batch_work_executor import BatchWorkExecutor
+from typing import List, Dict, Optional
+from blockchainetl.executors.pipelined_batch_work_executor import (
+    new_batch_work_executor,
+)
 from blockchainetl.jobs.base_job import BaseJob
 from blockchainetl.utils import validate_range, rpc_response_to_result
 
@@ -36,12 +37,12 @@ from ethereumetl.mappers.trace_mapper import EthTraceMapper
 from ethereumetl.mappers.geth_trace_mapper import EthGethTraceMapper
 from ethereumetl.domain.trace import EthTrace
 from ethereumetl.service.eth_special_trace_service import EthSpecialTraceService
-from ethereumetl.json_rpc_requests import (
-    generate_trace_block_by_number_json_rpc,
-    generate_trace_transaction_json_rpc,
-    generate_arbtrace_block_by_number_json_rpc,
+from ethereumetl.service.geth_trace_scheduler import GethTraceScheduler
+from ethereumetl.json_rpc_requests import generate_arbtrace_block_by_number_json_rpc
+from ethereumetl.service.trace_id_calculator import (
+    calculate_trace_ids,
+    calculate_trace_dict_ids,
 )
-from ethereumetl.service.trace_id_calculator import calculate_trace_ids
 from ethereumetl.service.trace_status_calculator import calculate_trace_statuses
 from blockchainetl import env
 
@@ -61,11 +62,14 @@ class ExportTracesJob(BaseJob):
         is_geth_provider=True,
         retain_precompiled_calls=True,
         txhash_iterable: Optional[Dict[int, Dict[int, str]]] = None,
+        block_gas_used: Optional[Dict[int, int]] = None,
+        trace_scheduler: Optional[GethTraceScheduler] = None,
     ):
         validate_range(start_block, end_block)
         self.start_block = start_block
         self.end_block = end_block
         self.txhash_iterable = txhash_iterable or dict()
+        self.block_gas_used = block_gas_used or dict()
 
         self.web3 = web3
         self.batch_web3_provider = batch_web3_provider
@@ -81,8 +85,19 @@ class ExportTracesJob(BaseJob):
             # https://github.com/paritytech/parity-ethereum/issues/9822
             batch_size = 1
         self.batch_size = batch_size
-        self.batch_work_executor = BatchWorkExecutor(
-            batch_size, max_workers, max_retries=3
+
+        # the scheduler may be shared by the jobs, to keep what it learned
+        self.trace_scheduler = trace_scheduler
+        self.own_trace_scheduler = False
+        if is_geth_provider and trace_scheduler is None:
+            self.trace_scheduler = GethTraceScheduler(
+                batch_web3_provider,
+                max_workers,
+                fanout_only=env.GETH_TRACE_BY_TRANSACTION_HASH,
+            )
+            self.own_trace_scheduler = True
+        self.batch_work_executor = new_batch_work_executor(
+            batch_size, max_workers, batch_web3_provider, max_retries=3
         )
         self.item_exporter = item_exporter
 
@@ -97,12 +112,56 @@ class ExportTracesJob(BaseJob):
         self.item_exporter.open()
 
     def _export(self):
-        self.batch_work_executor.execute(
-            range(self.start_block, self.end_block + 1),
-            self._export_batch,
+        blocks = range(self.start_block, self.end_block + 1)
+
+        # Parity's trace_filter is requested through web3, not a batch request
+        if env.IS_ARBITRUM_TRACE is True:
+            self.batch_work_executor.execute_requests(
+                blocks,
+                self.batch_web3_provider,
+                self._build_request,
+                self._export_response,
+            )
+        elif self.is_geth_provider is True:
+            self.batch_work_executor.execute(blocks, self._export_batch_geth)
+        else:
+            self.batch_work_executor.execute(blocks, self._export_batch)
+
+    def _build_request(self, block_number_batch: List[int]) -> Optional[str]:
+        trace_block_rpc = list(
+            generate_arbtrace_block_by_number_json_rpc(block_number_batch)
         )
+        if self.batch_size == 1:
+            trace_block_rpc = trace_block_rpc[0]
+        return json.dumps(trace_block_rpc)
+
+    def _export_response(self, block_number_batch: List[int], response):
+        traces = self._arbitrum_response_to_traces(response)
+        self._export_traces(block_number_batch, traces)
+
+    def _export_batch_geth(self, block_number_batch: List[int]):
+        block_tx_traces = []
+        for blknum in block_number_batch:
+            tx_traces = self.trace_scheduler.trace_block(
+                blknum,
+                self.txhash_iterable.get(blknum, {}),
+                self.block_gas_used.get(blknum),
+            )
+            block_tx_traces.append((blknum, tx_traces))
+
+        # the empty traces dropped may break the call trees, export them by the
+        # EthTrace objects, which handles the missing parents
+        if env.GETH_TRACE_IGNORE_ERROR_EMPTY_TRACE is True:
+            traces = self._geth_tx_traces_to_traces(block_tx_traces)
+            self._export_traces(block_number_batch, traces)
+        else:
+            self._export_geth_trace_dicts(block_number_batch, block_tx_traces)
 
     def _export_batch(self, block_number_batch: List[int]):
+        traces = self._export_batch_parity(block_number_batch)
+        self._export_traces(block_number_batch, traces)
+
+    def _export_traces(self, block_number_batch: List[int], traces: List[EthTrace]):
         assert len(block_number_batch) > 0
 
         all_traces = []
@@ -115,13 +174,6 @@ class ExportTracesJob(BaseJob):
             daofork_traces = self.special_trace_service.get_daofork_traces()
             all_traces.extend(daofork_traces)
 
-        if env.IS_ARBITRUM_TRACE is True:
-            traces = self._export_batch_arbitrum(block_number_batch)
-        elif self.is_geth_provider is True:
-            traces = self._export_batch_geth(block_number_batch)
-        else:
-            traces = self._export_batch_parity(block_number_batch)
-
         all_traces.extend(traces)
 
         calculate_trace_statuses(all_traces)
@@ -130,6 +182,41 @@ class ExportTracesJob(BaseJob):
         for trace in all_traces:
             self.item_exporter.export_item(self.trace_mapper.trace_to_dict(trace))
 
+    def _export_geth_trace_dicts(self, block_number_batch: List[int], block_tx_traces):
+        """The fast path of _export_traces, the geth traces are mapped into the
+        exported dicts directly, with the statuses calculated while mapping."""
+        special_traces = []
+        if self.include_genesis_traces and 0 in block_number_batch:
+            special_traces.extend(self.special_trace_service.get_genesis_traces())
+        if self.include_daofork_traces and DAOFORK_BLOCK_NUMBER in block_number_batch:
+            special_traces.extend(self.special_trace_service.get_daofork_traces())
+
+        # the special traces are transaction scoped and have no transaction index,
+        # their statuses and ids are independent of the other traces
+        calculate_trace_statuses(special_traces)
+        calculate_trace_ids(special_traces)
+        trace_dicts = [self.trace_mapper.trace_to_dict(e) for e in special_traces]
+
+        for (blknum, tx_traces) in block_tx_traces:
+            geth_trace = self.geth_trace_mapper.json_dict_to_geth_trace(
+                {
+                    "block_number": blknum,
+                    "tx_traces": tx_traces,
+                    "tx_hashes": self.txhash_iterable.get(blknum, {}),
+                }
+            )
+            trace_dicts.extend(
+                self.trace_mapper.geth_trace_to_trace_dicts(
+                    geth_trace,
+                    retain_precompiled_calls=self.retain_precompiled_calls,
+                    with_status=True,
+                )
+            )
+
+        calculate_trace_dict_ids(trace_dicts)
+        for trace in trace_dicts:
+            self.item_exporter.export_item(trace)
+
     def _export_batch_parity(self, block_number_batch: List[int]) -> List[EthTrace]:
         params = ParityFilterParams(
             {
@@ -158,16 +245,10 @@ class ExportTracesJob(BaseJob):
             for json_trace in json_traces
         ]
 
-    def _export_batch_geth(self, block_number_batch: List[int]) -> List[EthTrace]:
+    def _geth_tx_traces_to_traces(self, block_tx_traces) -> List[EthTrace]:
         json_traces: List[EthTrace] = []
 
-        def tracer():
-            if env.GETH_TRACE_BY_TRANSACTION_HASH is True:
-                return self._export_batch_geth_by_txhash(block_number_batch)
-            else:
-                return self._export_batch_geth_by_block(block_number_batch)
-
-        for (blknum, tx_traces) in tracer():
+        for (blknum, tx_traces) in block_tx_traces:
             geth_trace = self.geth_trace_mapper.json_dict_to_geth_trace(
                 {
                     "block_number": blknum,
@@ -220,16 +301,7 @@ class ExportTracesJob(BaseJob):
 
         return json_traces
 
-    def _export_batch_arbitrum(self, block_number_batch: List[int]) -> List[EthTrace]:
-        trace_block_rpc = list(
-            generate_arbtrace_block_by_number_json_rpc(block_number_batch)
-        )
-        if self.batch_size == 1:
-            trace_block_rpc = trace_block_rpc[0]
-        response = self.batch_web3_provider.make_batch_request(
-            json.dumps(trace_block_rpc)
-        )
-
+    def _arbitrum_response_to_traces(self, response) -> List[EthTrace]:
         # flatten block results
         # Arbitrum's JSONRPC is not standard, it's result is List(standard is Dict)
         if self.batch_size == 1:
@@ -244,85 +316,8 @@ class ExportTracesJob(BaseJob):
             for json_trace in json_traces
         ]
 
-    def _export_batch_geth_by_txhash(
-        self, block_number_batch: List[int]
-    ) -> Generator[Tuple[int, Dict], None, None]:
-        block_traces = defaultdict(list)
-        txhashes = dict()
-        for blknum in block_number_batch:
-            txs = self.txhash_iterable[blknum]
-            block_traces[blknum] = [None] * len(txs)
-            for txpos, txhash in txs.items():
-                txhashes[txhash] = (blknum, txpos)
-
-        # some blocks maybe empty
-        # and empty batch request maybe return error result:
-        # `[]` -> { "jsonrpc": "2.0", "id": null, "error": { "code": -32600, "message": "empty batch" } } # noqa
-        if len(txhashes) == 0:
-            return
-
-        trace_hash_rpc = list(
-            generate_trace_transaction_json_rpc(list(txhashes.keys()))
-        )
-        response = self.batch_web3_provider.make_batch_request(
-            json.dumps(trace_hash_rpc)
-        )
-        ignore_error = env.GETH_TRACE_TRANSACTION_IGNORE_ERROR
-        for response_item in response:
-            txhash = response_item.get("id")
-            # ignore cronos trace error:
-            # {
-            #     "code": -32000,
-            #     "message": "ethereum tx not found in msgs: 0xd889167d920f6746276d5852f905f05b2acad01219584020ac897a3b139f2ee9", # noqa: E501
-            # }
-            result = rpc_response_to_result(response_item, ignore_error=ignore_error)
-            if result is None and ignore_error is True:
-                continue
-            blknum, txpos = txhashes[txhash]
-            block_traces[blknum][txpos] = result
-
-        for blknum, tx_traces in block_traces.items():
-            if ignore_error is True:
-                # remove the None items
-                yield blknum, [e for e in tx_traces if e]
-            else:
-                yield blknum, tx_traces
-
-    def _export_batch_geth_by_block(
-        self, block_number_batch: List[int]
-    ) -> Generator[Tuple[int, Dict], None, None]:
-        trace_block_rpc = list(
-            generate_trace_block_by_number_json_rpc(block_number_batch)
-        )
-        if self.batch_size == 1:
-            trace_block_rpc = trace_block_rpc[0]
-        response = self.batch_web3_provider.make_batch_request(
-            json.dumps(trace_block_rpc)
-        )
-        if self.batch_size == 1:
-            response = [response]
-
-        for response_item in response:
-            blknum = response_item.get("id")
-            result = rpc_response_to_result(response_item)
-            tx_traces = []
-            for tx_index, tx_trace in enumerate(result):
-                trace = tx_trace.get("result")
-                if trace is None:
-                    msg = (
-                        f"Geth trace for block:{blknum} txpos:{tx_index} is nil, "
-                        f"maybe timeout, raw message: {tx_trace}"
-                    )
-                    # Optimistic's trace block 0x3D9 returns error:
-                    # TypeError: cannot read property 'toString' of undefined in server-side tracer function 'result' # noqa
-                    if env.IGNORE_TRACE_ERROR:
-                        logging.warning(msg)
-                        continue
-                    else:
-                        raise ValueError(msg)
-                tx_traces.append(trace)
-            yield blknum, tx_traces
-
     def _end(self):
         self.batch_work_executor.shutdown()
+        if self.own_trace_scheduler:
+            self.trace_scheduler.shutdown()
         self.item_exporter.close()
@@ -47,9 +47,9 @@ class ExtractGethTracesJob(BaseJob):
     def _extract_geth_traces(self, geth_traces):
         for geth_trace_dict in geth_traces:
             geth_trace = self.geth_trace_mapper.json_dict_to_geth_trace(geth_trace_dict)
-            traces = self.trace_mapper.geth_trace_to_traces(geth_trace)
+            traces = self.trace_mapper.geth_trace_to_trace_dicts(geth_trace)
             for trace in traces:
-                self.item_exporter.export_item(self.trace_mapper.trace_to_dict(trace))
+                self.item_exporter.export_item(trace)
 
     def _end(self):
         self.batch_work_executor.shutdown()
@@ -27,8 +27,20 @@ from blockchainetl.jobs.base_job import BaseJob
 from ethereumetl.domain.log import EthLog
 from ethereumetl.mappers.token_transfer_mapper import EthTokenTransferMapper
 from ethereumetl.mappers.log_mapper import EthLogMapper
-from ethereumetl.service.token_transfer_extractor import EthTokenTransferExtractor
+from ethereumetl.service.token_transfer_extractor import (
+    EthTokenTransferExtractor,
+    TRANSFER_EVENT_TOPIC,
+    DEPOSIT_EVENT_TOPIC,
+    WITHDRAWAL_EVENT_TOPIC,
+)
 from ethereumetl.service.eth_token_service import EthTokenService
+from ethereumetl.utils import to_normalized_address
+
+TOKEN_TRANSFER_TOPICS = (
+    TRANSFER_EVENT_TOPIC,
+    DEPOSIT_EVENT_TOPIC,
+    WITHDRAWAL_EVENT_TOPIC,
+)
 
 
 class ExtractTokenTransfersJob(BaseJob):
@@ -56,8 +68,21 @@ class ExtractTokenTransfersJob(BaseJob):
         self.item_exporter.open()
 
     def _export(self):
+        # resolve the tokens of this batch together, not one by one in _extract_transfer
+        if self.token_service is not None:
+            self.token_service.get_tokens(self._token_addresses(), self.chain)
         self.batch_work_executor.execute(self.logs_iterable, self._extract_transfers)
 
+    def _token_addresses(self) -> List[str]:
+        addresses = []
+        for log in self.logs_iterable:
+            if isinstance(log, dict):
+                log = self.log_mapper.dict_to_log(log)
+            topics = log.topics or []
+            if len(topics) > 0 and topics[0] in TOKEN_TRANSFER_TOPICS:
+                addresses.append(to_normalized_address(log.address))
+        return addresses
+
     def _extract_transfers(self, logs: List[Union[Dict, EthLog]]):
         for log in logs:
             if isinstance(log, dict):
@@ -0,0 +1,73 @@
+from typing import List, Dict, Union, Optional, Set
+
+from blockchainetl.jobs.base_job import BaseJob
+from blockchainetl.enumeration.entity_type import EntityType
+from ethereumetl.domain.log import EthLog
+from ethereumetl.mappers.token_transfer_mapper import EthTokenTransferMapper
+from ethereumetl.mappers.erc721_transfer_mapper import EthErc721TransferMapper
+from ethereumetl.mappers.erc1155_transfer_mapper import EthErc1155TransferMapper
+from ethereumetl.service.log_decoder import EthLogDecoder, LOG_DECODER_ENTITY_TYPES
+from ethereumetl.service.eth_token_service import EthTokenService
+
+
+# Extracts the token/erc721/erc1155 transfers in one pass of the logs,
+# the decoding is CPU bound, no thread pool is used
+class ExtractTransfersJob(BaseJob):
+    def __init__(
+        self,
+        logs_iterable: List[Union[Dict, EthLog]],
+        item_exporter,
+        entity_types=LOG_DECODER_ENTITY_TYPES,
+        chain: Optional[str] = None,
+        erc20_tokens: Optional[Set] = None,
+        token_service: Optional[EthTokenService] = None,
+    ):
+        self.logs_iterable = logs_iterable
+        self.item_exporter = item_exporter
+
+        self.log_decoder = EthLogDecoder(entity_types, chain, erc20_tokens)
+        self.token_transfer_mapper = EthTokenTransferMapper()
+        self.erc721_transfer_mapper = EthErc721TransferMapper()
+        self.erc1155_transfer_mapper = EthErc1155TransferMapper()
+        self.chain = chain
+        self.token_service = token_service
+
+    def _start(self):
+        self.item_exporter.open()
+
+    def _export(self):
+        decoded = self.log_decoder.decode(self.logs_iterable)
+
+        token_transfers = decoded[EntityType.TOKEN_TRANSFER]
+        if self.token_service is not None and len(token_transfers) > 0:
+            # resolve the tokens of this batch together, not one by one
+            tokens = self.token_service.get_tokens(
+                [e.token_address for e in token_transfers], self.chain
+            )
+            for token_transfer in token_transfers:
+                token = tokens[token_transfer.token_address]
+                token_transfer.name = token.name
+                token_transfer.symbol = token.symbol
+                token_transfer.decimals = token.decimals
+
+        self.item_exporter.export_items(
+            [
+                self.token_transfer_mapper.token_transfer_to_dict(e)
+                for e in token_transfers
+            ]
+        )
+        self.item_exporter.export_items(
+            [
+                self.erc721_transfer_mapper.erc721_transfer_to_dict(e)
+                for e in decoded[EntityType.ERC721_TRANSFER]
+            ]
+        )
+        self.item_exporter.export_items(
+            [
+                self.erc1155_transfer_mapper.erc1155_transfer_to_dict(e)
+                for e in decoded[EntityType.ERC1155_TRANSFER]
+            ]
+        )
+
+    def _end(self):
+        self.item_exporter.close()
@@ -85,6 +85,7 @@ def generate_get_log_by_number_json_rpc(
 
 def generate_trace_block_by_number_json_rpc(
     block_numbers: List[int],
+    timeout: Optional[str] = None,
 ) -> Generator[Dict[str, Union[str, int]], None, None]:
     for block_number in block_numbers:
         yield generate_json_rpc(
@@ -93,7 +94,7 @@ def generate_trace_block_by_number_json_rpc(
                 hex(block_number),
                 {
                     "tracer": env.GETH_TRACE_MODULE,
-                    "timeout": env.GETH_DEBUG_API_TIMEOUT,
+                    "timeout": timeout or env.GETH_DEBUG_API_TIMEOUT,
                 },
             ],
             # save block_number in request ID, so later we can identify block number in response
@@ -103,6 +104,7 @@ def generate_trace_block_by_number_json_rpc(
 
 def generate_trace_transaction_json_rpc(
     txhashes: List[str],
+    timeout: Optional[str] = None,
 ) -> Generator[Dict[str, Union[str, int]], None, None]:
     for txhash in txhashes:
         yield generate_json_rpc(
@@ -111,7 +113,7 @@ def generate_trace_transaction_json_rpc(
                 txhash,
                 {
                     "tracer": env.GETH_TRACE_MODULE,
-                    "timeout": env.GETH_DEBUG_API_TIMEOUT,
+                    "timeout": timeout or env.GETH_DEBUG_API_TIMEOUT,
                 },
             ],
             # save txhash in request ID, so later we can identify txhash in response
@@ -130,6 +132,17 @@ def generate_get_receipt_json_rpc(
         )
 
 
+def generate_get_block_receipts_json_rpc(
+    block_numbers: List[int],
+) -> Generator[Dict[str, Union[str, int]], None, None]:
+    for idx, block_number in enumerate(block_numbers):
+        yield generate_json_rpc(
+            method="eth_getBlockReceipts",
+            params=[hex(block_number)],
+            request_id=idx,
+        )
+
+
 def generate_get_code_json_rpc(
     contract_addresses: List[str],
     block: Union[int, str] = "latest",
@@ -142,6 +155,21 @@ def generate_get_code_json_rpc(
         )
 
 
+def generate_eth_call_json_rpc(
+    calls: List[Tuple[str, str]],
+    block: Union[int, str] = "latest",
+) -> Generator[Dict[str, Union[str, int]], None, None]:
+    for idx, (to_address, data) in enumerate(calls):
+        yield generate_json_rpc(
+            method="eth_call",
+            params=[
+                {"to": to_address, "data": data},
+                hex(block) if isinstance(block, int) else block,
+            ],
+            request_id=idx,
+        )
+
+
 # ONLY used for Arbitrum
 # Released in https://github.com/OffchainLabs/arbitrum/releases/tag/v1.3.0
 def generate_arbtrace_block_by_number_json_rpc(
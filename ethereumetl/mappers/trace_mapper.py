@@ -20,7 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import Dict, Optional, Any, List, Union, Tuple
+from typing import Callable, Dict, Optional, Any, List, Union, Tuple, TypeVar
 
 from blockchainetl.env import GETH_TRACE_IGNORE_GASUSED_ERROR
 from blockchainetl.utils import hex_to_dec
@@ -31,6 +31,23 @@ from ethereumetl.mainnet_daofork_state_changes import DAOFORK_BLOCK_NUMBER
 from ethereumetl.misc.geth_error_convert import geth_error_to_parity
 from ethereumetl.misc.geth_precompiled_contract import GETH_PRECOMPILED_CONTRACT_RANGE
 
+T = TypeVar("T")
+
+# the fields mapped from a geth call: from_address, to_address, value, input, output,
+# trace_type, call_type, gas, gas_used and error
+GethCallFields = Tuple[
+    Optional[str],
+    Optional[str],
+    Optional[int],
+    Optional[str],
+    Optional[str],
+    str,
+    Optional[str],
+    Optional[int],
+    Optional[int],
+    Optional[str],
+]
+
 
 class EthTraceMapper(object):
     def json_dict_to_trace(self, json_dict: Dict[str, Any]) -> EthTrace:
@@ -89,22 +106,85 @@ class EthTraceMapper(object):
     def geth_trace_to_traces(
         self, geth_trace: EthGethTrace, retain_precompiled_calls: bool = True
     ) -> List[EthTrace]:
+        return self._walk_geth_trace(
+            geth_trace, retain_precompiled_calls, False, self._new_trace
+        )
+
+    def geth_trace_to_trace_dicts(
+        self,
+        geth_trace: EthGethTrace,
+        retain_precompiled_calls: bool = True,
+        with_status: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Maps the call trees of geth into the exported trace dicts directly, the
+        same as trace_to_dict(geth_trace_to_traces()) without the EthTrace objects.
+
+        If `with_status`, the status is calculated as calculate_trace_statuses does:
+        0 if the trace or any parent of it failed.
+        """
+        return self._walk_geth_trace(
+            geth_trace, retain_precompiled_calls, with_status, self._new_trace_dict
+        )
+
+    def _walk_geth_trace(
+        self,
+        geth_trace: EthGethTrace,
+        retain_precompiled_calls: bool,
+        with_status: bool,
+        new_trace: Callable[..., T],
+    ) -> List[T]:
+        """Walks the call trees in pre-order(the order of traceAddress), so the
+        parents are mapped before their children, each call is built by new_trace."""
         block_number = geth_trace.block_number
-        tx_traces = geth_trace.tx_traces
         tx_hashes = geth_trace.tx_hashes
 
         traces = []
-
-        for tx_index, tx_trace in enumerate(tx_traces):
-            traces.extend(
-                self._iterate_geth_trace(
-                    block_number,
-                    tx_index,
-                    tx_trace,
-                    retain_precompiled_calls=retain_precompiled_calls,
-                    tx_hashes=tx_hashes,
+        for tx_index, tx_trace in enumerate(geth_trace.tx_traces):
+            tx_hash = tx_hashes.get(tx_index)
+            # (tx_trace, trace_address, (value, failed) of the parent trace)
+            stack: List[
+                Tuple[Dict[str, Any], List[int], Optional[Tuple[Optional[int], bool]]]
+            ] = [(tx_trace, [], None)]
+            while len(stack) > 0:
+                tx_trace, trace_address, parent = stack.pop()
+                fields = self._geth_call_fields(tx_trace, parent)
+
+                calls = tx_trace.get("calls", [])
+                if retain_precompiled_calls is False and len(calls) > 0:
+                    calls = [
+                        sub
+                        for sub in calls
+                        if not (
+                            sub.get("type", "").lower()
+                            in ("call", "callcode", "delegatecall", "staticcall")
+                            and int(sub.get("to", "0x0"), 16)
+                            in GETH_PRECOMPILED_CONTRACT_RANGE
+                        )
+                    ]
+
+                error = fields[9]
+                failed = (error is not None and len(error) > 0) or (
+                    parent is not None and parent[1]
+                )
+                status = (0 if failed else 1) if with_status else None
+                traces.append(
+                    new_trace(
+                        block_number,
+                        tx_hash,
+                        tx_index,
+                        fields,
+                        len(calls),
+                        trace_address,
+                        status,
+                    )
                 )
-            )
+
+                if len(calls) > 0:
+                    current = (fields[2], failed)
+                    for call_index in range(len(calls) - 1, -1, -1):
+                        stack.append(
+                            (calls[call_index], trace_address + [call_index], current)
+                        )
 
         return traces
 
@@ -146,28 +226,11 @@ class EthTraceMapper(object):
 
         return trace
 
-    def _iterate_geth_trace(
+    def _geth_call_fields(
         self,
-        block_number: Optional[int],
-        tx_index: int,
         tx_trace: Dict[str, Any],
-        trace_address: List[int] = [],
-        parent_trace: Optional[EthTrace] = None,
-        retain_precompiled_calls: bool = True,
-        tx_hashes: Dict[int, str] = dict(),
-    ) -> List[EthTrace]:
-        trace = EthTrace()
-
-        trace.block_number = block_number
-        trace.transaction_hash = tx_hashes.get(tx_index)
-        trace.transaction_index = tx_index
-
-        trace.from_address = to_normalized_address(tx_trace.get("from"))
-        trace.to_address = to_normalized_address(tx_trace.get("to"))
-
-        trace.input = tx_trace.get("input")
-        trace.output = tx_trace.get("output")
-
+        parent: Optional[Tuple[Optional[int], bool]],
+    ) -> GethCallFields:
         # FIXME, geth may return the error gas/gas_used, such as this tx:
         # $ curl -H "Content-Type: application/json" -d '
         # {
@@ -203,18 +266,18 @@ class EthTraceMapper(object):
         #     ]
         #   }
         # }
-        trace.gas = hex_to_dec(tx_trace.get("gas"))
-        trace.gas_used = hex_to_dec(tx_trace.get("gasUsed"))
+        gas = hex_to_dec(tx_trace.get("gas"))
+        gas_used = hex_to_dec(tx_trace.get("gasUsed"))
 
         # Compatible with Parity, set gas to 0 if None
-        if trace.gas is None and trace.gas_used is None:
-            trace.gas_used = 0
+        if gas is None and gas_used is None:
+            gas_used = 0
 
         # Celo's gas_used may returns invalid Integer, eg:
         # https://celoscan.io/tx/0xb3b844f064dbd3a10e254d567978a64193cead7953b6c1845abdb5c34c012d51
         # returns the gasUsed: 0x-2bc
-        if GETH_TRACE_IGNORE_GASUSED_ERROR and not isinstance(trace.gas_used, int):
-            trace.gas_used = -1
+        if GETH_TRACE_IGNORE_GASUSED_ERROR and not isinstance(gas_used, int):
+            gas_used = -1
 
         # a simple summary of 100 block, whose's gas is None
         # input output trace_type   gas     count
@@ -234,70 +297,134 @@ class EthTraceMapper(object):
         # map the geth's error into Parity's style
         error = tx_trace.get("error")
         if error:
-            trace.error = geth_error_to_parity(error)
+            error = geth_error_to_parity(error)
+        else:
+            error = None
 
         # lowercase for compatibility with parity traces
-        trace.trace_type = tx_trace.get("type", "").lower()
+        trace_type = tx_trace.get("type", "").lower()
+        call_type = None
 
-        if trace.trace_type == "selfdestruct":
+        if trace_type == "selfdestruct":
             # rename to suicide for compatibility with parity traces
-            trace.trace_type = "suicide"
-        elif trace.trace_type in ("call", "callcode", "delegatecall", "staticcall"):
-            trace.call_type = trace.trace_type
-            trace.trace_type = "call"
+            trace_type = "suicide"
+        elif trace_type in ("call", "callcode", "delegatecall", "staticcall"):
+            call_type = trace_type
+            trace_type = "call"
 
         # delegatecall,callcode should inherit the value field from the parent trace
         # https://docs.soliditylang.org/en/latest/introduction-to-smart-contracts.html#delegatecall-callcode-and-libraries
-        if trace.call_type in ("delegatecall", "callcode"):
-            if parent_trace is None:
+        if call_type in ("delegatecall", "callcode"):
+            if parent is None:
                 raise ValueError(
-                    f"tx_trace: {tx_trace} is {trace.trace_type}, but missing parent trace"
+                    f"tx_trace: {tx_trace} is {trace_type}, but missing parent trace"
                 )
-            # here we use parent EthTrace, not json_dict trace
+            # here we use parent trace, not json_dict trace
             # So if you look at the following scenario, the parent trace is staticcall,
             # and this trace is delegatecall, which would be failed if you used the latter
             # tx: 0xb2d196cf6bd01a0c1b0b3bef891bb0d8b61919f3840084f06d237b3a2e9ed702
             # staticcall ->
             #       delegatecall
-            trace.value = parent_trace.value
-        elif trace.call_type == "staticcall":
+            value = parent[0]
+        elif call_type == "staticcall":
             # static call is pure or view function, state is not modified
             # https://medium.com/blockchannel/state-specifiers-and-staticcall-d50d5b2e4920
-            trace.value = 0
+            value = 0
         else:
-            trace.value = hex_to_dec(tx_trace.get("value"))
-
-        result = [trace]
-
-        calls = tx_trace.get("calls", [])
-        if retain_precompiled_calls is False and len(calls) > 0:
-            calls = [
-                sub
-                for sub in calls
-                if not (
-                    sub.get("type", "").lower()
-                    in ("call", "callcode", "delegatecall", "staticcall")
-                    and int(sub.get("to", "0x0"), 16) in GETH_PRECOMPILED_CONTRACT_RANGE
-                )
-            ]
+            value = hex_to_dec(tx_trace.get("value"))
+
+        return (
+            to_normalized_address(tx_trace.get("from")),
+            to_normalized_address(tx_trace.get("to")),
+            value,
+            tx_trace.get("input"),
+            tx_trace.get("output"),
+            trace_type,
+            call_type,
+            gas,
+            gas_used,
+            error,
+        )
 
-        trace.subtraces = len(calls)
+    def _new_trace(
+        self,
+        block_number: Optional[int],
+        tx_hash: Optional[str],
+        tx_index: int,
+        fields: GethCallFields,
+        subtraces: int,
+        trace_address: List[int],
+        status: Optional[int],
+    ) -> EthTrace:
+        # sets all the slots once, instead of the defaults of __init__ and then these
+        trace = EthTrace.__new__(EthTrace)
+        trace._st = None
+        trace._st_day = None
+        trace.block_number = block_number
+        trace.transaction_hash = tx_hash
+        trace.transaction_index = tx_index
+        (
+            trace.from_address,
+            trace.to_address,
+            trace.value,
+            trace.input,
+            trace.output,
+            trace.trace_type,
+            trace.call_type,
+            trace.gas,
+            trace.gas_used,
+            trace.error,
+        ) = fields
+        trace.reward_type = None
+        trace.subtraces = subtraces
         trace.trace_address = trace_address
+        trace.status = status
+        trace.trace_id = None
+        return trace
 
-        for call_index, call_trace in enumerate(calls):
-            result.extend(
-                self._iterate_geth_trace(
-                    block_number,
-                    tx_index,
-                    call_trace,
-                    trace_address + [call_index],
-                    trace,
-                    retain_precompiled_calls=retain_precompiled_calls,
-                    tx_hashes=tx_hashes,
-                )
-            )
-
-        return result
+    def _new_trace_dict(
+        self,
+        block_number: Optional[int],
+        tx_hash: Optional[str],
+        tx_index: int,
+        fields: GethCallFields,
+        subtraces: int,
+        trace_address: List[int],
+        status: Optional[int],
+    ) -> Dict[str, Any]:
+        (
+            from_address,
+            to_address,
+            value,
+            input,
+            output,
+            trace_type,
+            call_type,
+            gas,
+            gas_used,
+            error,
+        ) = fields
+        return {
+            "type": "trace",
+            "block_number": block_number,
+            "transaction_hash": tx_hash,
+            "transaction_index": tx_index,
+            "from_address": from_address,
+            "to_address": to_address,
+            "value": value,
+            "input": input,
+            "output": output,
+            "trace_type": trace_type,
+            "call_type": call_type,
+            "reward_type": None,
+            "gas": gas,
+            "gas_used": gas_used,
+            "subtraces": subtraces,
+            "trace_address": trace_address,
+            "error": error,
+            "status": status,
+            "trace_id": None,
+        }
 
     def trace_to_dict(self, trace: EthTrace) -> Dict[str, Union[str, int, None, List]]:
         return {
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Optional, Callable, Any
+
+import aiohttp
+from web3 import HTTPProvider
+
+from blockchainetl.misc.json_decoder import decode_rpc_response
+
+logger = logging.getLogger(__name__)
+
+
+class PendingBatchResponse:
+    """A batch request on the wire, the response is decoded in the thread calling `result`,
+    so that decoding large payloads doesn't block the event loop."""
+
+    def __init__(self, future: Future, decoder: Callable[[bytes], Any]):
+        self._future = future
+        self._decoder = decoder
+
+    def result(self, timeout: Optional[float] = None):
+        return self._decoder(self._future.result(timeout))
+
+
+# Shares one HTTP keep-alive connection pool across all threads.
+# Requests are sent from a background asyncio event loop,
+# so many batches can be in flight without a thread (and a TCP connection) for each one.
+class AsyncBatchHTTPProvider(HTTPProvider):
+    def __init__(
+        self,
+        endpoint_uri: str,
+        request_kwargs: Optional[Any] = None,
+        pool_size: int = 16,
+        keepalive_timeout: int = 60,
+    ):
+        HTTPProvider.__init__(self, endpoint_uri, request_kwargs=request_kwargs)
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = self._submit(request_data).result()
+        return self.decode_rpc_response(raw_response)
+
+    def decode_rpc_response(self, raw_response: bytes):
+        return decode_rpc_response(raw_response)
+
+    def make_batch_request(self, text):
+        return self.submit_batch_request(text).result()
+
+    def submit_batch_request(self, text) -> PendingBatchResponse:
+        self.logger.debug(
+            "Making request HTTP. URI: %s, Request: %s", self.endpoint_uri, text
+        )
+        return PendingBatchResponse(
+            self._submit(text.encode("utf-8")), self.decode_rpc_response
+        )
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, session = self._loop, self._session
+            self._loop, self._session = None, None
+
+        asyncio.run_coroutine_threadsafe(session.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _submit(self, request_data: bytes) -> Future:
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._post(request_data), loop)
+
+    async def _post(self, request_data: bytes) -> bytes:
+        try:
+            async with self._session.post(
+                self.endpoint_uri,
+                data=request_data,
+                headers=self.get_request_headers(),
+            ) as response:
+                response.raise_for_status()
+                return await response.read()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # re-raise as builtin ConnectionError, which is retried by BatchWorkExecutor
+            raise ConnectionError(
+                f"failed to request {self.endpoint_uri}: {type(e).__name__} {e}"
+            ) from e
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name=f"async-rpc-{self.endpoint_uri}",
+                    daemon=True,
+                )
+                thread.start()
+                self._session = asyncio.run_coroutine_threadsafe(
+                    self._new_session(), loop
+                ).result()
+                self._loop = loop
+        return self._loop
+
+    async def _new_session(self) -> aiohttp.ClientSession:
+        timeout = (self._request_kwargs or {}).get("timeout")
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
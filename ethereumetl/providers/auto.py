@@ -1,5 +1,5 @@
 from urllib.parse import urlparse
-from typing import Union
+from typing import Union, List
 
 from web3 import IPCProvider, HTTPProvider, Web3
 from web3.middleware.geth_poa import geth_poa_middleware
@@ -12,7 +12,9 @@ from ethereumetl.providers.rpc import BatchHTTPProvider
 DEFAULT_TIMEOUT = env.REQUEST_TIMEOUT_SECONDS
 
 
-def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False):
+def get_provider_from_uri(
+    uri_string, timeout=DEFAULT_TIMEOUT, batch=False, async_pool_size=0
+):
     uri = urlparse(uri_string)
     if uri.scheme == "file":
         if batch:
@@ -26,6 +28,15 @@ def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False):
         # requests.Session is not thread safe, don't use across threads.
 
         request_kwargs = {"timeout": timeout}
+
+        # the asyncio provider shares one keep-alive connection pool across threads,
+        # so it doesn't suffer from the above issue.
+        if batch and async_pool_size > 0:
+            from ethereumetl.providers.async_rpc import AsyncBatchHTTPProvider
+
+            return AsyncBatchHTTPProvider(
+                uri_string, request_kwargs=request_kwargs, pool_size=async_pool_size
+            )
         if batch:
             return BatchHTTPProvider(uri_string, request_kwargs=request_kwargs)
         else:
@@ -34,6 +45,20 @@ def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False):
         raise ValueError("Unknown uri scheme {}".format(uri_string))
 
 
+def get_multi_provider_from_uris(uri_strings: List[str], timeout=DEFAULT_TIMEOUT):
+    for uri_string in uri_strings:
+        if urlparse(uri_string).scheme not in ("http", "https"):
+            raise ValueError(
+                "Only http/https uri is supported with multiple providers {}".format(
+                    uri_string
+                )
+            )
+
+    from ethereumetl.providers.multi_rpc import MultiBatchHTTPProvider
+
+    return MultiBatchHTTPProvider(uri_strings, request_kwargs={"timeout": timeout})
+
+
 def new_web3_provider(
     provider: Union[str, HTTPProvider], chain: str = Chain.ETHEREUM
 ) -> Web3:
@@ -0,0 +1,47 @@
+import json
+from typing import List, Dict
+
+from blockchainetl.endpoint_router import EndpointRouter
+from blockchainetl.thread_local_proxy import ThreadLocalProxy
+from blockchainetl.utils import hex_to_dec, rpc_response_to_result
+from ethereumetl.json_rpc_requests import generate_json_rpc
+from ethereumetl.providers.rpc import BatchHTTPProvider
+
+
+# Drop-in replacement of BatchHTTPProvider which is backed by several endpoints,
+# each batch is routed to the healthiest one, see EndpointRouter for more detail.
+# Itself is thread safe and should be shared across threads(not wrapped in ThreadLocalProxy),
+# so that all threads contribute to the same health statistics.
+class MultiBatchHTTPProvider(BatchHTTPProvider):
+    def __init__(self, endpoint_uris: List[str], request_kwargs=None, **router_kwargs):
+        BatchHTTPProvider.__init__(
+            self, endpoint_uris[0], request_kwargs=request_kwargs
+        )
+        self.endpoint_uris = endpoint_uris
+        self._providers: Dict[str, BatchHTTPProvider] = {
+            uri: ThreadLocalProxy(
+                lambda uri=uri: BatchHTTPProvider(uri, request_kwargs=request_kwargs)
+            )
+            for uri in endpoint_uris
+        }
+        self.router = EndpointRouter(
+            endpoint_uris, head_fetcher=self._get_head_block, **router_kwargs
+        )
+
+    def make_request(self, method, params):
+        return self.router.call(
+            lambda uri: self._providers[uri].make_request(method, params)
+        )
+
+    def make_batch_request(self, text):
+        return self.router.call(
+            lambda uri: self._providers[uri].make_batch_request(text)
+        )
+
+    def close(self):
+        self.router.shutdown()
+
+    def _get_head_block(self, uri: str) -> int:
+        request = generate_json_rpc(method="eth_blockNumber", params=[])
+        response = self._providers[uri].make_batch_request(json.dumps(request))
+        return hex_to_dec(rpc_response_to_result(response), ignore_error=False)
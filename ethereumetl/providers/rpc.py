@@ -20,19 +20,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import sys
 from web3 import HTTPProvider
 from web3._utils.request import make_post_request
 
-# This Polygon block's trace raised exception:
-#   RecursionError: blockmaximum recursion depth exceeded while decoding a JSON array from a unicode string
-# {
-#     "jsonrpc": "2.0",
-#     "method": "debug_traceBlockByNumber",
-#     "params": ["0x1e3a99a", {"tracer": "callTracer", "timeout": "60s"}],
-#     "id": 31697306,
-# }
-sys.setrecursionlimit(3000)
+from blockchainetl.misc.json_decoder import decode_rpc_response
 
 
 # Mostly copied from web3.py/providers/rpc.py. Supports batch requests.
@@ -55,3 +46,8 @@ class BatchHTTPProvider(HTTPProvider):
             response,
         )
         return response
+
+    def decode_rpc_response(self, raw_response: bytes):
+        # the callTracer results nested too deep(eg: Polygon's block 0x1e3a99a) are
+        # decoded without recursion, instead of raising RecursionError
+        return decode_rpc_response(raw_response)
@@ -20,29 +20,95 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import os
+import json
 import logging
 
-from typing import Dict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 import diskcache as dc
 from web3 import Web3
 from web3.exceptions import BadFunctionCallOutput, ContractLogicError
 from web3.contract import Contract
-from cachetools import cached, LRUCache
+from eth_utils.abi import function_abi_to_4byte_selector
+from eth_utils.address import to_checksum_address
+from cachetools import LRUCache
 from threading import Lock, get_native_id
 
+from blockchainetl import env
+from blockchainetl.utils import dynamic_batch_iterator
 from blockchainetl.service.token_service import TokenService
 from blockchainetl.enumeration.chain import Chain
 from ethereumetl.domain.token import EthToken
 from ethereumetl.erc20_abi import ERC20_ABI, ERC20_ABI_ALTERNATIVE_1
+from ethereumetl.json_rpc_requests import generate_eth_call_json_rpc
 from ethereumetl.misc.constant import DEFAULT_TOKEN_ETH
+from ethereumetl.service.eth_token_store import RedisTokenStore, build_token_store
 
 logger = logging.getLogger("eth_token_service")
 
+# the candidate functions of each field, the first non-empty result wins
+TOKEN_FIELD_FUNCTIONS = {
+    "symbol": [
+        (ERC20_ABI, "symbol"),
+        (ERC20_ABI, "SYMBOL"),
+        (ERC20_ABI_ALTERNATIVE_1, "symbol"),
+        (ERC20_ABI_ALTERNATIVE_1, "SYMBOL"),
+    ],
+    "name": [
+        (ERC20_ABI, "name"),
+        (ERC20_ABI, "NAME"),
+        (ERC20_ABI_ALTERNATIVE_1, "name"),
+        (ERC20_ABI_ALTERNATIVE_1, "NAME"),
+    ],
+    "decimals": [
+        (ERC20_ABI, "decimals"),
+        (ERC20_ABI, "DECIMALS"),
+    ],
+    "total_supply": [
+        (ERC20_ABI, "totalSupply"),
+    ],
+}
+
+# aggregate3((address target, bool allowFailure, bytes callData)[])
+MULTICALL3_AGGREGATE3_SELECTOR = "0x82ad56cb"
+
+
+class TokenFunction(NamedTuple):
+    field: str
+    selector: str
+    output_types: List[str]
+
+
+def build_token_functions() -> List[TokenFunction]:
+    functions = []
+    for field, candidates in TOKEN_FIELD_FUNCTIONS.items():
+        for abi, fn_name in candidates:
+            fn_abi = next(
+                e for e in abi if e["type"] == "function" and e["name"] == fn_name
+            )
+            functions.append(
+                TokenFunction(
+                    field,
+                    "0x" + function_abi_to_4byte_selector(fn_abi).hex(),
+                    [e["type"] for e in fn_abi["outputs"]],
+                )
+            )
+    return functions
+
+
+TOKEN_FUNCTIONS = build_token_functions()
+
 
 class EthTokenService(TokenService):
     def __init__(
-        self, web3: Web3, function_call_result_transformer=None, cache_path=None
+        self,
+        web3: Web3,
+        function_call_result_transformer=None,
+        cache_path=None,
+        store: Optional[RedisTokenStore] = None,
+        multicall_address: Optional[str] = None,
+        rpc_batch_size: int = 500,
+        multicall_size: int = 200,
     ):
         self._web3 = web3
         self._function_call_result_transformer = function_call_result_transformer
@@ -51,35 +117,216 @@ class EthTokenService(TokenService):
             os.makedirs(cache_path, exist_ok=True)
             self._cache = dc.Cache(cache_path)
 
+        self._tokens = LRUCache(maxsize=1024000)
+        self._lock = Lock()
+        self._store = store or build_token_store(
+            env.TOKEN_STORE_REDIS_URL,
+            ttl=env.TOKEN_STORE_TTL,
+            negative_ttl=env.TOKEN_STORE_NEGATIVE_TTL,
+        )
+        self._multicall_address = multicall_address or env.TOKEN_MULTICALL_ADDRESS
+        self._rpc_batch_size = rpc_batch_size
+        self._multicall_size = multicall_size
+
     def token_contract(self, token_address: str, abi: Dict = ERC20_ABI) -> Contract:
         checksum_address = self._web3.toChecksumAddress(token_address)
         return self._web3.eth.contract(address=checksum_address, abi=abi)
 
-    @cached(cache=LRUCache(maxsize=1024000), lock=Lock())
     def get_token(
         self,
         token_address: str,
         chain: str = Chain.ETHEREUM,
         block_number="latest",
     ) -> EthToken:
-        if self._cache is not None:
-            token = self._cache.get(token_address)
-            if token is not None:
-                return token
+        return self.get_tokens([token_address], chain, block_number)[token_address]
 
-        logger.info(
-            f"[PID: {get_native_id()}] token cache missed, read {token_address} from upstream"
-        )
+    def get_tokens(
+        self,
+        token_addresses: Iterable[str],
+        chain: str = Chain.ETHEREUM,
+        block_number="latest",
+    ) -> Dict[str, EthToken]:
+        """Returns the tokens of the given addresses, the ones not found in any cache
+        are resolved together in JSON-RPC batches(or Multicall3 calls)."""
         block_number = block_number or "latest"
 
-        token = EthToken()
-        if token_address == DEFAULT_TOKEN_ETH:
-            token.address = token_address
-            token.symbol = Chain.symbol(chain)
-            token.name = "Ether"
-            token.decimals = 18
-            return token
+        result = dict()
+        missing = []
+        with self._lock:
+            for token_address in dict.fromkeys(token_addresses):
+                token = self._tokens.get((token_address, chain, block_number))
+                if token is not None:
+                    result[token_address] = token
+                else:
+                    missing.append(token_address)
+        if len(missing) == 0:
+            return result
+
+        tokens = self._read_caches(missing, chain)
+        missing = [e for e in missing if e not in tokens]
+        if len(missing) > 0:
+            logger.info(
+                f"[PID: {get_native_id()}] token cache missed, "
+                f"read #{len(missing)} tokens from upstream"
+            )
+            resolved = self._resolve_tokens(missing, chain, block_number)
+            self._write_caches(
+                [e for e in resolved.values() if e.address != DEFAULT_TOKEN_ETH], chain
+            )
+            tokens.update(resolved)
+
+        with self._lock:
+            for token_address, token in tokens.items():
+                self._tokens[(token_address, chain, block_number)] = token
+        result.update(tokens)
+        return result
+
+    def _read_caches(
+        self, token_addresses: List[str], chain: str
+    ) -> Dict[str, EthToken]:
+        tokens = dict()
+        if self._cache is not None:
+            for token_address in token_addresses:
+                token = self._cache.get(token_address)
+                if token is not None:
+                    tokens[token_address] = token
+
+        if self._store is not None:
+            missing = [e for e in token_addresses if e not in tokens]
+            tokens.update(self._store.get_many(chain, missing))
+        return tokens
+
+    def _write_caches(self, tokens: List[EthToken], chain: str):
+        if self._cache is not None:
+            for token in tokens:
+                self._cache.set(token.address, token)
+        if self._store is not None:
+            self._store.set_many(chain, tokens)
+
+    def _resolve_tokens(
+        self, token_addresses: List[str], chain: str, block_number
+    ) -> Dict[str, EthToken]:
+        tokens = dict()
+        contracts = []
+        for token_address in token_addresses:
+            if token_address == DEFAULT_TOKEN_ETH:
+                tokens[token_address] = ether_token(chain)
+            else:
+                contracts.append(token_address)
+        if len(contracts) == 0:
+            return tokens
+
+        # the provider doesn't support batch request, call the functions one by one
+        if not hasattr(self._web3.provider, "make_batch_request"):
+            for token_address in contracts:
+                tokens[token_address] = self._resolve_token(token_address, block_number)
+            return tokens
+
+        calls = [(address, fn) for address in contracts for fn in TOKEN_FUNCTIONS]
+        if self._multicall_address is not None:
+            outputs = self._multicall(calls, block_number)
+        else:
+            outputs = self._batch_call(
+                [(address, fn.selector) for address, fn in calls], block_number
+            )
 
+        fields: Dict[str, Dict] = {address: dict() for address in contracts}
+        for (address, fn), output in zip(calls, outputs):
+            values = fields[address]
+            if values.get(fn.field) is not None:
+                continue
+            values[fn.field] = self._decode_output(fn, output)
+
+        for address, values in fields.items():
+            tokens[address] = self._build_token(
+                address,
+                values.get("symbol"),
+                values.get("name"),
+                values.get("decimals"),
+                values.get("total_supply"),
+            )
+        return tokens
+
+    def _batch_call(
+        self, calls: List[Tuple[str, str]], block_number
+    ) -> List[Optional[str]]:
+        outputs: List[Optional[str]] = [None] * len(calls)
+        requests = list(generate_eth_call_json_rpc(calls, block_number))
+        for chunk in dynamic_batch_iterator(requests, lambda: self._rpc_batch_size):
+            response = self._web3.provider.make_batch_request(json.dumps(chunk))
+            if not isinstance(response, list):
+                raise ValueError(f"batch eth_call failed, response: {response}")
+            # the failed(eg: reverted) calls have no result
+            for e in response:
+                outputs[e["id"]] = e.get("result")
+        return outputs
+
+    def _multicall(
+        self, calls: List[Tuple[str, TokenFunction]], block_number
+    ) -> List[Optional[str]]:
+        chunks = list(dynamic_batch_iterator(calls, lambda: self._multicall_size))
+        aggregates = []
+        for chunk in chunks:
+            data = self._web3.codec.encode_abi(
+                ["(address,bool,bytes)[]"],
+                [
+                    [
+                        (
+                            to_checksum_address(address),
+                            True,
+                            bytes.fromhex(fn.selector[2:]),
+                        )
+                        for address, fn in chunk
+                    ]
+                ],
+            )
+            aggregates.append(
+                (self._multicall_address, MULTICALL3_AGGREGATE3_SELECTOR + data.hex())
+            )
+
+        outputs = []
+        for chunk, result in zip(chunks, self._batch_call(aggregates, block_number)):
+            if result is None or result == "0x":
+                # eg: Multicall3 is not deployed at this block
+                logger.warning(
+                    f"Multicall3 {self._multicall_address} failed at block {block_number}, "
+                    "fallback to eth_call"
+                )
+                outputs.extend(
+                    self._batch_call(
+                        [(address, fn.selector) for address, fn in chunk], block_number
+                    )
+                )
+                continue
+
+            (returns,) = self._web3.codec.decode_abi(
+                ["(bool,bytes)[]"], bytes.fromhex(result[2:])
+            )
+            outputs.extend(
+                "0x" + data.hex() if success else None for success, data in returns
+            )
+        return outputs
+
+    def _decode_output(self, fn: TokenFunction, output: Optional[str]):
+        # the token doesn't implement this function or was self-destructed
+        if output is None or output == "0x":
+            return None
+        try:
+            (result,) = self._web3.codec.decode_abi(
+                fn.output_types, bytes.fromhex(output[2:])
+            )
+        except Exception:
+            logger.debug(
+                f"decode output of {fn.selector} failed, this can be safely ignored",
+                exc_info=True,
+            )
+            return None
+
+        if self._function_call_result_transformer is not None:
+            return self._function_call_result_transformer(result)
+        return result
+
+    def _resolve_token(self, token_address: str, block_number="latest") -> EthToken:
         contract = self.token_contract(token_address)
         alternative = self.token_contract(token_address, ERC20_ABI_ALTERNATIVE_1)
 
@@ -90,9 +337,6 @@ class EthTokenService(TokenService):
             alternative.functions.SYMBOL(),
             block_number=block_number,
         )
-        if isinstance(symbol, bytes):
-            symbol = self._bytes_to_string(symbol)
-
         name = self._get_first_result(
             contract.functions.name(),
             contract.functions.NAME(),
@@ -100,9 +344,6 @@ class EthTokenService(TokenService):
             alternative.functions.NAME(),
             block_number=block_number,
         )
-        if isinstance(name, bytes):
-            name = self._bytes_to_string(name)
-
         decimals = self._get_first_result(
             contract.functions.decimals(),
             contract.functions.DECIMALS(),
@@ -112,16 +353,22 @@ class EthTokenService(TokenService):
             contract.functions.totalSupply(),
             block_number=block_number,
         )
+        return self._build_token(token_address, symbol, name, decimals, total_supply)
+
+    def _build_token(
+        self, token_address: str, symbol, name, decimals, total_supply
+    ) -> EthToken:
+        if isinstance(symbol, bytes):
+            symbol = self._bytes_to_string(symbol)
+        if isinstance(name, bytes):
+            name = self._bytes_to_string(name)
 
+        token = EthToken()
         token.address = token_address
         token.symbol = self._clean_string(symbol)
         token.name = self._clean_string(name)
         token.decimals = decimals
         token.total_supply = total_supply
-
-        if self._cache is not None:
-            self._cache.set(token_address, token)
-
         return token
 
     def _get_first_result(self, *funcs, block_number="latest"):
@@ -200,3 +447,12 @@ def call_contract_function(
             return default_value
         else:
             raise Exception(msg) from ex
+
+
+def ether_token(chain: str) -> EthToken:
+    token = EthToken()
+    token.address = DEFAULT_TOKEN_ETH
+    token.symbol = Chain.symbol(chain)
+    token.name = "Ether"
+    token.decimals = 18
+    return token
@@ -0,0 +1,82 @@
+import json
+from typing import Dict, List, Optional
+
+import redis
+
+from ethereumetl.domain.token import EthToken
+
+TOKEN_STORE_FIELDS = ("address", "symbol", "name", "decimals", "total_supply")
+
+
+class RedisTokenStore:
+    """Token metadata shared by all the processes(and hosts) of a chain.
+
+    Tokens without any of symbol, name and decimals are cached as well(negative caching),
+    but expire after `negative_ttl` seconds, maybe it's not deployed yet at that block.
+    """
+
+    def __init__(
+        self,
+        redis_url: str,
+        ttl: int = 7 * 86400,
+        negative_ttl: int = 3600,
+        prefix: str = "token-metadata",
+    ):
+        self._red = redis.from_url(redis_url)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.prefix = prefix
+
+    def get_many(self, chain: str, token_addresses: List[str]) -> Dict[str, EthToken]:
+        if len(token_addresses) == 0:
+            return dict()
+
+        values = self._red.mget([self._key(chain, e) for e in token_addresses])
+        result = dict()
+        for token_address, value in zip(token_addresses, values):
+            if value is not None:
+                result[token_address] = load_token(value)
+        return result
+
+    def set_many(self, chain: str, tokens: List[EthToken]):
+        if len(tokens) == 0:
+            return
+
+        with self._red.pipeline(transaction=False) as pipe:
+            for token in tokens:
+                ttl = self.ttl if is_resolved(token) else self.negative_ttl
+                pipe.set(self._key(chain, token.address), dump_token(token), ex=ttl)
+            pipe.execute()
+
+    def _key(self, chain: str, token_address: str) -> str:
+        return f"{self.prefix}:{chain}:{token_address}"
+
+
+def is_resolved(token: EthToken) -> bool:
+    return (
+        token.symbol is not None or token.name is not None or token.decimals is not None
+    )
+
+
+def dump_token(token: EthToken) -> str:
+    value = {k: getattr(token, k) for k in TOKEN_STORE_FIELDS}
+    # totalSupply may be out of the range of float64, keep it as string
+    if value["total_supply"] is not None:
+        value["total_supply"] = str(value["total_supply"])
+    return json.dumps(value)
+
+
+def load_token(value: bytes) -> EthToken:
+    value = json.loads(value)
+    token = EthToken()
+    for k in TOKEN_STORE_FIELDS:
+        setattr(token, k, value.get(k))
+    if token.total_supply is not None:
+        token.total_supply = int(token.total_supply)
+    return token
+
+
+def build_token_store(redis_url: Optional[str], **kwargs) -> Optional[RedisTokenStore]:
+    if redis_url is None or redis_url == "":
+        return None
+    return RedisTokenStore(redis_url, **kwargs)
@@ -0,0 +1,271 @@
+import re
+import json
+import asyncio
+import logging
+import concurrent.futures
+from time import time
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from requests.exceptions import Timeout as RequestsTimeout
+from web3._utils.threads import Timeout as Web3Timeout
+
+from blockchainetl import env
+from blockchainetl.utils import rpc_response_to_result
+from blockchainetl.executors.batch_work_executor import execute_with_retries
+from ethereumetl.json_rpc_requests import (
+    generate_trace_block_by_number_json_rpc,
+    generate_trace_transaction_json_rpc,
+)
+
+TIMEOUT_EXCEPTIONS = (
+    RequestsTimeout,
+    Web3Timeout,
+    TimeoutError,
+    asyncio.TimeoutError,
+    concurrent.futures.TimeoutError,
+)
+
+# the error message of geth when the tracer runs out of its timeout
+GETH_TIMEOUT_MESSAGE = "execution timeout"
+
+# used to estimate the cost of a block if its gas used is unknown
+AVERAGE_TX_GAS = 100_000
+
+
+class GethTraceCostModel:
+    """Learns how many seconds it takes to trace a unit of gas(EWMA of the traced blocks)."""
+
+    def __init__(self, alpha: float = 0.2):
+        self.alpha = alpha
+        self.seconds_per_gas: Optional[float] = None
+        self._lock = Lock()
+
+    def observe(self, gas_used: int, elapsed: float):
+        if gas_used <= 0:
+            return
+        rate = elapsed / gas_used
+        with self._lock:
+            if self.seconds_per_gas is None:
+                self.seconds_per_gas = rate
+            else:
+                self.seconds_per_gas = (
+                    self.alpha * rate + (1 - self.alpha) * self.seconds_per_gas
+                )
+
+    def predict(self, gas_used: int) -> Optional[float]:
+        if self.seconds_per_gas is None:
+            return None
+        return gas_used * self.seconds_per_gas
+
+
+class GethTraceScheduler:
+    """Traces the blocks of a geth node adaptively.
+
+    A block is traced by one debug_traceBlockByNumber, unless it's predicted to be heavy
+    (by its gas used and the learned cost model), or the block request timed out,
+    then its transactions are traced by debug_traceTransaction, fanned out across
+    the workers. The transactions timed out(the tracer's execution timeout, or the
+    request's) are retried with a doubled tracer timeout, up to GETH_TRACE_MAX_TIMEOUT,
+    the ones failed by the other errors(eg: a tracer error, a missing transaction) are
+    not retried.
+
+    The tx traces are always returned in transaction_index order, the same as
+    debug_traceBlockByNumber.
+    """
+
+    def __init__(
+        self,
+        batch_web3_provider,
+        max_workers: int,
+        heavy_block_seconds: float = env.GETH_TRACE_HEAVY_BLOCK_SECONDS,
+        max_timeout: str = env.GETH_TRACE_MAX_TIMEOUT,
+        fanout_only: bool = False,
+        max_retries: int = 3,
+    ):
+        self.batch_web3_provider = batch_web3_provider
+        self.max_workers = max_workers
+        self.heavy_block_seconds = heavy_block_seconds
+        self.timeout = parse_duration(env.GETH_DEBUG_API_TIMEOUT)
+        # the tracer can't run longer than the http request
+        self.max_timeout = max(
+            min(parse_duration(max_timeout), env.REQUEST_TIMEOUT_SECONDS), self.timeout
+        )
+        self.fanout_only = fanout_only
+        self.max_retries = max_retries
+        self.ignore_error = (
+            env.IGNORE_TRACE_ERROR or env.GETH_TRACE_TRANSACTION_IGNORE_ERROR
+        )
+        self.cost_model = GethTraceCostModel()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+    def trace_block(
+        self, blknum: int, txhashes: Dict[int, str], gas_used: Optional[int] = None
+    ) -> List[Dict]:
+        """Returns the tx traces of the block, txhashes is the {txpos: txhash} of it."""
+        if gas_used is None:
+            gas_used = len(txhashes) * AVERAGE_TX_GAS
+
+        if len(txhashes) > 0 and (self.fanout_only or self._is_heavy(gas_used)):
+            return self._trace_transactions(blknum, txhashes)
+
+        st = time()
+        try:
+            response = self._request(
+                list(generate_trace_block_by_number_json_rpc([blknum]))[0]
+            )
+        except TIMEOUT_EXCEPTIONS:
+            elapsed = time() - st
+            # the real cost is more than that, let the model learn it at least
+            self.cost_model.observe(gas_used, elapsed)
+            if len(txhashes) == 0:
+                raise
+            logging.warning(
+                f"trace block {blknum} timed out after {round(elapsed, 3)}s, "
+                f"fan out its #{len(txhashes)} transactions"
+            )
+            return self._trace_transactions(blknum, txhashes)
+        self.cost_model.observe(gas_used, time() - st)
+
+        items = rpc_response_to_result(response)
+        tx_traces = [e.get("result") for e in items]
+        timed_out = [
+            i
+            for i, e in enumerate(items)
+            if e.get("result") is None and is_timeout_error(e.get("error"))
+        ]
+        if len(timed_out) == 0:
+            return self._drop_failed(blknum, tx_traces)
+
+        positions = sorted(txhashes)
+        if len(positions) != len(tx_traces):
+            # can't map the timed out ones to txhash, nothing to retry
+            return self._drop_failed(blknum, tx_traces)
+
+        logging.warning(
+            f"Geth trace for block:{blknum} txpos:{[positions[i] for i in timed_out]} "
+            "timed out, retry with debug_traceTransaction"
+        )
+        retried = self._trace_txhashes(
+            [txhashes[positions[i]] for i in timed_out],
+            self._next_timeout(self.timeout),
+        )
+        for i in timed_out:
+            tx_traces[i] = retried.get(txhashes[positions[i]])
+        return self._drop_failed(blknum, tx_traces)
+
+    def _is_heavy(self, gas_used: int) -> bool:
+        predicted = self.cost_model.predict(gas_used)
+        return predicted is not None and predicted > self.heavy_block_seconds
+
+    def _trace_transactions(self, blknum: int, txhashes: Dict[int, str]) -> List[Dict]:
+        positions = sorted(txhashes)
+        results = self._trace_txhashes(
+            [txhashes[e] for e in positions], self.timeout, fanout=True
+        )
+        return self._drop_failed(blknum, [results.get(txhashes[e]) for e in positions])
+
+    def _trace_txhashes(
+        self, txhashes: List[str], timeout: float, fanout: bool = False
+    ) -> Dict[str, Optional[Dict]]:
+        # two chunks for each worker, so that the slow ones can be balanced
+        n_chunks = min(len(txhashes), self.max_workers * 2) if fanout else 1
+        chunks = [txhashes[i::n_chunks] for i in range(n_chunks)]
+
+        results: Dict[str, Optional[Dict]] = dict()
+        timed_out: List[str] = []
+        futures = [
+            self.executor.submit(self._trace_chunk, chunk, timeout) for chunk in chunks
+        ]
+        for f in concurrent.futures.as_completed(futures):
+            exception = f.exception()
+            if exception:
+                logging.error(exception)
+                raise Exception(exception)
+            chunk_results, chunk_timed_out = f.result()
+            results.update(chunk_results)
+            timed_out.extend(chunk_timed_out)
+
+        # retry the timed out ones with a longer timeout, the other errors won't pass
+        # by retrying, they're left None for _drop_failed
+        if len(timed_out) > 0 and timeout < self.max_timeout:
+            results.update(
+                self._trace_txhashes(timed_out, self._next_timeout(timeout), fanout)
+            )
+        return results
+
+    def _trace_chunk(
+        self, txhashes: List[str], timeout: float
+    ) -> Tuple[Dict[str, Optional[Dict]], List[str]]:
+        """Returns the traces of the txhashes(None if failed), and the timed out ones."""
+        request = list(
+            generate_trace_transaction_json_rpc(
+                txhashes, timeout=format_duration(timeout)
+            )
+        )
+        try:
+            response = execute_with_retries(
+                self._request, request, max_retries=self.max_retries
+            )
+        except TIMEOUT_EXCEPTIONS:
+            logging.warning(
+                f"trace #{len(txhashes)} transactions timed out "
+                f"with the tracer timeout {format_duration(timeout)}"
+            )
+            return {e: None for e in txhashes}, txhashes
+
+        results = dict()
+        timed_out = []
+        for e in response:
+            txhash = e.get("id")
+            results[txhash] = rpc_response_to_result(e, ignore_error=True)
+            if results[txhash] is None and is_timeout_error(e.get("error")):
+                timed_out.append(txhash)
+        return results, timed_out
+
+    def _request(self, request) -> Dict:
+        return self.batch_web3_provider.make_batch_request(json.dumps(request))
+
+    def _next_timeout(self, timeout: float) -> float:
+        return min(timeout * 2, self.max_timeout)
+
+    def _drop_failed(self, blknum: int, tx_traces: List[Optional[Dict]]) -> List[Dict]:
+        failed = [i for i, e in enumerate(tx_traces) if e is None]
+        if len(failed) == 0:
+            return tx_traces
+
+        msg = (
+            f"Geth trace for block:{blknum} txpos:{failed} is nil, failed or timed out"
+        )
+        # Optimistic's trace block 0x3D9 returns error:
+        # TypeError: cannot read property 'toString' of undefined in server-side tracer function 'result' # noqa
+        if self.ignore_error:
+            logging.warning(msg)
+            return [e for e in tx_traces if e is not None]
+        raise ValueError(msg)
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+def is_timeout_error(error: Any) -> bool:
+    """Whether the error of a trace is the tracer's timeout, it's a JSON-RPC error
+    object for debug_traceTransaction, and a string in debug_traceBlockByNumber."""
+    if isinstance(error, dict):
+        error = error.get("message")
+    return isinstance(error, str) and GETH_TIMEOUT_MESSAGE in error
+
+
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value: str) -> float:
+    """Parses a Go duration(eg: 60s, 1m30s, 500ms) into seconds."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value)
+    if len(parts) == 0:
+        raise ValueError(f"invalid duration: {value}")
+    return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+
+
+def format_duration(seconds: float) -> str:
+    return f"{int(seconds)}s"
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Union
+
+from blockchainetl.enumeration.chain import Chain
+from blockchainetl.enumeration.entity_type import EntityType
+from ethereumetl.domain.log import EthLog
+from ethereumetl.mappers.log_mapper import EthLogMapper
+from ethereumetl.service.token_transfer_extractor import (
+    EthTokenTransferExtractor,
+    TRANSFER_EVENT_TOPIC,
+    DEPOSIT_EVENT_TOPIC,
+    WITHDRAWAL_EVENT_TOPIC,
+)
+from ethereumetl.service.erc721_transfer_extractor import EthErc721TransferExtractor
+from ethereumetl.service.cryptopunk_extractor import (
+    EthCryptoPunkTransferExtractor,
+    CRYPTOPUNK_TRANSFER_EVENT_TOPICS,
+)
+from ethereumetl.service.erc1155_transfer_extractor import (
+    EthErc1155TransferExtractor,
+    TRANSFER_SINGLE_TOPIC,
+    TRANSFER_BATCH_TOPIC,
+)
+
+# the cryptopunk events are collected and merged after all the logs are decoded
+CRYPTOPUNK_CANDIDATE = "cryptopunk_candidate"
+
+LOG_DECODER_ENTITY_TYPES = (
+    EntityType.TOKEN_TRANSFER,
+    EntityType.ERC721_TRANSFER,
+    EntityType.ERC1155_TRANSFER,
+)
+
+
+class EthLogDecoder(object):
+    """Decodes the transfers of all kinds from the logs in one pass.
+
+    The decoders are registered by topics[0], a log is mapped to EthLog only if
+    any decoder is registered for its topics[0], and is passed to each of them.
+    The extractors are the same as the ExtractXxxTransfersJob's.
+    """
+
+    def __init__(
+        self,
+        entity_types=LOG_DECODER_ENTITY_TYPES,
+        chain: Optional[str] = None,
+        erc20_tokens: Optional[Set] = None,
+    ):
+        self.chain = chain
+        self.log_mapper = EthLogMapper()
+        self.cp_extractor = EthCryptoPunkTransferExtractor(chain)
+        self.registry: Dict[str, List] = defaultdict(list)
+
+        if EntityType.TOKEN_TRANSFER in entity_types:
+            extractor = EthTokenTransferExtractor(chain)
+            topics = [TRANSFER_EVENT_TOPIC]
+            # WETH's Deposit/Withdrawal are converted to Transfer
+            if chain == Chain.ETHEREUM:
+                topics += [DEPOSIT_EVENT_TOPIC, WITHDRAWAL_EVENT_TOPIC]
+            for topic in topics:
+                self.register(
+                    topic,
+                    EntityType.TOKEN_TRANSFER,
+                    extractor.extract_transfer_from_log,
+                )
+
+        if EntityType.ERC721_TRANSFER in entity_types:
+            extractor = EthErc721TransferExtractor(erc20_tokens, chain)
+            self.register(
+                TRANSFER_EVENT_TOPIC,
+                EntityType.ERC721_TRANSFER,
+                extractor.extract_transfer_from_log,
+            )
+            if self.cp_extractor.chain == Chain.ETHEREUM:
+                for topic in CRYPTOPUNK_TRANSFER_EVENT_TOPICS:
+                    self.register(
+                        topic, CRYPTOPUNK_CANDIDATE, self.cp_extractor.extract
+                    )
+
+        if EntityType.ERC1155_TRANSFER in entity_types:
+            extractor = EthErc1155TransferExtractor()
+            for topic in (TRANSFER_SINGLE_TOPIC, TRANSFER_BATCH_TOPIC):
+                self.register(
+                    topic,
+                    EntityType.ERC1155_TRANSFER,
+                    extractor.extract_transfer_from_log,
+                )
+
+    def register(self, topic: str, output: str, decoder: Callable[[EthLog], object]):
+        """The decoder returns None, a decoded item or a list of them."""
+        self.registry[topic].append((output, decoder))
+
+    def decode(self, logs: List[Union[Dict, EthLog]]) -> Dict[str, List]:
+        result: Dict[str, List] = defaultdict(list)
+        registry = self.registry
+        for log in logs:
+            decoders = registry.get(_topic_0(log))
+            if decoders is None:
+                continue
+
+            if isinstance(log, dict):
+                log = self.log_mapper.dict_to_log(log)
+            for output, decoder in decoders:
+                item = decoder(log)
+                if item is None:
+                    continue
+                if isinstance(item, list):
+                    result[output].extend(item)
+                else:
+                    result[output].append(item)
+
+        candidates = result.pop(CRYPTOPUNK_CANDIDATE, None)
+        if candidates:
+            result[EntityType.ERC721_TRANSFER].extend(
+                self.cp_extractor.merge(candidates)
+            )
+        return result
+
+
+def _topic_0(log: Union[Dict, EthLog]) -> Optional[str]:
+    topics = log.get("topics") if isinstance(log, dict) else log.topics
+    if not topics:
+        # This is normal, topics can be empty for anonymous events
+        return None
+    # the topics loaded from database are joined by comma
+    if isinstance(topics, str):
+        return topics.strip().split(",", 1)[0]
+    return topics[0]
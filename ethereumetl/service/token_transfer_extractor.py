@@ -22,7 +22,7 @@
 
 
 import logging
-from typing import Optional
+from typing import List, Optional
 
 from blockchainetl.utils import hex_to_dec
 from blockchainetl.enumeration.chain import Chain
@@ -71,7 +71,8 @@ class EthTokenTransferExtractor(object):
             and to_normalized_address(log.address) == WETH_TOKEN_ADDRESS
             and topics_0 in (DEPOSIT_EVENT_TOPIC, WITHDRAWAL_EVENT_TOPIC)
         ):
-            log.topics = [
+            # don't update the log in place, it may be decoded by the others as well
+            topics = [
                 TRANSFER_EVENT_TOPIC,
                 ZERO_ADDR if topics_0 == DEPOSIT_EVENT_TOPIC else topics[1],
                 topics[1] if topics_0 == DEPOSIT_EVENT_TOPIC else ZERO_ADDR,
@@ -80,13 +81,13 @@ class EthTokenTransferExtractor(object):
 
         # event Transfer(address indexed from, address indexed to, uint256 value);
         if topics_0 == TRANSFER_EVENT_TOPIC:
-            return self._extract(log)
+            return self._extract(log, topics)
 
         return None
 
-    def _extract(self, log: EthLog) -> Optional[EthTokenTransfer]:
+    def _extract(self, log: EthLog, topics: List[str]) -> Optional[EthTokenTransfer]:
         # Handle unindexed event fields
-        topics_with_data = log.topics + split_to_words(log.data)
+        topics_with_data = topics + split_to_words(log.data)
         # if the number of topics and fields in data part != 4, then it's a weird event
         if len(topics_with_data) != 4:
             logger.warning(
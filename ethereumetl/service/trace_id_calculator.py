@@ -20,7 +20,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from typing import List
+from typing import Any, Dict, List
 from collections import defaultdict
 from ethereumetl.domain.trace import EthTrace
 
@@ -81,12 +81,40 @@ def calculate_trace_indexes_for_single_type(traces: List[EthTrace]):
         trace.trace_id = concat(trace.trace_type, trace.block_number, index)
 
 
+def calculate_trace_dict_ids(trace_dicts: List[Dict[str, Any]]):
+    """calculate_trace_ids of the exported trace dicts(trace_to_dict)."""
+    block_scoped_traces = defaultdict(list)
+    for trace in trace_dicts:
+        transaction_hash = trace["transaction_hash"]
+        if transaction_hash:
+            address = trace_address_to_str(trace["trace_address"])
+            trace["trace_id"] = f"{trace['trace_type']}_{transaction_hash}_{address}"
+        else:
+            key = (trace["block_number"], trace["trace_type"])
+            block_scoped_traces[key].append(trace)
+
+    for (block_number, trace_type), traces in block_scoped_traces.items():
+        sorted_traces = sorted(
+            traces,
+            key=lambda trace: (
+                trace["reward_type"],
+                trace["from_address"],
+                trace["to_address"],
+                trace["value"],
+            ),
+        )
+        for index, trace in enumerate(sorted_traces):
+            trace["trace_id"] = f"{trace_type}_{block_number}_{index}"
+
+    return trace_dicts
+
+
 def trace_address_to_str(trace_address):
     if trace_address is None or len(trace_address) == 0:
         return ""
 
-    return "_".join([str(address_point) for address_point in trace_address])
+    return "_".join(map(str, trace_address))
 
 
 def concat(*elements):
-    return "_".join([str(elem) for elem in elements])
+    return "_".join(map(str, elements))
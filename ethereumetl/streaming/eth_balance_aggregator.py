@@ -0,0 +1,191 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+BALANCE_CUMSUM_DTS = [
+    f"{d}_{t}"
+    for d in ("out", "vin", "cnb")
+    for t in ("blocks", "txs", "xfers", "value")
+] + ["value", "fee_value"]
+
+_MAX_TXPOS = float("inf")
+
+
+class DirectionStats:
+    """Accumulates the transfers of one address in one direction(out or vin)."""
+
+    __slots__ = (
+        "blocks",
+        "txs",
+        "xfers",
+        "value",
+        "first_key",
+        "first",
+        "last_key",
+        "last",
+    )
+
+    def __init__(self):
+        self.blocks = set()
+        self.txs = set()
+        self.xfers = 0
+        self.value = 0
+        self.first_key = None
+        self.first = None
+        self.last_key = None
+        self.last = None
+
+    def add(self, trace: Dict, value: int, sort_key):
+        self.blocks.add(trace["blknum"])
+        self.txs.add(trace["txhash"])
+        self.xfers += 1
+        self.value += value
+
+        # traces are ordered by (blknum, txpos), the earlier one wins on ties,
+        # the same as a stable sort
+        if self.first_key is None or sort_key < self.first_key:
+            self.first_key, self.first = sort_key, trace
+        if self.last_key is None or sort_key >= self.last_key:
+            self.last_key, self.last = sort_key, trace
+
+    def fill(self, balance: Dict, direction: str):
+        balance[f"{direction}_blocks"] = len(self.blocks)
+        balance[f"{direction}_txs"] = len(self.txs)
+        balance[f"{direction}_xfers"] = self.xfers
+        balance[f"{direction}_value"] = self.value
+        balance[f"{direction}_1th_st"] = self.first["_st"]
+        balance[f"{direction}_1th_blknum"] = self.first["blknum"]
+        balance[f"{direction}_nth_st"] = self.last["_st"]
+        balance[f"{direction}_nth_blknum"] = self.last["blknum"]
+
+
+class EthBalanceAggregator:
+    """Aggregates the native balance changes of a block range per address in one pass.
+
+    Traces, tx fees and coinbase rewards are accumulated into per-address
+    arbitrary-precision integers, the result is one row per address with
+    out_*, vin_*, cnb_*, fee_value and value(= vin + cnb - out - fee).
+    """
+
+    def __init__(self):
+        self.outs: Dict[str, DirectionStats] = dict()
+        self.vins: Dict[str, DirectionStats] = dict()
+        self.fees: Dict[str, int] = dict()
+        self.cnbs: Dict[str, Dict] = dict()
+
+    def add_traces(self, traces: Iterable[Dict]):
+        outs, vins = self.outs, self.vins
+        for trace in traces:
+            from_address = trace["from_address"]
+            to_address = trace["to_address"]
+            # transfers without both sides(eg: failed contract creation) are not counted
+            if from_address is None or to_address is None:
+                continue
+
+            value = int(trace["value"])
+            txpos = trace["txpos"]
+            sort_key = (trace["blknum"], _MAX_TXPOS if txpos is None else txpos)
+
+            stats = outs.get(from_address)
+            if stats is None:
+                stats = outs[from_address] = DirectionStats()
+            stats.add(trace, value, sort_key)
+
+            stats = vins.get(to_address)
+            if stats is None:
+                stats = vins[to_address] = DirectionStats()
+            stats.add(trace, value, sort_key)
+
+    def add_fees(self, txs: Iterable[Dict]):
+        fees = self.fees
+        for tx in txs:
+            address = tx["from_address"]
+            if address is None:
+                continue
+            fees[address] = fees.get(address, 0) + int(tx["fee_value"])
+
+    def add_coinbases(self, coinbases: Iterable[Dict]):
+        for cnb in coinbases:
+            self.cnbs[cnb["address"]] = cnb
+
+    def balances(self, blknum: int) -> List[Dict]:
+        addresses = set(self.outs) | set(self.vins) | set(self.fees) | set(self.cnbs)
+
+        result = []
+        for address in sorted(addresses):
+            balance = {"address": address}
+            for direction, stats in (("out", self.outs), ("vin", self.vins)):
+                stat = stats.get(address)
+                if stat is not None:
+                    stat.fill(balance, direction)
+                else:
+                    fill_empty(balance, direction)
+
+            balance["fee_value"] = self.fees.get(address, 0)
+
+            cnb = self.cnbs.get(address)
+            if cnb is not None:
+                for key in ("blocks", "txs", "xfers", "value"):
+                    balance[f"cnb_{key}"] = int(cnb.get(f"cnb_{key}") or 0)
+                for key in ("1th_st", "nth_st", "1th_blknum", "nth_blknum"):
+                    balance[f"cnb_{key}"] = cnb.get(f"cnb_{key}")
+            else:
+                fill_empty(balance, "cnb")
+
+            balance["value"] = (
+                balance["vin_value"]
+                + balance["cnb_value"]
+                - balance["out_value"]
+                - balance["fee_value"]
+            )
+
+            for key in [k for k in balance if k.endswith("_st")]:
+                balance[key + "_day"] = to_st_day(balance[key])
+
+            balance["blknum"] = blknum
+            result.append(balance)
+        return result
+
+
+def fill_empty(balance: Dict, direction: str):
+    balance[f"{direction}_blocks"] = 0
+    balance[f"{direction}_txs"] = 0
+    balance[f"{direction}_xfers"] = 0
+    balance[f"{direction}_value"] = 0
+    balance[f"{direction}_1th_st"] = None
+    balance[f"{direction}_1th_blknum"] = None
+    balance[f"{direction}_nth_st"] = None
+    balance[f"{direction}_nth_blknum"] = None
+
+
+def cumsum_balances(
+    balances: List[Dict], old_balances: Dict[str, Dict], dts=BALANCE_CUMSUM_DTS
+) -> List[Dict]:
+    """Add the previous cumulative balance of each address(if any),
+    the balances whose previous one is not older than itself are dropped."""
+
+    result = []
+    for balance in balances:
+        old = old_balances.get(balance["address"])
+        if old is None:
+            result.append(dict(balance))
+            continue
+
+        # if old blknum is greater than the new one,
+        # eg: old block-batch-size(100) > current batch(10)
+        # we can't apply the cumsum relays on a future balance
+        if old["blknum"] is not None and old["blknum"] >= balance["blknum"]:
+            continue
+
+        balance = dict(balance)
+        for dt in dts:
+            balance[dt] = int(balance[dt]) + int(old[dt])
+        result.append(balance)
+    return result
+
+
+@lru_cache(maxsize=1024)
+def to_st_day(value: Optional[int]) -> Optional[str]:
+    if value is None:
+        return None
+    return datetime.utcfromtimestamp(value).strftime("%Y-%m-%d")
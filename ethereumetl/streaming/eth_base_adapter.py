@@ -1,9 +1,11 @@
+from datetime import datetime
 from typing import Tuple, List, Dict, Optional, Union
 from cachetools import cached, TTLCache
 
 from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
+from blockchainetl.streaming.block_hash_window import BlockHash, block_hash_of
 from ethereumetl.providers.rpc import BatchHTTPProvider
 from ethereumetl.providers.auto import new_web3_provider
 from ethereumetl.jobs.export_blocks_job import ExportBlocksJob
@@ -37,6 +39,10 @@ class EthBaseAdapter:
     def close(self):
         self.item_exporter.close()
         self._close()
+        # eg: the session and event loop thread of AsyncBatchHTTPProvider
+        close = getattr(self.batch_web3_provider, "close", None)
+        if close is not None:
+            close()
 
     def _close(self):
         pass
@@ -82,6 +88,26 @@ class EthBaseAdapter:
         job.run()
         return exporter.get_items(EntityType.BLOCK)
 
+    def get_block_hashes(self, start_block, end_block) -> List[BlockHash]:
+        blocks = self.export_blocks(start_block, end_block)
+        return sorted(block_hash_of(e) for e in blocks)
+
+    def can_rollback_blocks(self) -> bool:
+        return hasattr(self.item_exporter, "rollback_blocks")
+
+    def rollback_blocks(
+        self, start_block, end_block, start_timestamp: Optional[int] = None
+    ) -> int:
+        """Deletes the exported items of the orphaned blocks."""
+        rollback = getattr(self.item_exporter, "rollback_blocks", None)
+        if rollback is None:
+            raise NotImplementedError(
+                f"{type(self.item_exporter).__name__} can't roll back blocks"
+            )
+        if start_timestamp is not None:
+            start_timestamp = datetime.utcfromtimestamp(start_timestamp)
+        return rollback(start_block, end_block, start_timestamp)
+
     def export_logs(
         self,
         start_block,
@@ -17,10 +17,7 @@ from ethereumetl.streaming.enrich import enrich_logs
 from blockchainetl.service.price_service import PriceService
 from blockchainetl.service.token_service import TokenService
 
-from ethereumetl.streaming.extractor import (
-    extract_token_transfers,
-    extract_erc1155_transfers,
-)
+from ethereumetl.streaming.extractor import extract_transfers
 from ethereumetl.streaming.enrich import (
     enrich_token_transfers,
     enrich_erc1155_transfers,
@@ -82,17 +79,19 @@ class EthNftOrderbookAdapter(EthBaseAdapter):
 
         logs = enrich_logs(blocks, logs)
 
-        token_transfers = extract_token_transfers(
-            logs, self.batch_size, self.max_workers, self.chain
+        transfers = extract_transfers(
+            logs,
+            self.chain,
+            entity_types=[EntityType.TOKEN_TRANSFER, EntityType.ERC1155_TRANSFER],
         )
 
-        token_transfers = enrich_token_transfers(blocks, token_transfers)
-
-        erc1155_transfers = extract_erc1155_transfers(
-            logs, self.batch_size, self.max_workers
+        token_transfers = enrich_token_transfers(
+            blocks, transfers[EntityType.TOKEN_TRANSFER]
         )
 
-        erc1155_transfers = enrich_erc1155_transfers(blocks, erc1155_transfers)
+        erc1155_transfers = enrich_erc1155_transfers(
+            blocks, transfers[EntityType.ERC1155_TRANSFER]
+        )
 
         if len(token_transfers) + len(erc1155_transfers) == 0:
             return
@@ -162,6 +161,10 @@ class EthNftOrderbookAdapter(EthBaseAdapter):
         if df.empty:
             return []
 
+        if self.token_service is not None:
+            currencies = pd.concat([df.currency, df.fee_currency]).dropna().unique()
+            self.token_service.get_tokens(currencies, self.chain)
+
         df = df.assign(
             type=EntityType.NFT_ORDERBOOK,
             currency_decimals=df.currency.apply(self._get_token_decimals),
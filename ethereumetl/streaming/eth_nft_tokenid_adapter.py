@@ -294,6 +294,14 @@ class EthNftTokenidAdapter(EthBaseAdapter):
 
         df = df_first.merge(df_last, on=TOKENID_GROUPBY_KEY + ["turnover_count"])
 
+        if self.token_service is not None:
+            self.token_service.get_tokens(
+                e
+                for e in df.token_address.unique()
+                if e not in self.erc721_token_addresses
+                and e not in self.erc1155_token_addresses
+            )
+
         df = df.assign(
             token_name=df.token_address.apply(self._get_token_name),
             minted_st_day=df.minted_st.apply(as_st_day),
@@ -2,21 +2,28 @@ import logging
 from time import time
 from collections import defaultdict
 from collections.abc import Callable
-from typing import Set, Optional
+from typing import Set, Optional, List, Dict, Tuple
 
 from web3 import Web3
 
+from blockchainetl import env
 from blockchainetl.utils import time_elapsed
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
 from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.enumeration.chain import Chain
 from blockchainetl.thread_local_proxy import ThreadLocalProxy
+from blockchainetl.streaming.block_hash_window import BlockHash, block_hash_of
 from ethereumetl.domain.receipt import EthReceipt
 from ethereumetl.providers.rpc import BatchHTTPProvider
 from ethereumetl.jobs.export_receipts_job import ExportReceiptsJob
+from ethereumetl.jobs.export_block_receipts_job import (
+    ExportBlockReceiptsJob,
+    supports_block_receipts,
+)
 from ethereumetl.jobs.export_traces_job import ExportTracesJob
 from ethereumetl.service.eth_token_service import EthTokenService
+from ethereumetl.service.geth_trace_scheduler import GethTraceScheduler
 from ethereumetl.streaming.enrich import (
     enrich_transactions,
     enrich_logs,
@@ -28,10 +35,7 @@ from ethereumetl.streaming.enrich import (
     enrich_tokens,
 )
 from ethereumetl.streaming.extractor import (
-    extract_token_transfers,
-    extract_erc721_transfers,
-    extract_cryptopunk_transfers,
-    extract_erc1155_transfers,
+    extract_transfers,
     extract_contracts,
     extract_tokens,
 )
@@ -72,7 +76,19 @@ class EthStreamerAdapter(EthBaseAdapter):
         self.check_transaction_consistency = check_transaction_consistency
         self.ignore_receipt_missing_error = ignore_receipt_missing_error
         self.receipt_mapper = EthReceiptMapper()
+        # probed by the first blocks, None if not yet
+        self.block_receipts_supported: Optional[bool] = None
+        if env.DISABLE_BLOCK_RECEIPTS is True:
+            self.block_receipts_supported = False
         self.token_service = None
+        self.trace_scheduler = None
+        if is_geth_provider:
+            # kept for the whole process, it learns the cost of tracing from each batch
+            self.trace_scheduler = GethTraceScheduler(
+                batch_web3_provider,
+                max_workers,
+                fanout_only=env.GETH_TRACE_BY_TRANSACTION_HASH,
+            )
         if enable_enrich:
             self.token_service = EthTokenService(
                 Web3(batch_web3_provider), cache_path=token_cache_path
@@ -82,9 +98,39 @@ class EthStreamerAdapter(EthBaseAdapter):
             self, chain, batch_web3_provider, item_exporter, batch_size, max_workers
         )
 
+    def _close(self):
+        if self.trace_scheduler is not None:
+            self.trace_scheduler.shutdown()
+
     def export_all(self, start_block, end_block):
         st0 = time()
+        all_items = self.extract_items(start_block, end_block)
+        if len(all_items) == 0:
+            return
+
+        st1 = time()
+        self.export_items(all_items)
+        if len(all_items) > 1024:
+            st2 = time()
+            logging.info(
+                f"PERF export blocks=({start_block}, {end_block}) size={len(all_items)} "
+                f"total-elapsed={time_elapsed(st0, st2)} export-elapsed={time_elapsed(st1, st2)}"
+            )
+
+    def export_items(self, items):
+        logging.debug("Exporting with " + type(self.item_exporter).__name__)
+        self.item_exporter.export_items(items)
+
+    def extract_items(self, start_block, end_block) -> List[Dict]:
+        return self._extract_items(start_block, end_block)[0]
+
+    def extract_items_and_block_hashes(
+        self, start_block, end_block
+    ) -> Tuple[List[Dict], List[BlockHash]]:
+        items, blocks = self._extract_items(start_block, end_block)
+        return items, sorted(block_hash_of(e) for e in blocks)
 
+    def _extract_items(self, start_block, end_block) -> Tuple[List[Dict], List[Dict]]:
         # 0. Export blocks and transactions
         blocks, transactions = self.export_blocks_and_transactions(
             start_block, end_block
@@ -122,16 +168,30 @@ class EthStreamerAdapter(EthBaseAdapter):
             else []
         )
 
-        # 4. Extract token Transfers from logs
-        token_transfers = []
-        if self._should_export(EntityType.TOKEN_TRANSFER) and len(logs) > 0:
-            token_transfers = extract_token_transfers(
+        # 4. Extract token/ERC721/ERC1155 Transfers from logs in one pass
+        transfers = dict()
+        transfer_types = [
+            e
+            for e in (
+                EntityType.TOKEN_TRANSFER,
+                EntityType.ERC721_TRANSFER,
+                EntityType.ERC1155_TRANSFER,
+            )
+            if self._should_export(e)
+        ]
+        if len(transfer_types) > 0 and len(logs) > 0:
+            transfers = extract_transfers(
                 logs,
-                self.batch_size,
-                self.max_workers,
-                chain=self.chain,
+                self.chain,
+                entity_types=transfer_types,
+                erc20_tokens=(
+                    self.erc20_token_reader()
+                    if EntityType.ERC721_TRANSFER in transfer_types
+                    else None
+                ),
                 token_service=self.token_service,
             )
+        token_transfers = transfers.get(EntityType.TOKEN_TRANSFER, [])
 
         # 5. Enrich token Transfers with block hash/timestamp
         enriched_token_transfers = (
@@ -141,17 +201,8 @@ class EthStreamerAdapter(EthBaseAdapter):
             else []
         )
 
-        # 6. Extract ERC721 Transfers from logs
-        erc721_transfers = []
-        if self._should_export(EntityType.ERC721_TRANSFER) and len(logs) > 0:
-            erc721_transfers = extract_erc721_transfers(
-                logs,
-                self.batch_size,
-                self.max_workers,
-                self.erc20_token_reader(),
-                self.chain,
-            )
-            erc721_transfers += extract_cryptopunk_transfers(logs, self.chain)
+        # 6. ERC721(with CryptoPunks) Transfers from logs
+        erc721_transfers = transfers.get(EntityType.ERC721_TRANSFER, [])
 
         # 7. Enrich ERC721 Transfers with block hash/timestamp
         enriched_erc721_transfers = (
@@ -161,12 +212,8 @@ class EthStreamerAdapter(EthBaseAdapter):
             else []
         )
 
-        # 8. Extract ERC1155 Transfers from logs
-        erc1155_transfers = []
-        if self._should_export(EntityType.ERC1155_TRANSFER) and len(logs) > 0:
-            erc1155_transfers = extract_erc1155_transfers(
-                logs, self.batch_size, self.max_workers
-            )
+        # 8. ERC1155 Transfers from logs
+        erc1155_transfers = transfers.get(EntityType.ERC1155_TRANSFER, [])
 
         # 9. Enrich token Transfers with block hash/timestamp
         enriched_erc1155_transfers = (
@@ -180,7 +227,7 @@ class EthStreamerAdapter(EthBaseAdapter):
         # Geth's trace missing txhash
         traces = []
         if self._should_export(EntityType.TRACE):
-            traces = self._export_traces(start_block, end_block, transactions)
+            traces = self._export_traces(start_block, end_block, blocks, transactions)
 
         # 11. Enrich traces with block hash/timestamp and txhash(only Geth)
         enriched_traces = (
@@ -215,8 +262,6 @@ class EthStreamerAdapter(EthBaseAdapter):
             else []
         )
 
-        logging.debug("Exporting with " + type(self.item_exporter).__name__)
-
         all_items = (
             enriched_blocks
             + enriched_transactions
@@ -229,7 +274,6 @@ class EthStreamerAdapter(EthBaseAdapter):
             + enriched_tokens
         )
 
-        st1 = time()
         self.calculate_item_ids(all_items)
         self.calculate_item_timestamps(all_items)
 
@@ -238,15 +282,7 @@ class EthStreamerAdapter(EthBaseAdapter):
                 f"Handle blocks [{start_block}, {end_block}] "
                 f"with entity-types: {self.entity_types} return emtpy"
             )
-            return
-
-        self.item_exporter.export_items(all_items)
-        if len(all_items) > 1024:
-            st2 = time()
-            logging.info(
-                f"PERF export blocks=({start_block}, {end_block}) size={len(all_items)} "
-                f"total-elapsed={time_elapsed(st0, st2)} export-elapsed={time_elapsed(st1, st2)}"
-            )
+        return all_items, blocks
 
     def _export_receipts_and_logs(self, transactions):
         exporter = InMemoryItemExporter(item_types=[EntityType.RECEIPT, EntityType.LOG])
@@ -259,11 +295,7 @@ class EthStreamerAdapter(EthBaseAdapter):
                 txpos = tx["transaction_index"]
                 transaction_blocks[txhash].append((blknum, txpos))
 
-        job = ExportReceiptsJob(
-            transaction_hashes_iterable=(
-                transaction["hash"] for transaction in transactions
-            ),
-            batch_size=self.batch_size,
+        kwargs = dict(
             batch_web3_provider=self.batch_web3_provider,
             max_workers=self.max_workers,
             item_exporter=exporter,
@@ -273,6 +305,33 @@ class EthStreamerAdapter(EthBaseAdapter):
             transaction_blocks=transaction_blocks,
             ignore_error=self.ignore_receipt_missing_error,
         )
+        # the same transaction in two blocks(checked by consistency) is left to
+        # eth_getTransactionReceipt, which returns its receipt once
+        if self.check_transaction_consistency is False and self._block_receipts(
+            transactions[0]["block_number"]
+        ):
+            block_transaction_hashes = defaultdict(list)
+            for tx in transactions:
+                block_transaction_hashes[tx["block_number"]].append(tx["hash"])
+            job = ExportBlockReceiptsJob(
+                block_transaction_hashes,
+                # about the same number of receipts in each batch request
+                batch_size=max(
+                    1,
+                    self.batch_size
+                    * len(block_transaction_hashes)
+                    // len(transactions),
+                ),
+                **kwargs,
+            )
+        else:
+            job = ExportReceiptsJob(
+                transaction_hashes_iterable=(
+                    transaction["hash"] for transaction in transactions
+                ),
+                batch_size=self.batch_size,
+                **kwargs,
+            )
         job.run()
         receipts = exporter.get_items(EntityType.RECEIPT)
         logs = exporter.get_items(EntityType.LOG)
@@ -299,7 +358,17 @@ class EthStreamerAdapter(EthBaseAdapter):
 
         return receipts, logs
 
-    def _export_traces(self, start_block, end_block, transactions):
+    def _block_receipts(self, block_number: int) -> bool:
+        if self.block_receipts_supported is None:
+            self.block_receipts_supported = supports_block_receipts(
+                self.batch_web3_provider, block_number
+            )
+            logging.info(
+                f"eth_getBlockReceipts supported: {self.block_receipts_supported}"
+            )
+        return self.block_receipts_supported
+
+    def _export_traces(self, start_block, end_block, blocks, transactions):
         block_txhashes = dict()
         # here we are using dict instead of list to store block txhashes
         # in case the upstream returned txlist is not in order
@@ -325,6 +394,8 @@ class EthStreamerAdapter(EthBaseAdapter):
             is_geth_provider=self.is_geth_provider,
             retain_precompiled_calls=self.retain_precompiled_calls,
             txhash_iterable=block_txhashes,
+            block_gas_used={e["number"]: e["gas_used"] for e in blocks},
+            trace_scheduler=self.trace_scheduler,
         )
         job.run()
         traces = exporter.get_items(EntityType.TRACE)
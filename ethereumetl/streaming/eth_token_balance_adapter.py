@@ -5,19 +5,17 @@ import pypeln as pl
 import pandas as pd
 from time import time
 from datetime import datetime
-from typing import List, Dict, Optional
-import concurrent.futures
+from typing import List, Optional
 from cachetools import cached, TTLCache
-from multiprocessing.pool import Pool
 
 from sqlalchemy import create_engine
-from sqlalchemy.engine import Engine
-from sqlalchemy.future import select
-from sqlalchemy.sql.expression import desc
 from rpq.RpqQueue import RpqQueue
 
 from blockchainetl.misc.sqlalchemy_extra import sqlalchemy_engine_builder
-from blockchainetl.utils import time_elapsed, dynamic_batch_iterator
+from blockchainetl import env
+from blockchainetl.utils import time_elapsed
+from blockchainetl.service.previous_balance_service import PreviousBalanceService
+from blockchainetl.service.latest_balance_cache import LatestBalanceCache
 from blockchainetl.misc.pandas_extra import partition_rank, vsum
 from blockchainetl.jobs.exporters.console_item_exporter import ConsoleItemExporter
 from blockchainetl.enumeration.entity_type import EntityType
@@ -26,10 +24,7 @@ from ethereumetl.streaming.postgres_tables import TOKEN_LATEST_BALANCES as T
 from ethereumetl.providers.rpc import BatchHTTPProvider
 from ethereumetl.mappers.log_mapper import EthLogMapper
 from ethereumetl.service.eth_token_service import EthTokenService
-from ethereumetl.streaming.extractor import (
-    extract_token_transfers,
-    extract_erc1155_transfers,
-)
+from ethereumetl.streaming.extractor import extract_transfers
 from ethereumetl.streaming.enrich import (
     enrich_token_transfers,
     enrich_erc1155_transfers,
@@ -56,54 +51,6 @@ BALANCE_CUMSUM_DTS = [
 ] + ["value"]
 
 
-class E:
-    engine: Engine = None
-
-    @staticmethod
-    def _exec(row: Dict) -> Dict:
-        E.engine.pool = E.engine.pool.recreate()
-        with E.engine.connect() as conn:
-            query = (
-                select(T)
-                .where(
-                    (T.c.address == row["address"])
-                    & (T.c.token_address == row["token_address"])
-                    & (T.c.blknum <= row["blknum"])
-                )
-                .order_by(desc(T.c.blknum))
-                .limit(1)
-            )
-            r = conn.execute(query).fetchone()
-            if r is not None:
-                return r._asdict()
-            return None
-
-    @staticmethod
-    def connect(db_url, db_schema):
-        E.engine = sqlalchemy_engine_builder(db_url, db_schema)(100, 0)
-
-    @staticmethod
-    def execute(items: List[Dict]) -> List[Dict]:
-        threads = min(max(1, len(items) // 10), 500)
-
-        result = []
-        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
-            futures = []
-            for row in items:
-                f = executor.submit(E._exec, row)
-                futures.append(f)
-
-            for f in concurrent.futures.as_completed(futures):
-                exception = f.exception()
-                if exception:
-                    logging.error(exception)
-                    raise Exception(exception)
-                r = f.result()
-                if r is not None:
-                    result.append(r)
-        return result
-
-
 class EthTokenBalanceAdapter(EthBaseAdapter):
     def __init__(
         self,
@@ -168,12 +115,29 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
             self.web3, cache_path=self.token_cache_path
         )
 
-        self.item_executor = None
+        self.history_db_engine = None
+        self.previous_balance_service = None
         if self._should_export(EntityType.TOKEN_HISTORY_BALANCE):
-            self.item_executor = Pool(
-                processes=self.max_workers,
-                initializer=E.connect,
-                initargs=(self.target_db_url, self.target_dbschema),
+            self.history_db_engine = sqlalchemy_engine_builder(
+                self.target_db_url, self.target_dbschema
+            )(self.max_workers, 0)
+            self.previous_balance_service = PreviousBalanceService(
+                self.history_db_engine,
+                T,
+                key_columns=("address", "token_address"),
+                max_workers=self.max_workers,
+            )
+
+        # it's empty after restart, the balances are read from database again
+        self.balance_cache = None
+        if (
+            self._should_export(EntityType.TOKEN_HISTORY_BALANCE)
+            and env.BALANCE_CACHE_SIZE_MB > 0
+        ):
+            self.balance_cache = LatestBalanceCache(
+                BALANCE_CUMSUM_DTS,
+                key_columns=("address", "token_address"),
+                max_bytes=env.BALANCE_CACHE_SIZE_MB * 1024 * 1024,
             )
 
         self.target_db_engine = None
@@ -186,6 +150,8 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
 
     def export_all(self, start_block, end_block):
         st0 = time()
+        if self.balance_cache is not None:
+            self.balance_cache.rewind(start_block)
 
         dict_logs = self._get_logs(start_block, end_block)
         if len(dict_logs) == 0:
@@ -195,14 +161,24 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
         blocks = self._get_blocks(start_block, end_block)
         st2 = time()
 
-        token_transfers = []
+        transfer_types = []
         if self._should_export(
             EntityType.TOKEN_LATEST_BALANCE, EntityType.TOKEN_HISTORY_BALANCE
         ):
-            token_transfers = extract_token_transfers(
-                dict_logs, self.batch_size, self.max_workers, self.chain
+            transfer_types.append(EntityType.TOKEN_TRANSFER)
+        if self._should_export(
+            EntityType.ERC1155_LATEST_BALANCE, EntityType.ERC1155_HISTORY_BALANCE
+        ):
+            transfer_types.append(EntityType.ERC1155_TRANSFER)
+        transfers = extract_transfers(
+            dict_logs, self.chain, entity_types=transfer_types
+        )
+
+        token_transfers = []
+        if EntityType.TOKEN_TRANSFER in transfers:
+            token_transfers = enrich_token_transfers(
+                blocks, transfers[EntityType.TOKEN_TRANSFER]
             )
-            token_transfers = enrich_token_transfers(blocks, token_transfers)
         token_df = convert_token_transfers_to_df(token_transfers, ignore_error=True)
 
         st3 = time()
@@ -216,22 +192,21 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
 
         st4 = time()
         st5, st6 = st4, st4
+        history_items = []
         if len(token_df) > 0 and self._should_export(EntityType.TOKEN_HISTORY_BALANCE):
             token_df = self._get_old_balances(token_df)
             st5 = time()
             token_df = self._cumsum_last_balances(token_df)
             st6 = time()
             token_df["type"] = EntityType.TOKEN_HISTORY_BALANCE
-            token_items.extend(token_df[T_COLUMNS + ["type"]].to_dict("records"))  # type: ignore
+            history_items = token_df[T_COLUMNS + ["type"]].to_dict("records")  # type: ignore
+            token_items.extend(history_items)
 
         erc1155_transfers = []
-        if self._should_export(
-            EntityType.ERC1155_LATEST_BALANCE, EntityType.ERC1155_HISTORY_BALANCE
-        ):
-            erc1155_transfers = extract_erc1155_transfers(
-                dict_logs, self.batch_size, self.max_workers, self.chain
+        if EntityType.ERC1155_TRANSFER in transfers:
+            erc1155_transfers = enrich_erc1155_transfers(
+                blocks, transfers[EntityType.ERC1155_TRANSFER]
             )
-            erc1155_transfers = enrich_erc1155_transfers(blocks, erc1155_transfers)
         erc1155_df = convert_token_transfers_to_df(erc1155_transfers, ignore_error=True)
         if len(erc1155_df) > 0:
             erc1155_df = self._export_erc1155_balances(erc1155_df)
@@ -251,6 +226,8 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
 
         st7 = time()
         exported = self.item_exporter.export_items(token_items + erc1155_items)
+        if self.balance_cache is not None:
+            self.balance_cache.update(history_items)
         st8 = time()
 
         if self.async_enrich_balance is True:
@@ -267,6 +244,8 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
             f"@cumsum={time_elapsed(st5, st6)} @export={time_elapsed(st7, st8)} "
             f"@async_enrich={time_elapsed(st8, st9)}"
         )
+        if self.balance_cache is not None:
+            logging.info(f"STAT balance cache {self.balance_cache.stats()}")
 
     def _should_export(self, *entity_types):
         return len(set(entity_types).intersection(self.entity_types)) > 0
@@ -279,6 +258,7 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
                 df[col + "_day"] = df[col].apply(self._to_st_day)  # type: ignore
 
         df["blknum"] = end_block
+        self.token_service.get_tokens(df.token_address.unique())
         df["decimals"] = df.token_address.apply(self._get_token_decimals)
 
         return df
@@ -322,16 +302,21 @@ class EthTokenBalanceAdapter(EthBaseAdapter):
         return topics
 
     def _get_old_balances(self, df: pd.DataFrame) -> pd.DataFrame:
-        assert self.item_executor is not None
+        assert self.previous_balance_service is not None
 
-        fs = []
-        for chunk in dynamic_batch_iterator(
-            (e[1].to_dict() for e in df.iterrows()), lambda: self.batch_size
-        ):
-            fs.append(self.item_executor.apply_async(E.execute, args=(chunk,)))
-        old_balances = []
-        for f in fs:
-            old_balances.extend(f.get())
+        keys = [
+            {"address": address, "token_address": token_address, "blknum": int(blknum)}
+            for address, token_address, blknum in zip(
+                df["address"], df["token_address"], df["blknum"]
+            )
+        ]
+        old_balances, missing = [], keys
+        if self.balance_cache is not None:
+            old_balances, missing = self.balance_cache.lookup(keys)
+        if len(missing) > 0:
+            old_balances.extend(
+                self.previous_balance_service.get_previous_balances(missing)
+            )
 
         if len(old_balances) == 0:
             logging.warning(f" #{len(df)} got no old balance")
@@ -450,8 +435,10 @@ WHERE
         return blocks
 
     def _close(self):
-        if self.item_executor is not None:
-            self.item_executor.close()
+        if self.history_db_engine is not None:
+            self.history_db_engine.dispose()
+        if self.balance_cache is not None:
+            self.balance_cache.clear()
 
 
 def group_balance_by_token_and_address(df: pd.DataFrame, is_in=True, is_erc1155=False):
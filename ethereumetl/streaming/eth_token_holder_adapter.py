@@ -12,10 +12,7 @@ from blockchainetl.enumeration.entity_type import EntityType
 from blockchainetl.enumeration.chain import Chain
 from ethereumetl.providers.rpc import BatchHTTPProvider
 from ethereumetl.mappers.log_mapper import EthLogMapper
-from ethereumetl.streaming.extractor import (
-    extract_token_transfers,
-    extract_erc1155_transfers,
-)
+from ethereumetl.streaming.extractor import extract_transfers
 from ethereumetl.streaming.enrich import (
     enrich_token_transfers,
     enrich_erc1155_transfers,
@@ -82,21 +79,25 @@ class EthTokenHolderAdapter(EthBaseAdapter):
         blocks = self.export_blocks(start_block, end_block)
         st2 = time()
 
-        token_transfers = []
+        transfer_types = []
         if self._should_export(EntityType.TOKEN_HOLDER):
-            token_transfers = extract_token_transfers(
-                dict_logs,
-                self.batch_size,
-                self.max_workers,
-                self.chain,
+            transfer_types.append(EntityType.TOKEN_TRANSFER)
+        if self._should_export(EntityType.ERC1155_HOLDER):
+            transfer_types.append(EntityType.ERC1155_TRANSFER)
+        transfers = extract_transfers(
+            dict_logs, self.chain, entity_types=transfer_types
+        )
+
+        token_transfers = []
+        if EntityType.TOKEN_TRANSFER in transfers:
+            token_transfers = enrich_token_transfers(
+                blocks, transfers[EntityType.TOKEN_TRANSFER]
             )
-            token_transfers = enrich_token_transfers(blocks, token_transfers)
         erc1155_transfers = []
-        if self._should_export(EntityType.ERC1155_HOLDER):
-            erc1155_transfers = extract_erc1155_transfers(
-                dict_logs, self.batch_size, self.max_workers
+        if EntityType.ERC1155_TRANSFER in transfers:
+            erc1155_transfers = enrich_erc1155_transfers(
+                blocks, transfers[EntityType.ERC1155_TRANSFER]
             )
-            erc1155_transfers = enrich_erc1155_transfers(blocks, erc1155_transfers)
 
         st3 = time()
         token_holders = (
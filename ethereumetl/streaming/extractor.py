@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 
 from blockchainetl.thread_local_proxy import ThreadLocalProxy
 from blockchainetl.jobs.exporters.in_memory_item_exporter import InMemoryItemExporter
@@ -9,10 +9,12 @@ from ethereumetl.jobs.extract_cryptopunk_transfer_job import (
     ExtractCryptoPunkTransfersJob,
 )
 from ethereumetl.jobs.extract_erc1155_transfers_job import ExtractErc1155TransfersJob
+from ethereumetl.jobs.extract_transfers_job import ExtractTransfersJob
 from ethereumetl.jobs.extract_contracts_job import ExtractContractsJob
 from ethereumetl.jobs.extract_tokens_job import ExtractTokensJob
 from ethereumetl.providers.auto import new_web3_provider
 from ethereumetl.service.eth_token_service import EthTokenService
+from ethereumetl.service.log_decoder import LOG_DECODER_ENTITY_TYPES
 
 
 def extract_token_transfers(
@@ -72,6 +74,29 @@ def extract_erc1155_transfers(logs, batch_size, max_workers) -> List[Dict]:
     return exporter.get_items(EntityType.ERC1155_TRANSFER)
 
 
+def extract_transfers(
+    logs,
+    chain,
+    entity_types=LOG_DECODER_ENTITY_TYPES,
+    erc20_tokens: Optional[Set] = None,
+    token_service: Optional[EthTokenService] = None,
+) -> Dict[str, List[Dict]]:
+    """Extracts the token/erc721(with cryptopunk)/erc1155 transfers in one pass,
+    returns the items of each entity type."""
+    entity_types = [e for e in LOG_DECODER_ENTITY_TYPES if e in entity_types]
+    exporter = InMemoryItemExporter(item_types=entity_types)
+    job = ExtractTransfersJob(
+        logs_iterable=logs,
+        item_exporter=exporter,
+        entity_types=entity_types,
+        chain=chain,
+        erc20_tokens=erc20_tokens,
+        token_service=token_service,
+    )
+    job.run()
+    return {e: exporter.get_items(e) for e in entity_types}
+
+
 def extract_contracts(traces, batch_size, max_workers) -> List[Dict]:
     exporter = InMemoryItemExporter(item_types=[EntityType.CONTRACT])
     job = ExtractContractsJob(
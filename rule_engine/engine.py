@@ -639,13 +639,31 @@ class Context(object):
         return self.__type_resolver(name)
 
 
+class _LazyParser(object):
+    """
+    A descriptor which builds the :py:class:`~rule_engine.parser.Parser` on the first access, instead of at import time
+    since the PLY tables are generated at runtime and that's slow.
+    """
+
+    def __init__(self):
+        self._parser = None
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner):
+        if self._parser is None:
+            with self._lock:
+                if self._parser is None:
+                    self._parser = parser.Parser()
+        return self._parser
+
+
 class Rule(object):
     """
     A rule which parses a string with a logical expression and can then evaluate an arbitrary object for whether or not
     it matches based on the constraints of the expression.
     """
 
-    parser = parser.Parser()
+    parser = _LazyParser()
     """
     The :py:class:`~rule_engine.parser.Parser` instance that will be used for parsing the rule text into a compatible
     abstract syntax tree (AST) for evaluation.
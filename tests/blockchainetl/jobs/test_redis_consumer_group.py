@@ -0,0 +1,63 @@
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from blockchainetl.jobs.redis_consumer_group import RedisConsumerGroup
+
+
+class FakeRedis(object):
+    def xinfo_groups(self, stream):
+        return []
+
+    def xgroup_create(self, stream, group, id="0", mkstream=False):
+        pass
+
+
+class FlakyIniter(object):
+    """The first `n_ok` calls succeed, the others raise."""
+
+    def __init__(self, n_ok: int):
+        self.n_ok = n_ok
+        self.inited = 0
+        self.deinited = 0
+        self._lock = Lock()
+
+    def init(self):
+        with self._lock:
+            if self.inited >= self.n_ok:
+                raise ConnectionError("can't connect to the database")
+            self.inited += 1
+            return self.inited
+
+    def deinit(self, inited):
+        with self._lock:
+            self.deinited += 1
+
+
+def consume(concurrency: int, initer: FlakyIniter):
+    group = RedisConsumerGroup(
+        "redis://localhost:6379/0", "stream", "group", concurrency=concurrency
+    )
+    group._red = FakeRedis()
+    # fails the test instead of hanging if the error is not raised
+    executor = ThreadPoolExecutor(1)
+    try:
+        future = executor.submit(
+            group.consume,
+            lambda inited, st, keyvals: None,
+            initer=initer.init,
+            deiniter=initer.deinit,
+        )
+        return future.result(timeout=10)
+    finally:
+        executor.shutdown(wait=False)
+
+
+@pytest.mark.parametrize("concurrency,n_ok", [(1, 0), (4, 0), (4, 2)])
+def test_consume_raises_if_initer_fails(concurrency, n_ok):
+    initer = FlakyIniter(n_ok)
+    with pytest.raises(ConnectionError):
+        consume(concurrency, initer)
+    # the resources of the workers inited are released
+    assert initer.deinited == initer.inited == n_ok
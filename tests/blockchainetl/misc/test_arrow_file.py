@@ -0,0 +1,51 @@
+import io
+
+import pytest
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+from blockchainetl.misc.arrow_file import ArrowCsvReader
+
+
+@pytest.fixture
+def table():
+    n = 1000
+    return pa.table(
+        {
+            "blknum": pa.array(range(n), type=pa.int64()),
+            "hash": pa.array([f"0x{e:064x}" for e in range(n)]),
+            "value": pa.array([None if e % 7 == 0 else str(e**5) for e in range(n)]),
+            "is_erc20": pa.array([e % 2 == 0 for e in range(n)]),
+        }
+    )
+
+
+def whole_csv(table: pa.Table) -> bytes:
+    buf = io.BytesIO()
+    pa_csv.write_csv(
+        table, buf, pa_csv.WriteOptions(include_header=False, delimiter="^")
+    )
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("read_size", [1, 100, 4096, 1 << 20])
+def test_read_by_size_is_the_whole_csv(table, read_size):
+    reader = ArrowCsvReader(table, "^", batch_rows=64)
+    chunks = []
+    while True:
+        chunk = reader.read(read_size)
+        if len(chunk) == 0:
+            break
+        assert len(chunk) <= read_size
+        chunks.append(chunk)
+    assert b"".join(chunks) == whole_csv(table)
+
+
+def test_read_all(table):
+    reader = ArrowCsvReader(table, "^", batch_rows=100)
+    assert reader.read(10) + reader.read() == whole_csv(table)
+    assert reader.read() == b""
+
+
+def test_empty_table(table):
+    assert ArrowCsvReader(table.slice(0, 0), "^").read(100) == b""
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import psycopg2
+from psycopg2.pool import PoolError
+
+from blockchainetl.streaming import postgres_batch_loader
+from blockchainetl.streaming.postgres_batch_loader import BatchCopyLoader
+
+
+class FakeConnection(object):
+    def rollback(self):
+        pass
+
+    def commit(self):
+        pass
+
+
+class FakePool(object):
+    def __init__(self, getconn_error=None):
+        self.getconn_error = getconn_error
+        self.returned = []
+
+    def getconn(self):
+        if self.getconn_error is not None:
+            raise self.getconn_error
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    monkeypatch.setattr(postgres_batch_loader, "BATCH_LINGER_SECONDS", 0)
+    return BatchCopyLoader(
+        "postgresql://postgres@/postgres?host=/nonexistent", "traces", "trace", None
+    )
+
+
+def load(loader, file="a.csv"):
+    # fails the test instead of hanging if the file is never resolved
+    executor = ThreadPoolExecutor(1)
+    try:
+        return executor.submit(loader.load, file, 1).result(timeout=10)
+    finally:
+        executor.shutdown(wait=False)
+
+
+@pytest.mark.parametrize(
+    "error", [PoolError("connection pool exhausted"), psycopg2.OperationalError("down")]
+)
+def test_load_raises_if_getconn_fails(loader, error):
+    loader._pool = FakePool(getconn_error=error)
+    with pytest.raises(type(error)):
+        load(loader)
+    assert loader._pool.returned == []
+
+
+def test_load_raises_if_connect_fails(loader):
+    with pytest.raises(psycopg2.OperationalError):
+        load(loader)
+
+
+def test_broken_connection_in_fallback_is_closed(loader, monkeypatch):
+    def copy_files(conn, files):
+        raise ValueError("duplicated rows")
+
+    def copy_file(conn, file):
+        raise psycopg2.OperationalError("server closed the connection")
+
+    loader._pool = FakePool()
+    monkeypatch.setattr(loader, "_copy_files", copy_files)
+    monkeypatch.setattr(loader, "_copy_file", copy_file)
+    with pytest.raises(psycopg2.OperationalError):
+        load(loader)
+    assert [close for _, close in loader._pool.returned] == [True]